@@ -2,17 +2,132 @@
 Django Admin Configuration for Diet Recommendation System
 """
 
+import datetime
+import functools
+
 from django.contrib import admin
-from .models import UserProfile, DietRecommendation, WeightLog
+from django.db.models import Max, Min
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import (
+    UserProfile, DietRecommendation, WeightLog, RecommendationRollup, ActiveLoggerRollup, ArchiveFile,
+    DigestCheckpoint,
+)
+from .drift import drift_report
+from .pagination import EstimatedCountPaginator
+from .rollups import PERIODS, default_range, population_report
+from .search import search
+
+
+class DateRangeBucketsMixin:
+    """QuerySet mixin for date_hierarchy on large tables.
+
+    Drill-down buckets are built from MIN/MAX of the field, which an index
+    answers directly, instead of SELECT DISTINCT over truncated dates, which
+    scans every row. Periods without rows may be listed.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # SQLite only uses an index for MIN/MAX when the query has a single
+        # aggregate, so run each one separately.
+        if not args and len(kwargs) > 1 and all(isinstance(a, (Min, Max)) for a in kwargs.values()):
+            result = {}
+            for alias, expression in kwargs.items():
+                result.update(super().aggregate(**{alias: expression}))
+            return result
+        return super().aggregate(*args, **kwargs)
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind in ('year', 'month', 'day'):
+            return self._range_buckets(field_name, kind, order)
+        return super().dates(field_name, kind, order)
+
+    def datetimes(self, field_name, kind, order='ASC', **kwargs):
+        if kind in ('year', 'month', 'day'):
+            return self._range_buckets(field_name, kind, order)
+        return super().datetimes(field_name, kind, order, **kwargs)
+
+    def _range_buckets(self, field_name, kind, order):
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        first, last = bounds['first'], bounds['last']
+        if first is None:
+            return []
+        if isinstance(first, datetime.datetime):
+            first, last = timezone.localtime(first).date(), timezone.localtime(last).date()
+        if kind == 'year':
+            first, last = first.replace(month=1, day=1), last.replace(month=1, day=1)
+        elif kind == 'month':
+            first, last = first.replace(day=1), last.replace(day=1)
+        buckets = []
+        current = first
+        while current <= last:
+            buckets.append(current)
+            if kind == 'day':
+                current += datetime.timedelta(days=1)
+            elif kind == 'month':
+                current = (current + datetime.timedelta(days=32)).replace(day=1)
+            else:
+                current = current.replace(year=current.year + 1)
+        return buckets[::-1] if order == 'DESC' else buckets
+
+
+@functools.lru_cache(maxsize=None)
+def _date_range_queryset_class(queryset_class):
+    return type(f'DateRange{queryset_class.__name__}', (DateRangeBucketsMixin, queryset_class), {})
+
+
+class BMICategoryFilter(admin.SimpleListFilter):
+    """Filter profiles by BMI category using the indexed bmi column"""
+    title = 'BMI category'
+    parameter_name = 'bmi_category'
+    ranges = {
+        'underweight': ('Underweight', None, 18.5),
+        'healthy': ('Healthy', 18.5, 25),
+        'overweight': ('Overweight', 25, 30),
+        'obese': ('Obese', 30, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _, _) in self.ranges.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.ranges:
+            return queryset
+        _, low, high = self.ranges[self.value()]
+        if low is not None:
+            queryset = queryset.filter(bmi__gte=low)
+        if high is not None:
+            queryset = queryset.filter(bmi__lt=high)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Skip the second, unfiltered COUNT(*)
+    search_index = None  # diet_app.search index answering the search box instead of search_fields
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        queryset.__class__ = _date_range_queryset_class(type(queryset))
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        if self.search_index is not None and search_term:
+            results = search(queryset, self.search_index, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(LargeTableAdmin):
     """Admin interface for User Profiles"""
     list_display = ['user', 'age', 'gender', 'weight', 'height', 'bmi_display', 'diet_type', 'goal', 'created_at']
-    list_filter = ['gender', 'diet_type', 'goal', 'activity_level', 'created_at']
+    list_filter = [BMICategoryFilter, 'gender', 'diet_type', 'goal', 'activity_level', 'created_at']
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['bmi', 'created_at', 'updated_at']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -20,7 +135,7 @@ class UserProfileAdmin(admin.ModelAdmin):
             'fields': ('user',)
         }),
         ('Physical Attributes', {
-            'fields': ('age', 'gender', 'height', 'weight')
+            'fields': ('age', 'gender', 'height', 'weight', 'bmi')
         }),
         ('Activity & Goals', {
             'fields': ('activity_level', 'goal', 'diet_type')
@@ -32,11 +147,10 @@ class UserProfileAdmin(admin.ModelAdmin):
     )
     
     def bmi_display(self, obj):
-        """Calculate and display BMI"""
-        height_m = obj.height / 100
-        bmi = obj.weight / (height_m ** 2)
-        return f"{bmi:.1f}"
+        """Display the stored BMI"""
+        return f"{obj.bmi:.1f}" if obj.bmi is not None else '-'
     bmi_display.short_description = 'BMI'
+    bmi_display.admin_order_field = 'bmi'
     
     def get_queryset(self, request):
         """Optimize queries"""
@@ -44,11 +158,12 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(DietRecommendation)
-class DietRecommendationAdmin(admin.ModelAdmin):
+class DietRecommendationAdmin(LargeTableAdmin):
     """Admin interface for Diet Recommendations"""
     list_display = ['user', 'bmi_category', 'bmi', 'diet_type', 'recommended_calories', 'created_at']
     list_filter = ['bmi_category', 'diet_type', 'created_at']
     search_fields = ['user__username', 'user__email', 'diet_plan_title']
+    search_index = 'recommendation'
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
     
@@ -71,13 +186,32 @@ class DietRecommendationAdmin(admin.ModelAdmin):
         """Optimize queries"""
         return super().get_queryset(request).select_related('user')
 
+    def get_urls(self):
+        drift = path('drift/', self.admin_site.admin_view(self.drift_view), name='diet_app_input_drift')
+        return [drift] + super().get_urls()
+
+    def drift_view(self, request):
+        """Calculator input distributions compared with the training data"""
+        try:
+            days = max(1, int(request.GET.get('days', '')))
+        except ValueError:
+            days = None
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Input drift',
+            'report': drift_report(days),
+        }
+        return TemplateResponse(request, 'admin/diet_app/drift_report.html', context)
+
 
 @admin.register(WeightLog)
-class WeightLogAdmin(admin.ModelAdmin):
+class WeightLogAdmin(LargeTableAdmin):
     """Admin interface for Weight Logs"""
     list_display = ['user', 'weight', 'date', 'has_notes']
     list_filter = ['date']
     search_fields = ['user__username', 'user__email', 'notes']
+    search_index = 'weight_log'
     readonly_fields = ['date']
     date_hierarchy = 'date'
     
@@ -101,7 +235,115 @@ class WeightLogAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Changelist for tables maintained by code, not edited by hand"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class RollupAdmin(ReadOnlyAdmin):
+    """Read-only changelist for rollup tables (maintained by diet_app.rollups)"""
+    list_filter = ['period']
+    date_hierarchy = 'period_start'
+
+
+@admin.register(RecommendationRollup)
+class RecommendationRollupAdmin(RollupAdmin):
+    """Admin interface for Recommendation Rollups, plus the population report page"""
+    list_display = ['period', 'period_start', 'bmi_category', 'diet_type', 'count', 'average_calories']
+    list_filter = ['period', 'bmi_category', 'diet_type']
+    change_list_template = 'admin/diet_app/recommendationrollup/change_list.html'
+
+    def average_calories(self, obj):
+        """Average recommended calories in the bucket"""
+        return obj.average_calories
+    average_calories.short_description = 'Avg Calories'
+
+    def get_urls(self):
+        report = path('report/', self.admin_site.admin_view(self.report_view), name='diet_app_population_report')
+        return [report] + super().get_urls()
+
+    def report_view(self, request):
+        """Recommendations per BMI category, average calories and active loggers per period"""
+        period = request.GET.get('period', 'day')
+        if period not in PERIODS:
+            period = 'day'
+        start, end = default_range(period, timezone.localdate())
+        try:
+            start = datetime.date.fromisoformat(request.GET.get('start') or start.isoformat())
+            end = datetime.date.fromisoformat(request.GET.get('end') or end.isoformat())
+        except ValueError:
+            self.message_user(request, 'Dates must be YYYY-MM-DD', level='error')
+        report = population_report(period, start, end)
+
+        categories = sorted({entry.bmi_category for entry in report['recommendations']})
+        rows = {}
+        for entry in report['recommendations']:
+            row = rows.setdefault(entry.period_start, {'counts': dict.fromkeys(categories, 0), 'total': 0, 'calories': 0})
+            row['counts'][entry.bmi_category] += entry.count
+            row['total'] += entry.count
+            row['calories'] += entry.average_calories * entry.count
+        for entry in report['active_loggers']:
+            rows.setdefault(entry.period_start, {'counts': dict.fromkeys(categories, 0), 'total': 0, 'calories': 0})
+            rows[entry.period_start]['active_users'] = entry.active_users
+        table = [
+            {
+                'period_start': day,
+                'counts': [row['counts'][category] for category in categories],
+                'total': row['total'],
+                'average_calories': round(row['calories'] / row['total']) if row['total'] else None,
+                'active_users': row.get('active_users', 0),
+            }
+            for day, row in sorted(rows.items(), reverse=True)
+        ]
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Population report',
+            'period': period,
+            'start': start,
+            'end': end,
+            'categories': categories,
+            'table': table,
+        }
+        return TemplateResponse(request, 'admin/diet_app/population_report.html', context)
+
+
+@admin.register(ActiveLoggerRollup)
+class ActiveLoggerRollupAdmin(RollupAdmin):
+    """Admin interface for Active Logger Rollups"""
+    list_display = ['period', 'period_start', 'active_users', 'log_count']
+
+
+@admin.register(ArchiveFile)
+class ArchiveFileAdmin(ReadOnlyAdmin):
+    """Admin interface for Archive Files (written by archive_old_rows)"""
+    list_display = ['kind', 'month', 'rows', 'size_display', 'path', 'created_at']
+    list_filter = ['kind']
+    date_hierarchy = 'month'
+
+    def size_display(self, obj):
+        """Compressed file size"""
+        return f"{obj.size_bytes / 1024:.0f} KB"
+    size_display.short_description = 'Size'
+    size_display.admin_order_field = 'size_bytes'
+
+
+@admin.register(DigestCheckpoint)
+class DigestCheckpointAdmin(ReadOnlyAdmin):
+    """Admin interface for Digest Checkpoints (written by send_weekly_digests)"""
+    list_display = ['week_start', 'shard', 'shards', 'sent', 'last_user_id', 'completed_at', 'updated_at']
+    list_filter = ['completed_at']
+
+
 # Customize admin site
 admin.site.site_header = "Smart Diet Recommendation Admin"
 admin.site.site_title = "Diet System Admin"
-admin.site.index_title = "Welcome to Diet Recommendation System Administration"
\ No newline at end of file
+admin.site.index_title = "Welcome to Diet Recommendation System Administration"
@@ -0,0 +1,13 @@
+"""
+App configuration for Diet Recommendation System
+"""
+
+from django.apps import AppConfig
+
+
+class DietAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'diet_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects receivers)
@@ -0,0 +1,235 @@
+"""
+Cold-storage archival for WeightLog and DietRecommendation
+
+Rows older than ARCHIVE_HORIZON_DAYS are moved, one calendar month at a time,
+into compressed NDJSON files under ARCHIVE_DIR (zstd when the zstandard
+package is installed, gzip otherwise) and deleted from the hot table. Each
+file is recorded in ArchiveFile, and per-user monthly aggregates are kept in
+ArchiveSummary so weight/BMI trends still cover archived months.
+
+A row edited or deleted while its month is being written out aborts that
+month (the file is discarded and the next run retries), so the hot table
+never loses a change the file does not hold. Archived months are read-only
+for the weight log sync (see archived_months).
+
+Archived rows are only read on explicit request (read_archived), using the
+user's summaries to open just the months that hold their rows. Reporting
+rollups already counted archived rows when they were written; note that
+`refresh_rollups --rebuild` recounts only the rows still in the hot tables.
+"""
+
+import datetime
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import ArchiveFile, ArchiveSummary, DietRecommendation, WeightLog
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# kind: (model, date field, summarized value field, archived columns)
+KINDS = {
+    'weight_log': (WeightLog, 'date', 'weight', ['user_id', 'id', 'weight', 'date', 'notes']),
+    'recommendation': (
+        DietRecommendation, 'created_at', 'bmi',
+        ['user_id', 'id', 'bmi', 'bmi_category', 'tdee', 'recommended_calories', 'diet_type',
+         'diet_plan_title', 'meals', 'tips', 'created_at'],
+    ),
+}
+
+
+def _suffix():
+    return '.ndjson.zst' if zstandard is not None else '.ndjson.gz'
+
+
+def _open_write(path):
+    if zstandard is not None:
+        return zstandard.open(path, 'wt', encoding='utf-8', cctx=zstandard.ZstdCompressor(level=10))
+    return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+
+
+def _open_read(path):
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f'{path} needs the zstandard package')
+        return zstandard.open(settings.ARCHIVE_DIR / path, 'rt', encoding='utf-8')
+    return gzip.open(settings.ARCHIVE_DIR / path, 'rt', encoding='utf-8')
+
+
+def _month_start(value):
+    if isinstance(value, datetime.datetime):
+        value = timezone.localtime(value).date()
+    return value.replace(day=1)
+
+
+def _next_month(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _bound(model, date_field, day):
+    """Filter value for a day boundary: a date, or local midnight for datetimes"""
+    if model._meta.get_field(date_field).get_internal_type() == 'DateTimeField':
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+    return day
+
+
+def archive_month(kind, month, cutoff, batch_size=10_000):
+    """Move one month's rows older than cutoff into an archive file; return rows moved"""
+    model, date_field, value_field, columns = KINDS[kind]
+    start = _bound(model, date_field, month)
+    end = _bound(model, date_field, min(_next_month(month), cutoff))
+    rows = model.objects.filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+
+    directory = settings.ARCHIVE_DIR / kind
+    directory.mkdir(parents=True, exist_ok=True)
+    ids = []
+    # Rows edited after this are kept (see the delete below)
+    snapshot = timezone.now()
+    # Several runs may archive the same month (e.g. backdated rows), so the
+    # first id makes the name unique.
+    first = rows.order_by('id').values_list('id', flat=True).first()
+    if first is None:
+        return 0
+    relative = f'{kind}/{month:%Y-%m}-{first}{_suffix()}'
+    path = settings.ARCHIVE_DIR / relative
+    with _open_write(f'{path}.tmp') as out:
+        for row in rows.order_by('user_id', 'id').values(*columns).iterator(chunk_size=batch_size):
+            out.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            out.write('\n')
+            ids.append(row['id'])
+    if not ids:  # deleted since the first query
+        os.remove(f'{path}.tmp')
+        return 0
+    os.replace(f'{path}.tmp', path)
+    ids.sort()
+
+    with transaction.atomic():
+        # New rows get higher ids, so this is exactly the set written above
+        grouped = rows.filter(id__lte=ids[-1])
+        totals = {
+            row['user_id']: row
+            for row in grouped.values('user_id').annotate(
+                count=Count('id'), total=Sum(value_field), low=Min(value_field), high=Max(value_field),
+            ).order_by()
+        }
+        existing = {
+            summary.user_id: summary
+            for summary in ArchiveSummary.objects.filter(kind=kind, month=month, user_id__in=list(totals))
+        }
+        summaries = []
+        for user_id, row in totals.items():
+            summary = existing.get(user_id) or ArchiveSummary(
+                user_id=user_id, kind=kind, month=month, row_count=0, value_sum=0,
+                value_min=row['low'], value_max=row['high'],
+            )
+            summary.row_count += row['count']
+            summary.value_sum += row['total']
+            summary.value_min = min(summary.value_min, row['low'])
+            summary.value_max = max(summary.value_max, row['high'])
+            summaries.append(summary)
+        ArchiveSummary.objects.bulk_create(
+            summaries, batch_size=500, update_conflicts=True,
+            unique_fields=['user', 'kind', 'month'],
+            update_fields=['row_count', 'value_sum', 'value_min', 'value_max'],
+        )
+        ArchiveFile.objects.create(
+            kind=kind, month=month, path=relative, rows=len(ids), size_bytes=path.stat().st_size,
+        )
+        exported = rows
+        if any(field.name == 'updated_at' for field in model._meta.get_fields()):
+            exported = rows.filter(updated_at__lte=snapshot)
+        deleted = 0
+        for offset in range(0, len(ids), batch_size):
+            chunk = ids[offset:offset + batch_size]
+            deleted += exported.filter(id__gte=chunk[0], id__lte=chunk[-1]).delete()[1].get(model._meta.label, 0)
+        if deleted != len(ids):
+            # Edited or deleted since the export: roll back and retry next run
+            transaction.set_rollback(True)
+    if deleted != len(ids):
+        os.remove(path)
+        return 0
+    return len(ids)
+
+
+def months_to_archive(kind, cutoff):
+    """Month starts holding rows older than cutoff, oldest first"""
+    model, date_field, _, _ = KINDS[kind]
+    oldest = model.objects.filter(**{f'{date_field}__lt': _bound(model, date_field, cutoff)}).aggregate(
+        oldest=Min(date_field),
+    )['oldest']
+    if oldest is None:
+        return []
+    months = []
+    month = _month_start(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def archived_months(kind, user, months):
+    """The months among months in which user has archived rows of kind"""
+    return set(
+        ArchiveSummary.objects.filter(kind=kind, user=user, month__in={_month_start(month) for month in months})
+        .values_list('month', flat=True)
+    )
+
+
+def read_archived(kind, user, start=None, end=None):
+    """Yield a user's archived rows (dicts, oldest month first), optionally for months in [start, end]"""
+    summaries = ArchiveSummary.objects.filter(kind=kind, user=user)
+    if start is not None:
+        summaries = summaries.filter(month__gte=_month_start(start))
+    if end is not None:
+        summaries = summaries.filter(month__lte=_month_start(end))
+    months = list(summaries.values_list('month', flat=True))
+    if not months:
+        return
+    for archive in ArchiveFile.objects.filter(kind=kind, month__in=months).order_by('month', 'id'):
+        with _open_read(archive.path) as lines:
+            # Files are sorted by user: stop after the user's last row
+            found = False
+            for line in lines:
+                row = json.loads(line)
+                if row['user_id'] == user.pk:
+                    found = True
+                    yield row
+                elif found:
+                    break
+
+
+def table_size_bytes(model):
+    """On-disk size of a table and its indexes, or None where unsupported"""
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT pg_total_relation_size(%s::regclass)', [table]),
+        'mysql': (
+            'SELECT data_length + index_length FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s',
+            [table],
+        ),
+        # Needs SQLite built with dbstat (the Python and most distro builds are)
+        'sqlite': (
+            'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+            '(SELECT name FROM sqlite_master WHERE tbl_name = %s)',
+            [table],
+        ),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return row[0] if row else None
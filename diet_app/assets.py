@@ -0,0 +1,146 @@
+"""
+Static asset build helpers (unused-CSS purging and bundling)
+"""
+
+import os
+import re
+from pathlib import Path
+
+# Classes that are never written literally in templates: Bootstrap JS toggles
+# them at runtime and `alert-{{ message.tags }}` expands to message levels.
+SAFELIST = {
+    'show', 'showing', 'hiding', 'collapsing', 'collapse', 'collapsed', 'fade',
+    'active', 'disabled', 'is-invalid', 'is-valid', 'invalid-feedback',
+    'alert-success', 'alert-info', 'alert-warning', 'alert-danger', 'alert-error',
+    'errorlist', 'helptext',
+}
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"')
+WIDGET_CLASS_RE = re.compile(r"""['"]class['"]\s*:\s*['"]([^'"]*)['"]""")
+TEMPLATE_TAG_RE = re.compile(r'{[{%].*?[}%]}')
+SELECTOR_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+NOT_RE = re.compile(r':not\([^()]*\)')
+URL_RE = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+
+# At-rules whose blocks hold nested rules rather than declarations
+NESTED_AT_RULES = ('@media', '@supports', '@container', '@layer')
+
+
+def collect_used_classes(paths):
+    """Collect every literal CSS class referenced by templates and form widgets"""
+    used = set(SAFELIST)
+    for base in paths:
+        base = Path(base)
+        files = [base] if base.is_file() else list(base.rglob('*.html')) + list(base.rglob('*.py'))
+        for path in files:
+            text = path.read_text(encoding='utf-8')
+            for value in CLASS_ATTR_RE.findall(text) + WIDGET_CLASS_RE.findall(text):
+                used.update(TEMPLATE_TAG_RE.sub(' ', value).split())
+    return used
+
+
+def _split_blocks(css):
+    """Yield (prelude, body) for each top-level rule; body is None for statements"""
+    i, start, n = 0, 0, len(css)
+    while i < n:
+        ch = css[i]
+        if css.startswith('/*', i):
+            end = css.index('*/', i) + 2
+            if not css[start:i].strip():
+                yield css[i:end], None
+                start = end
+            i = end
+            continue
+        if ch in '"\'':
+            i = css.index(ch, i + 1) + 1
+            continue
+        if ch == ';' and css[start:i].lstrip().startswith('@'):
+            yield css[start:i + 1].strip(), None
+            start = i = i + 1
+            continue
+        if ch == '{':
+            depth, j = 1, i + 1
+            while depth:
+                c = css[j]
+                if c in '"\'':
+                    j = css.index(c, j + 1)
+                elif c == '{':
+                    depth += 1
+                elif c == '}':
+                    depth -= 1
+                j += 1
+            yield css[start:i].strip(), css[i + 1:j - 1]
+            start = i = j
+            continue
+        i += 1
+
+
+def _split_selectors(prelude):
+    """Split a selector list on top-level commas"""
+    parts, depth, current = [], 0, []
+    for ch in prelude:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and not depth:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current))
+    return parts
+
+
+def _selector_used(selector, used):
+    """A selector may match only if every class it requires is in use"""
+    classes = SELECTOR_CLASS_RE.findall(NOT_RE.sub('', selector))
+    return all(name in used for name in classes)
+
+
+def purge_css(css, used):
+    """Drop rules whose selectors reference classes no template uses"""
+    out = []
+    for prelude, body in _split_blocks(css):
+        if body is None:
+            if not prelude.startswith('@charset'):
+                out.append(prelude)
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = purge_css(body, used)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if _selector_used(s, used)]
+            if selectors:
+                out.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(out)
+
+
+def rebase_urls(css, source_dir, target_dir):
+    """Rewrite relative url() references so they resolve from target_dir"""
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '/', '#')):
+            return match.group(0)
+        absolute = (Path(source_dir) / url).resolve()
+        relative = Path(os.path.relpath(absolute, Path(target_dir).resolve()))
+        return f'url({quote}{relative.as_posix()}{quote})'
+    return URL_RE.sub(replace, css)
+
+
+def build_bundle(sources, target, used):
+    """Concatenate (path, purge) CSS sources into one bundle written to target"""
+    target = Path(target)
+    parts = []
+    for source, purge in sources:
+        source = Path(source)
+        css = COMMENT_RE.sub('', source.read_text(encoding='utf-8'))
+        css = rebase_urls(css, source.parent, target.parent)
+        parts.append(purge_css(css, used) if purge else css.strip())
+    bundle = '@charset "UTF-8";\n' + '\n'.join(parts) + '\n'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(bundle, encoding='utf-8')
+    return bundle
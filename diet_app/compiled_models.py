@@ -0,0 +1,231 @@
+"""
+Compiled scikit-learn models for Diet Recommendation System
+
+compile_estimator() flattens a fitted tree ensemble or linear model into plain
+NumPy arrays (node tables or coefficient vectors); CompiledModel evaluates
+them without scikit-learn. Single rows are scored by a pure-Python walk over
+lists (no array allocation, no input validation), batches by walking every
+row and tree at once with NumPy indexing.
+
+Supported: DecisionTree, RandomForest and ExtraTrees classifiers/regressors,
+GradientBoostingRegressor, LinearRegression/Ridge/Lasso/ElasticNet and
+LogisticRegression. Results match the original estimator's predict(): tree
+inputs are rounded to float32 as scikit-learn does, and aggregation follows
+the same order of operations.
+
+CompiledModel.predict() takes the same 2-D input as the estimator, so it is a
+drop-in replacement for the unpickled model.
+"""
+
+import json
+from array import array
+
+import numpy as np
+
+TREE_LEAF = -1
+SINGLE_ROW_LIMIT = 16
+
+
+def compile_estimator(estimator):
+    """Flatten a fitted estimator into a dict of NumPy arrays (see save_compiled)"""
+    name = type(estimator).__name__
+    if hasattr(estimator, 'coef_'):
+        return _compile_linear(estimator, name)
+    if name in ('DecisionTreeClassifier', 'DecisionTreeRegressor'):
+        trees, aggregate, scale, bias = [estimator], 'sum', 1.0, 0.0
+    elif name in ('RandomForestClassifier', 'RandomForestRegressor', 'ExtraTreesClassifier', 'ExtraTreesRegressor'):
+        trees, aggregate, scale, bias = list(estimator.estimators_), 'mean', 1.0, 0.0
+    elif name == 'GradientBoostingRegressor':
+        trees, aggregate, scale = [stage[0] for stage in estimator.estimators_], 'sum', estimator.learning_rate
+        if estimator.init_ == 'zero':
+            bias = 0.0
+        else:
+            bias = float(estimator.init_.predict(np.zeros((1, estimator.n_features_in_)))[0])
+    else:
+        raise TypeError(f'Cannot compile {name}')
+
+    is_classifier = hasattr(estimator, 'classes_')
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = depth = 0
+    for tree in trees:
+        t = tree.tree_
+        roots.append(offset)
+        is_leaf = t.children_left == TREE_LEAF
+        left.append(np.where(is_leaf, TREE_LEAF, t.children_left + offset))
+        right.append(np.where(is_leaf, TREE_LEAF, t.children_right + offset))
+        feature.append(np.where(is_leaf, 0, t.feature))  # 0 keeps batch indexing valid at leaves
+        threshold.append(t.threshold)
+        if is_classifier:
+            counts = t.value[:, 0, :]
+            if aggregate == 'mean':  # forests average per-tree class probabilities
+                counts = counts / counts.sum(axis=1, keepdims=True)
+            value.append(counts)
+        else:
+            value.append(t.value[:, 0, :1] * scale if scale != 1.0 else t.value[:, 0, :1])
+        offset += t.node_count
+        depth = max(depth, t.max_depth)
+
+    meta = {'estimator': name, 'type': 'tree', 'aggregate': aggregate, 'bias': bias,
+            'n_features': int(estimator.n_features_in_), 'depth': int(depth)}
+    compiled = {
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    if is_classifier:
+        compiled['classes'] = _classes(estimator)
+    compiled['meta'] = np.array(json.dumps(meta))
+    return compiled
+
+
+def _classes(estimator):
+    """classes_ without object dtype, so files load with allow_pickle=False"""
+    return np.asarray(estimator.classes_.tolist())
+
+
+def _compile_linear(estimator, name):
+    coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=np.float64))
+    intercept = np.atleast_1d(np.asarray(estimator.intercept_, dtype=np.float64))
+    meta = {'estimator': name, 'type': 'linear', 'n_features': int(estimator.n_features_in_)}
+    compiled = {'coef': coef, 'intercept': intercept}
+    if hasattr(estimator, 'classes_'):
+        compiled['classes'] = _classes(estimator)
+    compiled['meta'] = np.array(json.dumps(meta))
+    return compiled
+
+
+def compile_label_encoder(encoder):
+    """A fitted LabelEncoder only needs its classes_"""
+    return {'classes': _classes(encoder), 'meta': np.array(json.dumps({'estimator': 'LabelEncoder', 'type': 'labels'}))}
+
+
+def save_compiled(compiled, path):
+    np.savez(path, **compiled)
+
+
+def load_compiled(path):
+    """Load a file written by save_compiled as a CompiledModel or CompiledLabelEncoder"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    if meta['type'] == 'labels':
+        return CompiledLabelEncoder(arrays['classes'])
+    return CompiledModel(meta, arrays)
+
+
+class CompiledLabelEncoder:
+    """transform/inverse_transform of a LabelEncoder without scikit-learn"""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+        self._index = {label: index for index, label in enumerate(classes.tolist())}
+
+    def transform(self, labels):
+        return np.array([self._index[label] for label in labels])
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes)]
+
+
+class CompiledModel:
+    """Evaluate a compiled estimator on single rows or batches"""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.n_features = meta['n_features']
+        self.classes_ = arrays.get('classes')
+        self._classes = None if self.classes_ is None else self.classes_.tolist()
+        if meta['type'] == 'linear':
+            self.coef = arrays['coef']
+            self.intercept = arrays['intercept']
+            self._coef = self.coef.tolist()
+            self._intercept = self.intercept.tolist()
+            return
+        self.left, self.right = arrays['left'], arrays['right']
+        self.feature, self.threshold = arrays['feature'], arrays['threshold']
+        self.value, self.roots = arrays['value'], arrays['roots']
+        self.bias = meta['bias']
+        self.mean = meta['aggregate'] == 'mean'
+        # Leaves point at themselves for the batch walk, so every row can take
+        # `depth` steps without masking out the ones that already arrived.
+        nodes = np.arange(len(self.left), dtype=np.int32)
+        leaf = self.left == TREE_LEAF
+        self._batch_left = np.where(leaf, nodes, self.left)
+        self._batch_right = np.where(leaf, nodes, self.right)
+        # Python lists for the single-row walk: indexing a list is several
+        # times cheaper than indexing a NumPy array from Python.
+        self._nodes = list(zip(self.left.tolist(), self.right.tolist(), self.feature.tolist(),
+                               self.threshold.tolist()))
+        self._values = self.value.tolist()
+        self._roots = self.roots.tolist()
+
+    # Single row --------------------------------------------------------------
+
+    def predict_one(self, row):
+        """Predict one row (a sequence of n_features numbers)"""
+        if self.meta['type'] == 'linear':
+            return self._linear_one(row)
+        x = array('f', row)  # float32, as scikit-learn trees see their input
+        nodes, values = self._nodes, self._values
+        if self._classes is None:  # single output; boosting starts from its baseline
+            total = self.bias
+            for node in self._roots:
+                left, right, feature, threshold = nodes[node]
+                while left != TREE_LEAF:
+                    node = left if x[feature] <= threshold else right
+                    left, right, feature, threshold = nodes[node]
+                total += values[node][0]
+            return total / len(self._roots) if self.mean else total
+
+        totals = [0.0] * len(self._classes)
+        for node in self._roots:
+            left, right, feature, threshold = nodes[node]
+            while left != TREE_LEAF:
+                node = left if x[feature] <= threshold else right
+                left, right, feature, threshold = nodes[node]
+            totals = [total + v for total, v in zip(totals, values[node])]
+        if self.mean:
+            totals = [total / len(self._roots) for total in totals]
+        return self._classes[max(range(len(totals)), key=totals.__getitem__)]
+
+    def _linear_one(self, row):
+        scores = [sum(c * x for c, x in zip(coef, row)) + b for coef, b in zip(self._coef, self._intercept)]
+        if self._classes is None:
+            return scores[0]
+        if len(scores) == 1:  # binary LogisticRegression
+            return self._classes[1 if scores[0] > 0 else 0]
+        return self._classes[max(range(len(scores)), key=scores.__getitem__)]
+
+    # Batches -----------------------------------------------------------------
+
+    def predict(self, X):
+        """Predict a 2-D array of rows, like the original estimator's predict()"""
+        X = np.asarray(X)
+        if self.meta['type'] == 'linear':
+            scores = X.astype(np.float64) @ self.coef.T + self.intercept
+            if self.classes_ is None:
+                return scores[:, 0]
+            if scores.shape[1] == 1:
+                return self.classes_[(scores[:, 0] > 0).astype(int)]
+            return self.classes_[scores.argmax(axis=1)]
+
+        if len(X) <= SINGLE_ROW_LIMIT:  # NumPy call overhead dominates tiny batches
+            return np.array([self.predict_one(row) for row in X.tolist()])
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.meta['depth']):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self._batch_left[nodes], self._batch_right[nodes])
+        leaves = self.value[nodes]  # (rows, trees, outputs)
+        totals = np.full((len(X), leaves.shape[2]), self.bias)
+        for tree in range(leaves.shape[1]):  # accumulate in tree order, as scikit-learn does
+            totals += leaves[:, tree]
+        if self.mean:
+            totals /= leaves.shape[1]
+        if self.classes_ is None:
+            return totals[:, 0]
+        return self.classes_[totals.argmax(axis=1)]
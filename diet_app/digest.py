@@ -0,0 +1,174 @@
+"""
+Weekly progress digests for Diet Recommendation System
+
+send_digests() emails every active user (a weight log or recommendation in
+the week) a summary of their week: weight change, latest recommendation and
+progress towards their goal. Users are streamed in id order, CHUNK_SIZE at a
+time, and each chunk costs a constant number of queries however many users
+it holds:
+
+1. the users, with their profile, weight before the week and latest
+   recommendation id as correlated subqueries;
+2. their weight logs for the week;
+3. their latest recommendations.
+
+The template is compiled once per run and every chunk is sent over one
+connection of the configured email backend. Work can be split into shards
+(user id modulo shards) run by separate processes; each shard records the
+last user id it sent in a DigestCheckpoint after every chunk, so a rerun
+resumes there. A crash between sending a chunk and saving its checkpoint
+re-sends that chunk: delivery is at least once.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.db.models.functions import Mod
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import DietRecommendation, DigestCheckpoint, WeightLog
+
+CHUNK_SIZE = 500
+TEMPLATE = 'emails/weekly_digest.txt'
+# Weekly change (kg) below which a 'maintain' goal counts as on track
+MAINTAIN_TOLERANCE = 0.5
+
+
+def last_week(today=None):
+    """Monday of the most recent completed week"""
+    today = today or timezone.localdate()
+    return today - datetime.timedelta(days=today.weekday() + 7)
+
+
+def active_users(week_start, shard=0, shards=1):
+    """Users with an email address and activity in the week, in id order"""
+    week_end = week_start + datetime.timedelta(days=7)
+    start, end = (timezone.make_aware(datetime.datetime.combine(day, datetime.time())) for day in (week_start, week_end))
+    users = User.objects.filter(is_active=True).exclude(email='').filter(
+        Exists(WeightLog.objects.filter(user=OuterRef('pk'), date__gte=week_start, date__lt=week_end))
+        | Exists(DietRecommendation.objects.filter(user=OuterRef('pk'), created_at__gte=start, created_at__lt=end))
+    )
+    if shards > 1:
+        users = users.alias(shard=Mod(F('id'), shards)).filter(shard=shard)
+    return users.order_by('id')
+
+
+def _chunk(week_start, shard, shards, after_id, size):
+    """Users after after_id with everything their digest needs, in 3 queries"""
+    week_end = week_start + datetime.timedelta(days=7)
+    users = list(
+        active_users(week_start, shard, shards).filter(id__gt=after_id)
+        .select_related('profile')
+        .annotate(
+            previous_weight=Subquery(
+                WeightLog.objects.filter(user=OuterRef('pk'), date__lt=week_start)
+                .order_by('-date').values('weight')[:1]
+            ),
+            latest_recommendation_id=Subquery(
+                DietRecommendation.objects.filter(user=OuterRef('pk')).order_by('-id').values('id')[:1]
+            ),
+        )[:size]
+    )
+    if not users:
+        return []
+    logs = {}
+    for user_id, date, weight in (
+        WeightLog.objects.filter(user__in=users, date__gte=week_start, date__lt=week_end)
+        .order_by('user_id', 'date').values_list('user_id', 'date', 'weight')
+    ):
+        logs.setdefault(user_id, []).append((date, weight))
+    recommendations = DietRecommendation.objects.in_bulk(
+        [user.latest_recommendation_id for user in users if user.latest_recommendation_id]
+    )
+    return [
+        (user, logs.get(user.pk, []), recommendations.get(user.latest_recommendation_id))
+        for user in users
+    ]
+
+
+def week_context(week_start):
+    """Context shared by every digest of a week, formatted once per run"""
+    return {'week': f'{_day(week_start)} - {_day(week_start + datetime.timedelta(days=6))}'}
+
+
+def _day(value):
+    return f'{value:%b} {value.day}'
+
+
+def digest_context(user, logs, recommendation, week):
+    """Template context for one user's digest (week from week_context)"""
+    profile = getattr(user, 'profile', None)
+    goal = profile.goal if profile else None
+    start_weight = user.previous_weight if user.previous_weight is not None else (logs[0][1] if logs else None)
+    end_weight = logs[-1][1] if logs else None
+    change = round(end_weight - start_weight, 1) if start_weight is not None and end_weight is not None else None
+    if change is None or goal is None:
+        on_track = None
+    elif goal == 'lose':
+        on_track = change < 0
+    elif goal == 'gain':
+        on_track = change > 0
+    else:
+        on_track = abs(change) <= MAINTAIN_TOLERANCE
+    return {
+        **week,
+        'name': user.first_name or user.username,
+        'log_count': len(logs),
+        'end_weight': end_weight,
+        'change': f'{change:+.1f}' if change is not None else None,
+        'goal': profile.get_goal_display() if profile else None,
+        'on_track': on_track,
+        'recommendation': recommendation,
+        'recommended_on': _day(timezone.localtime(recommendation.created_at)) if recommendation else None,
+    }
+
+
+def send_digests(week_start, shard=0, shards=1, chunk_size=CHUNK_SIZE, dry_run=False, restart=False, progress=None):
+    """Send (or with dry_run, only render) one shard's digests; return the number handled.
+
+    Resumes from the shard's checkpoint unless restart is set; a completed
+    shard sends nothing. progress, if given, is called with the shard's
+    running total after each chunk.
+    """
+    checkpoint = (
+        DigestCheckpoint.objects.filter(week_start=week_start, shard=shard, shards=shards).first()
+        or DigestCheckpoint(week_start=week_start, shard=shard, shards=shards)
+    )
+    if restart:
+        checkpoint.last_user_id, checkpoint.sent, checkpoint.completed_at = 0, 0, None
+    elif checkpoint.completed_at is not None:
+        return 0
+
+    template = get_template(TEMPLATE)  # compiled once, rendered per user
+    week = week_context(week_start)
+    subject = f'Your week in review: {week["week"]}'
+    handled = 0
+    last_id = checkpoint.last_user_id
+    while chunk := _chunk(week_start, shard, shards, last_id, chunk_size):
+        messages = [
+            EmailMessage(
+                subject, template.render(digest_context(user, logs, recommendation, week)),
+                settings.DEFAULT_FROM_EMAIL, [user.email],
+            )
+            for user, logs, recommendation in chunk
+        ]
+        last_id = chunk[-1][0].pk
+        handled += len(messages)
+        if dry_run:
+            continue
+        with get_connection() as connection:  # one connection per chunk
+            connection.send_messages(messages)
+        checkpoint.last_user_id = last_id
+        checkpoint.sent += len(messages)
+        checkpoint.save()
+        if progress:
+            progress(checkpoint.sent)
+
+    if not dry_run:
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save()
+    return handled
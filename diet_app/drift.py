@@ -0,0 +1,300 @@
+"""
+Input drift monitoring for Diet Recommendation System
+
+Each worker keeps one fixed-size sketch of the calculator inputs it has
+served: a histogram per numeric field (one bucket per unit between the form's
+bounds, e.g. 150 one-centimetre buckets for height) and a counter per choice
+for categorical fields. Inputs are validated against the same bounds, so the
+histograms are exact, merge by addition and never grow; observing a request
+is a handful of list increments.
+
+Sketches are flushed at most every DRIFT_FLUSH_SECONDS to
+DRIFT_DIR/<date>/<host>-<pid>.json (one file per worker per day, replaced
+atomically). Day directories older than DRIFT_RETENTION_DAYS (never less
+than the window) are removed by each worker's first flush of a day.
+drift_report() adds up the files of the last DRIFT_WINDOW_DAYS
+and compares them with the reference sketch of the training data
+(`manage.py build_drift_reference`) using the population stability index
+per field and, for numeric fields, the Kolmogorov-Smirnov statistic.
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import math
+import os
+import shutil
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from .validation import FIELD_SPECS
+
+logger = logging.getLogger(__name__)
+
+# PSI conventions: below 0.1 stable, 0.1-0.25 moderate shift, above significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_BUCKETS = 10  # numeric fields are compared over reference deciles
+MIN_SAMPLES = 100
+EPSILON = 1e-4  # floor for empty buckets in PSI
+
+
+class Sketch:
+    """Mergeable per-field counts of calculator inputs"""
+
+    def __init__(self, counts=None):
+        self.counts = counts or {
+            name: [0] * (round(high - low) if choices is None else len(choices))
+            for name, _, low, high, choices in FIELD_SPECS
+        }
+        # (counts, low, last bucket) for numeric fields, (counts, choice index)
+        # for categorical ones, in argument order; the lists are updated in place
+        self._numeric, self._categorical = [], []
+        for position, (name, _, low, _, choices) in enumerate(FIELD_SPECS):
+            counts = self.counts[name]
+            if choices is None:
+                self._numeric.append((position, counts, low, len(counts) - 1))
+            else:
+                self._categorical.append((position, counts, {choice: i for i, choice in enumerate(choices)}))
+
+    @property
+    def total(self):
+        return sum(self.counts[FIELD_SPECS[0][0]])
+
+    def observe(self, args):
+        """Count one input, given as DietPredictor.predict() arguments"""
+        for position, counts, low, last in self._numeric:
+            bucket = int(args[position] - low)
+            counts[bucket if 0 <= bucket <= last else (0 if bucket < 0 else last)] += 1
+        for position, counts, index in self._categorical:
+            bucket = index.get(args[position])
+            if bucket is not None:
+                counts[bucket] += 1
+
+    def merge(self, other):
+        for name, counts in other.counts.items():
+            mine = self.counts.get(name)
+            if mine is not None and len(mine) == len(counts):
+                for bucket, count in enumerate(counts):
+                    mine[bucket] += count
+
+    def to_json(self):
+        return json.dumps({'counts': self.counts})
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text)['counts'])
+
+
+class DriftMonitor:
+    """This worker's sketch for the current day, flushed to DRIFT_DIR"""
+
+    def __init__(self, directory, flush_seconds, retention_days):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pruned_day = None
+        self._start_day(time.time())
+
+    def _start_day(self, now):
+        self.sketch = Sketch()
+        self.day = datetime.date.fromtimestamp(now)
+        midnight = datetime.datetime.combine(self.day + datetime.timedelta(days=1), datetime.time())
+        self._rollover = midnight.timestamp()
+        self._next_flush = now + self.flush_seconds
+
+    def observe(self, args):
+        now = time.time()
+        with self._lock:
+            if now >= self._rollover:
+                self._flush()
+                self._start_day(now)
+            self.sketch.observe(args)
+            self._dirty = True
+            if now >= self._next_flush:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._next_flush = time.time() + self.flush_seconds
+        if not self._dirty:
+            return
+        if self._pruned_day != self.day:
+            prune(self.directory, self.retention_days, self.day)
+            self._pruned_day = self.day
+        directory = self.directory / self.day.isoformat()
+        directory.mkdir(parents=True, exist_ok=True)
+        # The pid changes after fork, so each worker writes its own file
+        path = directory / f'{socket.gethostname()}-{os.getpid()}.json'
+        with open(f'{path}.tmp', 'w') as f:
+            f.write(self.sketch.to_json())
+        os.replace(f'{path}.tmp', path)
+        self._dirty = False
+
+
+def prune(directory, retention_days, today):
+    """Remove the day directories under directory older than retention_days; return how many"""
+    first = today - datetime.timedelta(days=retention_days - 1)
+    removed = 0
+    if not directory.is_dir():
+        return removed
+    for path in directory.iterdir():
+        try:
+            day = datetime.date.fromisoformat(path.name)
+        except ValueError:
+            continue
+        if day < first and path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)  # another worker may be removing it too
+            removed += 1
+    return removed
+
+
+def _build_monitor():
+    if not settings.DRIFT_MONITORING:
+        return None
+    retention_days = max(settings.DRIFT_RETENTION_DAYS, settings.DRIFT_WINDOW_DAYS)
+    return DriftMonitor(settings.DRIFT_DIR, settings.DRIFT_FLUSH_SECONDS, retention_days)
+
+
+monitor = _build_monitor()
+if monitor is not None:
+    atexit.register(monitor.flush)
+
+
+def observe(args):
+    """Count one live calculator input (no-op when DRIFT_MONITORING is off)"""
+    if monitor is not None:
+        try:
+            monitor.observe(args)
+        except OSError as e:  # an unwritable DRIFT_DIR must not fail requests
+            logger.warning('Drift sketch not flushed: %s', e)
+
+
+def live_sketch(days=None):
+    """Merge the flushed sketches of the last `days` days (this worker flushes first)"""
+    if monitor is not None:
+        monitor.flush()
+    days = settings.DRIFT_WINDOW_DAYS if days is None else days
+    first = datetime.date.today() - datetime.timedelta(days=days - 1)
+    merged = Sketch()
+    if not settings.DRIFT_DIR.is_dir():
+        return merged
+    for directory in settings.DRIFT_DIR.iterdir():
+        try:
+            day = datetime.date.fromisoformat(directory.name)
+        except ValueError:
+            continue
+        if day >= first:
+            for path in directory.glob('*.json'):
+                merged.merge(Sketch.from_json(path.read_text()))
+    return merged
+
+
+def load_reference():
+    """The training-data sketch, or None if it has not been built"""
+    try:
+        return Sketch.from_json(settings.DRIFT_REFERENCE_PATH.read_text())
+    except OSError:
+        return None
+
+
+def _proportions(counts):
+    total = sum(counts)
+    return [count / total for count in counts] if total else [0.0] * len(counts)
+
+
+def _decile_groups(reference):
+    """Split fine buckets into up to PSI_BUCKETS groups of ~equal reference mass"""
+    groups, start, cumulative = [], 0, 0.0
+    for index, share in enumerate(_proportions(reference)):
+        cumulative += share
+        if cumulative >= (len(groups) + 1) / PSI_BUCKETS - 1e-9 and len(groups) < PSI_BUCKETS - 1:
+            groups.append((start, index + 1))
+            start = index + 1
+    groups.append((start, len(reference)))
+    return groups
+
+
+def psi(live, reference):
+    """Population stability index between two lists of bucket proportions"""
+    return sum(
+        (max(p, EPSILON) - max(q, EPSILON)) * math.log(max(p, EPSILON) / max(q, EPSILON))
+        for p, q in zip(live, reference)
+    )
+
+
+def ks(live, reference):
+    """Largest CDF difference between two lists of bucket proportions"""
+    distance = cumulative_live = cumulative_reference = 0.0
+    for p, q in zip(live, reference):
+        cumulative_live += p
+        cumulative_reference += q
+        distance = max(distance, abs(cumulative_live - cumulative_reference))
+    return distance
+
+
+def _quantile(counts, low, q):
+    """Bucket-resolution quantile of a numeric histogram"""
+    target, cumulative = q * sum(counts), 0
+    for index, count in enumerate(counts):
+        cumulative += count
+        if count and cumulative >= target:
+            return low + index + 0.5
+    return None
+
+
+def compare(live, reference):
+    """Per-field drift statistics of a live sketch against the reference"""
+    fields = []
+    for name, _, low, _, choices in FIELD_SPECS:
+        reference_counts = reference.counts.get(name)
+        if not reference_counts or not sum(reference_counts):
+            continue  # not in the training data (goal, diet type)
+        live_counts = live.counts[name]
+        if choices is None:
+            groups = _decile_groups(reference_counts)
+            live_p = _proportions([sum(live_counts[a:b]) for a, b in groups])
+            reference_p = _proportions([sum(reference_counts[a:b]) for a, b in groups])
+        else:
+            live_p, reference_p = _proportions(live_counts), _proportions(reference_counts)
+        entry = {'field': name, 'samples': sum(live_counts), 'psi': round(psi(live_p, reference_p), 4)}
+        if choices is None:
+            fine_live, fine_reference = _proportions(live_counts), _proportions(reference_counts)
+            entry['ks'] = round(ks(fine_live, fine_reference), 4)
+            entry['median'] = _quantile(live_counts, low, 0.5)
+            entry['reference_median'] = _quantile(reference_counts, low, 0.5)
+        else:
+            entry['shares'] = {choice: round(share, 3) for choice, share in zip(choices, live_p)}
+            entry['reference_shares'] = {choice: round(share, 3) for choice, share in zip(choices, reference_p)}
+        if entry['samples'] < MIN_SAMPLES:
+            entry['status'] = 'insufficient data'
+        elif entry['psi'] >= PSI_SIGNIFICANT:
+            entry['status'] = 'significant'
+        elif entry['psi'] >= PSI_MODERATE:
+            entry['status'] = 'moderate'
+        else:
+            entry['status'] = 'stable'
+        fields.append(entry)
+    return fields
+
+
+def drift_report(days=None):
+    """Drift statistics for the last `days` days, or None without a reference sketch"""
+    reference = load_reference()
+    if reference is None:
+        return None
+    live = live_sketch(days)
+    return {
+        'days': settings.DRIFT_WINDOW_DAYS if days is None else days,
+        'samples': live.total,
+        'fields': compare(live, reference),
+    }
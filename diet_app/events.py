@@ -0,0 +1,394 @@
+"""
+Live dashboard updates for Diet Recommendation System
+
+When a user's weight logs or recommendations change, a small event (the
+changed table rows, rendered with the dashboard's own row templates, and the
+new totals) is published after the transaction commits. The dashboard holds
+one Server-Sent Events stream (`/api/events/`, an async view) and patches
+its tables in place, so it never reloads or polls.
+
+Open streams are subscriptions in an in-process hub, keyed by user id; each
+one owns a bounded asyncio queue on its event loop, and publishers on any
+thread hand events over with call_soon_threadsafe(). A stream whose queue
+fills up is reset: its pending events are dropped and the client is told to
+reload instead.
+
+With LIVE_UPDATES['broker'] = 'memory' only streams served by the
+publishing process see an event, which is enough for a single ASGI worker.
+'socket' fans events out to every process on the host: each process serving
+streams binds a Unix datagram socket in LIVE_UPDATES['socket_dir'], and
+publishers send each event to every socket there. It is a stand-in for a
+real broker (Redis pub/sub) when workers span hosts.
+
+Events missed while a client reconnects are not replayed; a reconnecting
+stream starts with a snapshot of the dashboard tables instead.
+
+diet_project.asgi serves the stream path with StreamApplication rather than
+through Django's handler, which in Django 4.2 keeps a thread per open
+stream and never notices a client going away.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.http import HttpRequest
+from django.http.request import split_domain_port, validate_host
+from django.http.cookie import parse_cookie
+from django.template.loader import render_to_string
+
+from .metrics import Metrics
+from .models import DietRecommendation, WeightLog
+
+# Rows shown by the dashboard tables
+RECENT_RECOMMENDATIONS = 5
+RECENT_WEIGHT_LOGS = 10
+
+RESET = object()  # queued in place of dropped events
+
+
+class Subscription:
+    """One open event stream"""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, message):
+        """Queue an encoded event; runs on the stream's event loop"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+            self.overflowed = True
+
+
+class EventHub:
+    """Open streams of this process by user id"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.metrics = Metrics()
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Register a stream for user_id; call from the stream's event loop"""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscriptions.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self._subscriptions[subscription.user_id]
+        if subscription.overflowed:
+            self.metrics.incr('reset')
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscriptions
+
+    def deliver(self, user_id, message):
+        """Hand an encoded event to user_id's streams in this process; safe from any thread"""
+        with self._lock:
+            streams = list(self._subscriptions.get(user_id, ()))
+        for subscription in streams:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:  # the stream's loop has shut down
+                pass
+        if streams:
+            self.metrics.incr('delivered', len(streams))
+
+    def snapshot(self):
+        counts = self.metrics.snapshot()
+        counts.pop('in_flight')
+        with self._lock:
+            counts['users'] = len(self._subscriptions)
+            counts['streams'] = sum(len(streams) for streams in self._subscriptions.values())
+        return counts
+
+
+class SocketBroker:
+    """Fan events out to every process on this host over Unix datagram sockets.
+
+    Only processes that serve streams bind a socket (on their first
+    subscription); any process can publish. Sends never block: an event that
+    does not fit in a receiver's socket buffer is dropped and counted, and
+    sockets of exited processes are removed by the first publisher to find
+    them.
+    """
+
+    def __init__(self, hub, directory):
+        self.hub = hub
+        self.directory = Path(directory)
+        self._path = None
+        self._pid = None  # sockets and threads do not survive fork
+        self._sender = None
+        self._sender_pid = None
+        self._lock = threading.Lock()
+
+    def listen(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f'{os.getpid()}.sock'
+            path.unlink(missing_ok=True)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(str(path))
+            atexit.register(path.unlink, missing_ok=True)
+            threading.Thread(target=self._receive, args=(receiver,), name='events-broker', daemon=True).start()
+            self._path, self._pid = path, os.getpid()
+
+    def _receive(self, receiver):
+        while True:
+            datagram = receiver.recv(65536)
+            user_id, _, message = datagram.partition(b' ')
+            self.hub.deliver(int(user_id), message)
+
+    def publish(self, user_id, message):
+        self.hub.deliver(user_id, message)
+        if self._sender_pid != os.getpid():
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+            self._sender_pid = os.getpid()
+        datagram = b'%d %s' % (user_id, message)
+        for path in self.directory.glob('*.sock'):
+            if path == self._path and self._pid == os.getpid():
+                continue  # delivered above
+            try:
+                self._sender.sendto(datagram, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                self.hub.metrics.incr('broker_dropped')
+
+
+def encode(event, data):
+    """One SSE message; its id is the publish time in microseconds"""
+    data = json.dumps(data, separators=(',', ':'))  # escapes newlines, so one data line
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (time.time_ns() // 1000, event.encode(), data.encode())
+
+
+def _build_hub():
+    if not settings.LIVE_UPDATES['enabled']:
+        return None, None
+    hub = EventHub(settings.LIVE_UPDATES['queue_size'])
+    if settings.LIVE_UPDATES['broker'] == 'socket':
+        return hub, SocketBroker(hub, settings.LIVE_UPDATES['socket_dir'])
+    return hub, None
+
+
+hub, broker = _build_hub()
+
+
+async def stream(user_id, reconnected=False):
+    """SSE body for one client: events for user_id, with heartbeats, until max_seconds.
+
+    Django 4.2 does not notice a client disconnecting mid-stream, so streams
+    end after LIVE_UPDATES['max_seconds'] and the browser reconnects; this
+    bounds how long an abandoned stream holds its subscription.
+    """
+    options = settings.LIVE_UPDATES
+    if broker is not None:
+        broker.listen()
+    subscription = hub.subscribe(user_id)
+    hub.metrics.incr('connected')
+    try:
+        # An id up front makes the browser send Last-Event-ID when it reconnects
+        yield b'id: %d\nretry: %d\n\n' % (time.time_ns() // 1000, options['retry_ms'])
+        if reconnected:  # subscribed first, so nothing is missed in between
+            yield await sync_to_async(dashboard_snapshot)(user_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + options['max_seconds']
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), min(options['heartbeat_seconds'], remaining),
+                )
+            except asyncio.TimeoutError:
+                yield b': ping\n\n'
+                continue
+            if message is RESET:
+                yield encode('reset', {})
+                return
+            yield message
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def publish(user_id, event, data):
+    """Send an event to every open stream of user_id"""
+    if hub is None:
+        return
+    message = encode(event, data)
+    hub.metrics.incr('published')
+    if broker is not None:
+        broker.publish(user_id, message)
+    else:
+        hub.deliver(user_id, message)
+
+
+def _wanted(user_id):
+    """Whether anyone may be listening, so events are worth building"""
+    return hub is not None and (broker is not None or hub.has_subscribers(user_id))
+
+
+def weight_log_rows(logs):
+    return [
+        {'date': log.date.isoformat(), 'html': render_to_string('diet_app/includes/weight_log_row.html', {'log': log})}
+        for log in logs
+    ]
+
+
+def recommendation_rows(recommendations):
+    return [
+        render_to_string('diet_app/includes/recommendation_row.html', {'rec': rec})
+        for rec in recommendations
+    ]
+
+
+def weight_logs_changed(user_id, logs):
+    """Publish changed weight logs once the current transaction commits"""
+    if _wanted(user_id):
+        transaction.on_commit(lambda: _publish_weight_logs(user_id, logs))
+
+
+def _publish_weight_logs(user_id, logs):
+    latest = sorted(logs, key=lambda log: log.date, reverse=True)[:RECENT_WEIGHT_LOGS]
+    publish(user_id, 'weight_log', {
+        'rows': weight_log_rows(latest),
+        'count': WeightLog.objects.filter(user_id=user_id).count(),
+    })
+
+
+def recommendation_created(recommendation):
+    """Publish a new recommendation once the current transaction commits"""
+    if _wanted(recommendation.user_id):
+        transaction.on_commit(lambda: _publish_recommendation(recommendation))
+
+
+def _publish_recommendation(recommendation):
+    publish(recommendation.user_id, 'recommendation', {
+        'rows': recommendation_rows([recommendation]),
+        'count': DietRecommendation.objects.filter(user_id=recommendation.user_id).count(),
+    })
+
+
+def dashboard_snapshot(user_id):
+    """Both dashboard tables and totals, sent when a stream reconnects"""
+    recommendations = DietRecommendation.objects.filter(user_id=user_id)
+    weight_logs = WeightLog.objects.filter(user_id=user_id)
+    return encode('snapshot', {
+        'recommendations': recommendation_rows(recommendations[:RECENT_RECOMMENDATIONS]),
+        'recommendation_count': recommendations.count(),
+        'weight_logs': weight_log_rows(weight_logs[:RECENT_WEIGHT_LOGS]),
+        'weight_log_count': weight_logs.count(),
+    })
+
+
+def _session_user_id(cookie_header):
+    """Id of the user logged in with the session cookie, or None"""
+    request = HttpRequest()
+    session_key = parse_cookie(cookie_header).get(settings.SESSION_COOKIE_NAME)
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    try:
+        user = get_user(request)
+        return user.pk if user.is_authenticated else None
+    finally:
+        close_old_connections()  # as at the end of a request
+
+
+def _allowed_host(headers):
+    """Whether the request's host passes ALLOWED_HOSTS, as HttpRequest.get_host() checks it"""
+    host = headers.get('host', '')
+    if settings.USE_X_FORWARDED_HOST and 'x-forwarded-host' in headers:
+        host = headers['x-forwarded-host']
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        allowed = ['.localhost', '127.0.0.1', '[::1]']
+    domain, _ = split_domain_port(host)
+    return bool(domain) and validate_host(domain, allowed)
+
+
+async def _error(send, status, message):
+    body = json.dumps({'status': 'error', 'message': message}).encode()
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class StreamApplication:
+    """ASGI application serving the event stream itself and the rest with Django.
+
+    Streams are served on the event loop: the host is checked against
+    ALLOWED_HOSTS and the session in the shared executor, no thread is kept
+    per stream, and a client disconnect ends its stream at once.
+    """
+
+    def __init__(self, application, path='/api/events/'):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if hub is None or scope['type'] != 'http' or scope['path'] != self.path or scope['method'] != 'GET':
+            return await self.application(scope, receive, send)
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        if not _allowed_host(headers):
+            return await _error(send, 400, 'Invalid host')
+        user_id = await sync_to_async(_session_user_id, thread_sensitive=False)(headers.get('cookie', ''))
+        if user_id is None:
+            return await _error(send, 403, 'Authentication required')
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no'),
+        ]})
+        pump = asyncio.ensure_future(self._pump(stream(user_id, 'last-event-id' in headers), send))
+        disconnect = asyncio.ensure_future(self._disconnected(receive))
+        try:
+            done, _ = await asyncio.wait((pump, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if pump in done:
+                pump.result()  # re-raise errors from the stream
+        finally:
+            pump.cancel()
+            disconnect.cancel()
+            await asyncio.gather(pump, disconnect, return_exceptions=True)
+
+    @staticmethod
+    async def _pump(body, send):
+        try:
+            async for message in body:
+                await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await body.aclose()  # unsubscribe now, even if cancelled inside send()
+
+    @staticmethod
+    async def _disconnected(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+def snapshot():
+    """Stream counters for the metrics endpoint, or None when disabled"""
+    return hub.snapshot() if hub is not None else None
@@ -3,11 +3,19 @@ Django Forms for Diet Recommendation System
 """
 
 from django import forms
-from .models import UserProfile, WeightLog
+from .models import ALLERGY_CHOICES, DIETARY_RESTRICTION_CHOICES, UserProfile, WeightLog
 
 
 class UserProfileForm(forms.ModelForm):
     """Form for user health profile"""
+    allergies = forms.MultipleChoiceField(
+        choices=ALLERGY_CHOICES, required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+    dietary_restrictions = forms.MultipleChoiceField(
+        choices=DIETARY_RESTRICTION_CHOICES, required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
     
     class Meta:
         model = UserProfile
@@ -0,0 +1,112 @@
+"""
+Precomputed BMI grid for the rule-based predictor
+
+BMI and BMI category depend only on height and weight, which
+DietCalculatorForm bounds to 100-250 cm and 30-200 kg. build_grid() evaluates
+the scalar formulas once for every height at 0.5 cm and every weight at
+0.1 kg (301 x 1701 cells) and saves them as one uint16 .npy array; each
+cell packs round(bmi, 1) * 10 and the category index as tenths * 4 + index,
+so a lookup reads one value. Workers open the file with mmap, so the 1 MB
+table is shared through the page cache.
+
+TDEE and calories are linear in the inputs (two multiply-adds), so they are
+still computed directly; a dense table over all seven inputs would need
+~370M cells. Inputs that do not fall exactly on the grid use the formulas
+too, so results are identical in both modes.
+"""
+
+import threading
+
+from django.conf import settings
+
+from .validation import FIELD_SPECS
+
+CATEGORIES = ('Underweight', 'Healthy', 'Overweight', 'Obese')
+HEIGHT_STEPS = 2   # per cm (0.5 cm resolution)
+WEIGHT_STEPS = 10  # per kg (0.1 kg resolution)
+
+_BOUNDS = {name: (low, high) for name, _, low, high, _ in FIELD_SPECS}
+HEIGHT_MIN, HEIGHT_MAX = _BOUNDS['height']
+WEIGHT_MIN, WEIGHT_MAX = _BOUNDS['weight']
+GRID_SHAPE = (
+    round((HEIGHT_MAX - HEIGHT_MIN) * HEIGHT_STEPS) + 1,
+    round((WEIGHT_MAX - WEIGHT_MIN) * WEIGHT_STEPS) + 1,
+)
+
+
+def grid_height(index):
+    """Height (cm) of a grid row, as the float a client sending it would parse"""
+    return (HEIGHT_MIN * HEIGHT_STEPS + index) / HEIGHT_STEPS
+
+
+def grid_weight(index):
+    """Weight (kg) of a grid column, as the float a client sending it would parse"""
+    return (WEIGHT_MIN * WEIGHT_STEPS + index) / WEIGHT_STEPS
+
+
+def build_grid(path):
+    """Evaluate DietPredictor's BMI formulas for every cell and save the grid"""
+    import numpy as np
+
+    from .ml_utils import DietPredictor
+
+    grid = np.empty(GRID_SHAPE, dtype=np.uint16)
+    category_index = {category: index for index, category in enumerate(CATEGORIES)}
+    weights = [grid_weight(column) for column in range(GRID_SHAPE[1])]
+    for row in range(GRID_SHAPE[0]):
+        height = grid_height(row)
+        bmis = [DietPredictor.calculate_bmi(weight, height) for weight in weights]
+        grid[row] = [
+            round(round(bmi, 1) * 10) * 4 + category_index[DietPredictor.get_bmi_category(bmi)] for bmi in bmis
+        ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, grid)
+    return grid
+
+
+class PredictorGrid:
+    """Index lookups into a (memory-mapped) grid built by build_grid()"""
+
+    def __init__(self, array):
+        if array.shape != GRID_SHAPE:
+            raise ValueError(f'Grid shape {array.shape} does not match {GRID_SHAPE}; rebuild it')
+        self.array = array
+        self._item = array.item  # bound once: ndarray.item skips memmap.__getitem__
+
+    def lookup(self, height, weight):
+        """(round(bmi, 1), category) for on-grid inputs, else None"""
+        row = round(height * HEIGHT_STEPS) - HEIGHT_MIN * HEIGHT_STEPS
+        column = round(weight * WEIGHT_STEPS) - WEIGHT_MIN * WEIGHT_STEPS
+        if not (0 <= row < GRID_SHAPE[0] and 0 <= column < GRID_SHAPE[1]):
+            return None
+        if grid_height(row) != height or grid_weight(column) != weight:
+            return None  # between grid points
+        cell = self._item(row, column)
+        return (cell >> 2) / 10, CATEGORIES[cell & 3]
+
+
+_grid = None
+_grid_lock = threading.Lock()
+_grid_loaded = False
+
+
+def get_grid():
+    """The shared PredictorGrid when PREDICTOR_GRID is enabled and built, else None"""
+    global _grid, _grid_loaded
+    if not _grid_loaded:
+        with _grid_lock:
+            if not _grid_loaded:
+                _grid = _load_grid() if settings.PREDICTOR_GRID else None
+                _grid_loaded = True
+    return _grid
+
+
+def _load_grid():
+    import numpy as np
+
+    path = settings.PREDICTOR_GRID_PATH
+    try:
+        return PredictorGrid(np.load(path, mmap_mode='r'))
+    except (OSError, ValueError) as e:
+        print(f"Predictor grid unavailable ({e}); using the formulas")
+        return None
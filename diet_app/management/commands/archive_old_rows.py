@@ -0,0 +1,67 @@
+"""
+Move weight logs and recommendations older than the retention horizon to cold storage
+"""
+
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from diet_app.archive import KINDS, archive_month, months_to_archive, table_size_bytes
+
+
+class Command(BaseCommand):
+    help = 'Archive rows older than ARCHIVE_HORIZON_DAYS into compressed monthly files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=[*KINDS, 'all'], default='all')
+        parser.add_argument('--horizon-days', type=int, default=None, help='Defaults to ARCHIVE_HORIZON_DAYS')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per fetch/delete')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be archived')
+
+    def handle(self, *args, **options):
+        horizon = options['horizon_days'] or settings.ARCHIVE_HORIZON_DAYS
+        cutoff = timezone.localdate() - datetime.timedelta(days=horizon)
+        kinds = list(KINDS) if options['kind'] == 'all' else [options['kind']]
+
+        for kind in kinds:
+            model = KINDS[kind][0]
+            months = months_to_archive(kind, cutoff)
+            self.stdout.write(f'{kind}: {len(months)} month(s) before {cutoff}')
+            if options['dry_run'] or not months:
+                continue
+
+            before = self._stats(model)
+            start = time.perf_counter()
+            moved = 0
+            for month in months:
+                count = archive_month(kind, month, cutoff, options['batch_size'])
+                moved += count
+                self.stdout.write(f'  {month:%Y-%m}: {count} rows')
+            elapsed = time.perf_counter() - start
+            after = self._stats(model)
+
+            self.stdout.write(f'  moved {moved} rows in {elapsed:.1f}s')
+            self.stdout.write(f'  {"":24}{"before":>14}{"after":>14}')
+            for label in before:
+                self.stdout.write(f'  {label:<24}{before[label]:>14}{after[label]:>14}')
+            self.stdout.write('  (freed pages are reused by new rows; VACUUM returns them to the OS)')
+
+    def _stats(self, model):
+        """Row count, table size and latency of the per-user hot query for the busiest user"""
+        size = table_size_bytes(model)
+        busiest = (
+            model.objects.values('user').annotate(n=Count('id')).order_by('-n').values_list('user', flat=True).first()
+        )
+        start = time.perf_counter()
+        for _ in range(20):
+            list(model.objects.filter(user=busiest))
+        latency = (time.perf_counter() - start) / 20
+        return {
+            'rows': model.objects.count(),
+            'table + index size (MB)': '-' if size is None else f'{size / 1024 / 1024:.1f}',
+            'busiest user query (ms)': f'{latency * 1000:.2f}',
+        }
@@ -0,0 +1,118 @@
+"""
+Check compiled-model parity and compare latency against scikit-learn predict()
+"""
+
+import io
+import pickle
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from diet_app.ml_utils import ACTIVITY_LEVELS, DietPredictor, model_features
+
+
+class Command(BaseCommand):
+    help = ('Benchmark compiled vs scikit-learn inference on the trained models, '
+            'or on stand-ins fitted to datasets/bmi.csv when the pickles are missing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows for the parity check and batch timing')
+        parser.add_argument('--number', type=int, default=300, help='Single-row predictions per measurement')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        from diet_app.compiled_models import compile_estimator, load_compiled, save_compiled
+
+        rng = np.random.default_rng(options['seed'])
+        for label, estimator, X in self._models(rng, options['rows']):
+            buffer = io.BytesIO()  # round-trip through the .npz format
+            save_compiled(compile_estimator(estimator), buffer)
+            buffer.seek(0)
+            model = load_compiled(buffer)
+
+            expected = estimator.predict(X)
+            batch = model.predict(X)
+            single = np.array([model.predict_one(row) for row in X.tolist()])
+            if expected.dtype.kind == 'f':
+                parity = (f'max |diff| batch {np.abs(expected - batch).max():.2e}, '
+                          f'single {np.abs(expected - single).max():.2e}')
+            else:
+                parity = f'agreement batch {(expected == batch).mean():.2%}, single {(expected == single).mean():.2%}'
+            self.stdout.write(f'\n{label}\n  {parity}')
+
+            row = X[:1]
+            values = row[0].tolist()
+            number = options['number']
+            self._report('sklearn predict(), 1 row', lambda: estimator.predict(row), number)
+            self._report('compiled predict_one()', lambda: model.predict_one(values), number * 10)
+            self._report('compiled predict(), 1 row', lambda: model.predict(row), number)
+            self._report(f'sklearn predict(), {len(X)} rows', lambda: estimator.predict(X), 5, per=len(X))
+            self._report(f'compiled predict(), {len(X)} rows', lambda: model.predict(X), 5, per=len(X))
+
+    def _models(self, rng, rows):
+        """(label, fitted estimator, sample rows) for each model to benchmark"""
+        import numpy as np
+
+        loaded = []
+        for name in ('bmi_classifier', 'tdee_regressor'):
+            try:
+                with open(settings.ML_MODELS_DIR / f'{name}.pkl', 'rb') as f:
+                    loaded.append((name, pickle.load(f)))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                break
+        if len(loaded) == 2:
+            for name, estimator in loaded:
+                X = rng.normal(size=(rows, estimator.n_features_in_)) * 50 + 100
+                yield f'{name}.pkl ({type(estimator).__name__})', estimator, X
+            return
+
+        self.stdout.write('Model pickles unavailable; fitting stand-ins on datasets/bmi.csv and Harris-Benedict TDEE')
+        from sklearn.ensemble import (
+            ExtraTreesClassifier, GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor,
+        )
+        from sklearn.linear_model import LinearRegression, LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier
+
+        data = np.genfromtxt(settings.BASE_DIR / 'datasets' / 'bmi.csv', delimiter=',', skip_header=1,
+                             dtype=None, encoding='utf-8')
+        X_bmi = np.array([model_features(0, gender, height, weight, ACTIVITY_LEVELS[0])[0]
+                          for gender, height, weight, _ in data], dtype=float)
+        y_bmi = np.array([index for *_, index in data])
+
+        people = [
+            (int(age), gender, float(height), float(weight), ACTIVITY_LEVELS[level])
+            for age, gender, height, weight, level in zip(
+                rng.integers(18, 80, rows), rng.choice(['male', 'female'], rows), rng.uniform(150, 200, rows),
+                rng.uniform(45, 120, rows), rng.integers(0, len(ACTIVITY_LEVELS), rows),
+            )
+        ]
+        X_tdee = np.array([model_features(*person)[1] for person in people], dtype=float)
+        y_tdee = np.array([
+            DietPredictor.calculate_tdee(weight, height, age, gender, activity_level)
+            for age, gender, height, weight, activity_level in people
+        ])
+
+        classifiers = [
+            RandomForestClassifier(n_estimators=100, random_state=0),
+            ExtraTreesClassifier(n_estimators=100, random_state=0),
+            DecisionTreeClassifier(random_state=0),
+            LogisticRegression(max_iter=5000),
+        ]
+        regressors = [
+            GradientBoostingRegressor(n_estimators=200, random_state=0),
+            RandomForestRegressor(n_estimators=100, random_state=0),
+            LinearRegression(),
+        ]
+        X_sample = X_bmi[rng.integers(0, len(X_bmi), rows)]
+        for estimator in classifiers:
+            yield f'BMI index: {type(estimator).__name__}', estimator.fit(X_bmi, y_bmi), X_sample
+        for estimator in regressors:
+            yield f'TDEE: {type(estimator).__name__}', estimator.fit(X_tdee, y_tdee), X_tdee
+
+    def _report(self, label, func, number, per=1):
+        """Print microseconds per row"""
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        self.stdout.write(f'  {label:<34} {seconds / number / per * 1e6:9.2f} us/row')
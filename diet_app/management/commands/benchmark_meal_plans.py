@@ -0,0 +1,85 @@
+"""
+Time rotating meal plan generation and check its constraints
+
+For --plans random (seed, diet type, calorie target, restrictions) plans,
+times a full month generated from scratch (no cache), the first visit to
+every week (cache misses, generated and stored) and a revisit (cache hits).
+Every generated month is checked: no dinner repeats within the dinner
+window, and the share of days meeting their calorie target is reported.
+"""
+
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from diet_app.meals import RESTRICTION_INGREDIENTS
+from diet_app.rotation import DINNER_SLOT, RotatingPlan
+
+
+class Command(BaseCommand):
+    help = 'Benchmark multi-week meal plan generation (cold, cached) and verify variety and calorie targets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        codes = list(RESTRICTION_INGREDIENTS)
+        plans = [
+            RotatingPlan(
+                rng.randrange(10**6), rng.choice(['veg', 'nonveg', 'vegan']), rng.randrange(1200, 3600, 10),
+                rng.sample(codes, rng.choice([0, 0, 1, 2])),
+            )
+            for _ in range(options['plans'])
+        ]
+        weeks = settings.MEAL_PLANS['weeks']
+
+        uncached = self._time(plans, lambda plan: self._generate_all(plan))
+        for plan in plans:
+            cache.delete_many([f'{plan.key_prefix}:{number}' for number in range(weeks)])
+        first = self._time(plans, lambda plan: [plan.week(number) for number in range(1, weeks + 1)])
+        keys = [f'{plan.key_prefix}:{number}' for plan in plans for number in range(weeks)]
+        hits = len(cache.get_many(keys))
+        revisit = self._time(plans, lambda plan: [plan.week(number) for number in range(1, weeks + 1)])
+
+        self.stdout.write(f'{len(plans)} plans x {weeks} weeks (cache: {settings.CACHES["default"]["BACKEND"]})')
+        for label, timings in [('generate month, no cache', uncached), ('first visit to every week', first),
+                               ('revisit every week (cached)', revisit)]:
+            timings.sort()
+            self.stdout.write(
+                f'  {label:<30} p50 {statistics.median(timings) * 1000:.2f} ms  '
+                f'p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f} ms  max {timings[-1] * 1000:.2f} ms'
+            )
+        self.stdout.write(f'  weeks still cached at revisit: {hits}/{len(keys)} (a small cache evicts weeks)')
+
+        repeats = on_target = days = 0
+        for plan in plans:
+            month = [day for number in range(1, weeks + 1) for day in plan.week(number)]
+            days += len(month)
+            on_target += sum(day['on_target'] for day in month)
+            dinners = [day['meals'][-1]['text'] for day in month if len(day['meals']) > DINNER_SLOT]
+            window = plan.dinner_memory + 1
+            repeats += sum(len(set(dinners[i:i + window])) < len(dinners[i:i + window]) for i in range(len(dinners)))
+        self.stdout.write(f'dinner repeats inside the window: {repeats}')
+        self.stdout.write(f'days within the calorie tolerance: {on_target}/{days} ({on_target / days:.1%})')
+
+    @staticmethod
+    def _generate_all(plan):
+        recent = ()
+        for number in range(plan.weeks):
+            days, recent = plan._generate(number, recent)
+            [plan.render(day, 0) for day in days]
+
+    @staticmethod
+    def _time(plans, work):
+        timings = []
+        for plan in plans:
+            start = time.perf_counter()
+            work(plan)
+            timings.append(time.perf_counter() - start)
+        return timings
@@ -0,0 +1,112 @@
+"""
+Measure read throughput under concurrent writes, with and without read replicas
+"""
+
+import datetime
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from diet_app import routers
+
+READ_PATHS = ('/dashboard/', '/history/', '/api/weight-logs/')
+
+
+class Command(BaseCommand):
+    help = 'Run reader and writer threads against the read-only pages, on the primary only and then with replicas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=6, help='Threads reading the dashboard/history/API')
+        parser.add_argument('--writers', type=int, default=1, help='Threads logging weights')
+        parser.add_argument('--write-batch', type=int, default=1,
+                            help='Entries per write; above 1, writers push offline-sync batches of this size')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        if routers.pool is None:
+            raise CommandError('DATABASE_REPLICAS is empty')
+        threads = options['readers'] + options['writers']
+        users = list(User.objects.filter(is_active=True).order_by('id')[:threads])
+        if len(users) < threads:
+            raise CommandError(f'Need {threads} users; run seed_data first')
+        clients = []
+        for user in users:
+            client = Client(raise_request_exception=False)  # count failures instead
+            client.force_login(user)
+            clients.append(client)
+
+        pool = routers.pool
+        try:
+            for label, run_pool in (('primary only', None), (f'{len(pool.aliases)} replicas', pool)):
+                routers.pool = run_pool
+                self._report(label, self._run(clients, options), options['seconds'])
+        finally:
+            routers.pool = pool
+            for client in clients:
+                SessionStore(client.session.session_key).delete()
+
+    def _run(self, clients, options):
+        readers, writers = clients[:options['readers']], clients[options['readers']:]
+        stop = time.perf_counter() + options['seconds']
+        results = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+
+        batch = options['write_batch']
+        today = datetime.date.today()
+
+        def write_once(client, rng):
+            if batch == 1:
+                return client.post('/add-weight/', {'weight': round(rng.uniform(50, 120), 1)}).status_code == 302
+            entries = [
+                {'date': (today - datetime.timedelta(days=day)).isoformat(), 'weight': round(rng.uniform(50, 120), 1)}
+                for day in range(batch)
+            ]
+            response = client.post('/api/weight-logs/sync/', json.dumps({'entries': entries}), 'application/json')
+            return response.status_code == 200
+
+        def work(client, write):
+            rng = random.Random()
+            latencies = []
+            errors = 0
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                if write:
+                    ok = write_once(client, rng)
+                else:
+                    response = client.get(rng.choice(READ_PATHS))
+                    ok = response.status_code == 200
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            connections.close_all()
+            with lock:
+                results['write' if write else 'read'].extend(latencies)
+                results['write_errors' if write else 'read_errors'] += errors
+
+        threads = [threading.Thread(target=work, args=(client, False)) for client in readers]
+        threads += [threading.Thread(target=work, args=(client, True)) for client in writers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _report(self, label, results, seconds):
+        reads = sorted(results['read'])
+        line = f'{label:>14}: {len(reads) / seconds:7.1f} reads/s, {len(results["write"]) / seconds:6.1f} writes/s'
+        if reads:
+            line += (
+                f', read p50 {statistics.median(reads) * 1000:.1f} ms'
+                f' p99 {reads[int(len(reads) * 0.99) - 1] * 1000:.1f} ms'
+            )
+        self.stdout.write(f'{line}; failed: {results["read_errors"]} reads, {results["write_errors"]} writes')
@@ -0,0 +1,84 @@
+"""
+Compare admin and user history search: full-text index vs icontains
+
+For sample terms (a username, an email, a plan title word, a weight log
+note word and a term matching nothing), times what the admin changelist
+runs for a search, the COUNT(*) and the first page in ordering, once with
+the search_fields icontains lookups (LIKE '%...%' joined to auth_user) and
+once with the full-text index (diet_app.search). Then times the
+user-facing search of one user's own plans and notes (search_own), and the
+same search through the index restricted to the user's rows.
+"""
+
+import statistics
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+
+from diet_app import search
+from diet_app.models import DietRecommendation, WeightLog
+
+
+class Command(BaseCommand):
+    help = 'Time admin and user history searches with the full-text index against icontains'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per query (median reported)')
+        parser.add_argument('--skip-like', action='store_true', help='Only time the full-text index')
+
+    def handle(self, *args, **options):
+        if search.backend_for('default') is None:
+            raise CommandError('No full-text index on this database (run migrate, or rebuild_search_index)')
+        recommendation = DietRecommendation.objects.select_related('user').order_by('-id').first()
+        log = WeightLog.objects.exclude(notes='').exclude(notes=None).order_by('-id').first()
+        if recommendation is None or log is None:
+            raise CommandError('No data; run seed_data first')
+        user = recommendation.user
+        self.stdout.write(
+            f'{DietRecommendation.objects.count()} recommendations, {WeightLog.objects.count()} weight logs'
+        )
+
+        cases = [
+            (DietRecommendation, 'username', user.username),
+            (DietRecommendation, 'email', user.email or user.username),
+            (DietRecommendation, 'title word', recommendation.diet_plan_title.split()[0]),
+            (WeightLog, 'note word', log.notes.split()[0]),
+            (WeightLog, 'no match', 'zzqxv'),
+        ]
+        self.stdout.write(f'{"admin search":<42} {"rows":>8} {"LIKE ms":>10} {"index ms":>10}')
+        for model, label, term in cases:
+            model_admin = admin.site._registry[model]
+            queryset = model_admin.get_queryset(None)
+            fulltext, _ = model_admin.get_search_results(None, queryset, term)
+            like, _ = admin.ModelAdmin.get_search_results(model_admin, None, queryset, term)
+            page = model_admin.list_per_page
+            index_ms = self._time(lambda: (fulltext.count(), list(fulltext[:page])), options['repeat'])
+            like_ms = None if options['skip_like'] else self._time(
+                lambda: (like.count(), list(like[:page])), options['repeat']
+            )
+            name = f'{model.__name__} {label} {term!r}'
+            like_text = '-' if like_ms is None else f'{like_ms:.1f}'
+            self.stdout.write(f'{name:<42} {fulltext.count():>8} {like_text:>10} {index_ms:>10.1f}')
+
+        # Words both searches look in: the index has the title, not the meals
+        for model, index, word in [(DietRecommendation, 'recommendation', recommendation.diet_plan_title.split()[-1]),
+                                   (WeightLog, 'weight_log', log.notes.split()[0])]:
+            own = model.objects.filter(user=user)
+            found = search.search_own(own, index, word)
+            fulltext = search.search(own, index, word)
+            own_ms = self._time(lambda: list(found[:50]), options['repeat'])
+            index_ms = self._time(lambda: list(fulltext[:50]), options['repeat'])
+            self.stdout.write(
+                f'user search {model.__name__} {word!r} ({own.count()} own rows, {found.count()} found): '
+                f'search_own {own_ms:.1f} ms, index {index_ms:.1f} ms'
+            )
+
+    @staticmethod
+    def _time(run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,57 @@
+"""
+Measure encode time of the API serializers
+"""
+
+import datetime
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from diet_app.ml_utils import diet_predictor
+from diet_app.schemas import WeightLogEntry
+from diet_app.serialization import available_json_serializers, msgpack_serializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API response encoding (stdlib baseline vs orjson/msgspec/msgpack)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Weight log rows per payload')
+        parser.add_argument('--number', type=int, default=2000, help='Encodes per measurement')
+
+    def handle(self, *args, **options):
+        rows, number = options['rows'], options['number']
+        args = dict(age=30, gender='male', height=175, weight=72, activity_level='moderate', goal='lose', diet_type='veg')
+        today = datetime.date.today()
+        dates = [today - datetime.timedelta(days=i) for i in range(rows)]
+
+        # Baseline: what JsonResponse did before (dicts + DjangoJSONEncoder)
+        baseline = {
+            'prediction': lambda: json.dumps({'status': 'success', 'data': diet_predictor.predict(**args)}, cls=DjangoJSONEncoder),
+            'weight_logs': lambda: json.dumps(
+                {'status': 'success', 'data': [{'weight': 70.5, 'date': d} for d in dates]}, cls=DjangoJSONEncoder
+            ),
+        }
+        self._report('baseline', baseline, number)
+
+        serializers = available_json_serializers()
+        if msgpack_serializer is not None:
+            serializers.append(msgpack_serializer)
+        for serializer in serializers:
+            cases = {
+                'prediction': lambda s=serializer: s.dumps({'status': 'success', 'data': diet_predictor.predict_result(**args)}),
+                'weight_logs': lambda s=serializer: s.dumps(
+                    {'status': 'success', 'data': [WeightLogEntry(70.5, d) for d in dates]}
+                ),
+            }
+            self._report(serializer.name, cases, number)
+
+    def _report(self, label, cases, number):
+        """Print mean microseconds per encode for each case"""
+        timings = []
+        for name, func in cases.items():
+            seconds = min(timeit.repeat(func, number=number, repeat=3))
+            timings.append(f'{name}={seconds / number * 1e6:.1f}us')
+        self.stdout.write(f'{label:<10} ' + '  '.join(timings))
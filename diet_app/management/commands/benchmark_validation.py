@@ -0,0 +1,49 @@
+"""
+Compare calculator input validation cost against DietCalculatorForm
+"""
+
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from diet_app.forms import DietCalculatorForm
+from diet_app.validation import decode_diet_request, validate_diet_input
+
+
+class Command(BaseCommand):
+    help = 'Benchmark shared input validation vs Django form instantiation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Items per batch request')
+        parser.add_argument('--number', type=int, default=5000, help='Validations per measurement')
+
+    def handle(self, *args, **options):
+        batch, number = options['batch'], options['number']
+        item = {
+            'age': 30, 'gender': 'female', 'height': 165.5, 'weight': 61.2,
+            'activity_level': 'light', 'goal': 'maintain', 'diet_type': 'vegan',
+        }
+        post = QueryDict(mutable=True)
+        post.update({key: str(value) for key, value in item.items()})
+        body = json.dumps(item).encode()
+        batch_body = json.dumps([item] * batch).encode()
+
+        def form():
+            f = DietCalculatorForm(post)
+            f.is_valid()
+            return f.cleaned_data
+
+        self._report('DietCalculatorForm (POST)', form, number)
+        self._report('validate_diet_input (POST)', lambda: validate_diet_input(post), number)
+        self._report('decode_diet_request (JSON)', lambda: decode_diet_request(body), number)
+        self._report(
+            f'decode_diet_request ({batch} items)', lambda: decode_diet_request(batch_body), max(1, number // batch),
+            per=batch,
+        )
+
+    def _report(self, label, func, number, per=1):
+        """Print mean microseconds per validated item"""
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        self.stdout.write(f'{label:<36} {seconds / number / per * 1e6:8.2f} us/item')
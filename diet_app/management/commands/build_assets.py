@@ -0,0 +1,46 @@
+"""
+Build the purged CSS bundle served by base.html
+"""
+
+import gzip
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from diet_app.assets import build_bundle, collect_used_classes
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only used for the size report
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = 'Purge unused Bootstrap/Font Awesome rules and write static/dist/site.min.css'
+
+    def handle(self, *args, **options):
+        static_dir = settings.BASE_DIR / 'static'
+        vendor_dir = static_dir / 'vendor'
+        sources = [
+            (vendor_dir / 'bootstrap' / 'css' / 'bootstrap.min.css', True),
+            (vendor_dir / 'fontawesome' / 'css' / 'fontawesome.min.css', True),
+            (vendor_dir / 'fontawesome' / 'css' / 'solid.min.css', True),
+            (static_dir / 'css' / 'site.css', False),
+        ]
+        target = static_dir / 'dist' / 'site.min.css'
+
+        used = collect_used_classes([settings.BASE_DIR / 'templates', settings.BASE_DIR / 'diet_app'])
+        bundle = build_bundle(sources, target, used)
+
+        original = ''.join(path.read_text(encoding='utf-8') for path, _ in sources)
+        self.stdout.write(f"{'':<10}{'raw':>10}{'gzip':>10}{'brotli':>10}")
+        self.stdout.write(self._sizes('before', original))
+        self.stdout.write(self._sizes('after', bundle))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {target.relative_to(settings.BASE_DIR)}'))
+
+    @staticmethod
+    def _sizes(label, text):
+        """Format raw/gzip/brotli byte counts for one CSS payload"""
+        data = text.encode('utf-8')
+        compressed = len(brotli.compress(data)) if brotli else '-'
+        return f'{label:<10}{len(data):>10}{len(gzip.compress(data, 9)):>10}{compressed:>10}'
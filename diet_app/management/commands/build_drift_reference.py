@@ -0,0 +1,33 @@
+"""
+Build the drift-monitoring reference sketch from the training dataset
+"""
+
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from diet_app.drift import Sketch
+from diet_app.ml_utils import ACTIVITY_LEVELS
+
+
+class Command(BaseCommand):
+    help = 'Sketch datasets/ObesityDataSet.csv in the live input layout for drift comparison'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default='datasets/ObesityDataSet.csv')
+
+    def handle(self, *args, **options):
+        sketch = Sketch()
+        with open(settings.BASE_DIR / options['dataset'], newline='') as f:
+            for row in csv.DictReader(f):
+                # Height is in metres; FAF (physical activity, 0-3 days a week
+                # bands) is rounded onto the four activity levels. The dataset
+                # has no goal or diet type, so those are not compared.
+                sketch.observe((
+                    float(row['Age']), row['Gender'].lower(), float(row['Height']) * 100, float(row['Weight']),
+                    ACTIVITY_LEVELS[round(float(row['FAF']))], None, None,
+                ))
+        path = settings.DRIFT_REFERENCE_PATH
+        path.write_text(sketch.to_json())
+        self.stdout.write(f'{path}: {sketch.total} rows')
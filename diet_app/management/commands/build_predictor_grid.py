@@ -0,0 +1,29 @@
+"""
+Build the precomputed BMI grid used when PREDICTOR_GRID is enabled
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from diet_app.grid import GRID_SHAPE, build_grid
+
+
+class Command(BaseCommand):
+    help = 'Evaluate the BMI formulas over the input grid and save it for memory-mapping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='Defaults to PREDICTOR_GRID_PATH')
+
+    def handle(self, *args, **options):
+        path = settings.PREDICTOR_GRID_PATH if options['output'] is None else settings.BASE_DIR / options['output']
+        start = time.perf_counter()
+        grid = build_grid(path)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{path}: {GRID_SHAPE[0]} heights x {GRID_SHAPE[1]} weights, '
+            f'{grid.nbytes / 1024 / 1024:.1f} MB {grid.dtype}, built in {elapsed:.1f}s'
+        )
+        if not settings.PREDICTOR_GRID:
+            self.stdout.write('Set PREDICTOR_GRID = True to use it.')
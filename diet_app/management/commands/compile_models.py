@@ -0,0 +1,84 @@
+"""
+Compile the pickled scikit-learn models into flat NumPy arrays for serving
+"""
+
+import pickle
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from diet_app.ml_utils import MODEL_ARTIFACTS
+
+
+class Command(BaseCommand):
+    help = 'Write a compiled .npz next to each model pickle and check it predicts identically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-rows', type=int, default=10_000, help='Random rows compared per model')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        from diet_app.compiled_models import (
+            compile_estimator, compile_label_encoder, load_compiled, save_compiled,
+        )
+
+        models_dir = settings.ML_MODELS_DIR
+        rng = np.random.default_rng(options['seed'])
+        failed = []
+        for name in MODEL_ARTIFACTS.values():
+            source = models_dir / f'{name}.pkl'
+            try:
+                with open(source, 'rb') as f:
+                    estimator = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                raise CommandError(f'Cannot load {source}: {e or "empty file"} (train the models first)')
+
+            start = time.perf_counter()
+            if type(estimator).__name__ == 'LabelEncoder':
+                compiled = compile_label_encoder(estimator)
+            else:
+                try:
+                    compiled = compile_estimator(estimator)
+                except TypeError as e:
+                    raise CommandError(f'{source}: {e}')
+            target = models_dir / f'{name}.npz'
+            save_compiled(compiled, target)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{target.name}: {type(estimator).__name__}, {target.stat().st_size / 1024:.0f} KB, '
+                f'compiled in {elapsed:.2f}s'
+            )
+
+            if hasattr(estimator, 'predict'):
+                rows = self._check_rows(estimator, options['check_rows'], rng)
+                expected = estimator.predict(rows)
+                actual = load_compiled(target).predict(rows)
+                if expected.dtype.kind == 'f':
+                    differing = int((np.abs(expected - actual) > 1e-9 * np.maximum(1, np.abs(expected))).sum())
+                else:
+                    differing = int((expected != actual).sum())
+                self.stdout.write(f'  parity on {len(rows)} random rows: {differing} differing')
+                if differing:
+                    failed.append(target.name)
+
+        if failed:
+            for name in failed:
+                (models_dir / name).unlink()
+            raise CommandError(f'Compiled output differs for {", ".join(failed)}; removed, pickles stay in use')
+        self.stdout.write('DietPredictor now loads the compiled models (delete the .npz files to revert).')
+
+    def _check_rows(self, estimator, count, rng):
+        """Rows spanning every split threshold (trees) or a wide range (linear models)"""
+        import numpy as np
+
+        n_features = estimator.n_features_in_
+        low, high = np.full(n_features, -100.0), np.full(n_features, 100.0)
+        for tree in np.ravel(getattr(estimator, 'estimators_', [estimator])):
+            if hasattr(tree, 'tree_'):
+                split = tree.tree_.feature >= 0
+                np.minimum.at(low, tree.tree_.feature[split], tree.tree_.threshold[split] - 1)
+                np.maximum.at(high, tree.tree_.feature[split], tree.tree_.threshold[split] + 1)
+        return rng.uniform(low, high, size=(count, n_features))
@@ -0,0 +1,141 @@
+"""
+Overload /api/calculate/ and report latency percentiles and shed rates
+
+A local WSGI server with a fixed pool of worker threads (like a gthread
+worker) stamps X-Request-Start when it accepts a connection, as a proxy
+would. Clients send requests open-loop at a fixed rate above capacity, and
+latency is measured from each request's scheduled send time.
+"""
+
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from diet_app import ratelimit
+from diet_app.ml_utils import diet_predictor
+
+_accepted = threading.local()
+
+
+class PooledWSGIServer(WSGIServer):
+    """Accept connections on one thread, serve them from a fixed worker pool"""
+    request_queue_size = 1024
+
+    def __init__(self, address, workers):
+        super().__init__(address, StampingHandler)
+        self._pending = queue.Queue()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._pending.put((request, client_address, time.time()))
+
+    def _work(self):
+        while True:
+            request, client_address, accepted_at = self._pending.get()
+            _accepted.at = accepted_at
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+class StampingHandler(WSGIRequestHandler):
+    def get_environ(self):
+        environ = super().get_environ()
+        environ['HTTP_X_REQUEST_START'] = f't={_accepted.at:.6f}'
+        return environ
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Drive /api/calculate/ past saturation with and without admission control'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Server worker threads')
+        parser.add_argument('--cost-ms', type=float, default=50.0, help='Simulated per-prediction backend time')
+        parser.add_argument('--overload', type=float, default=2.0, help='Offered load as a multiple of capacity')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+
+    def handle(self, *args, **options):
+        body = json.dumps({
+            'age': 30, 'gender': 'male', 'height': 175, 'weight': 72,
+            'activity_level': 'moderate', 'goal': 'lose', 'diet_type': 'veg',
+        })
+        capacity = options['workers'] / (options['cost_ms'] / 1000)
+        rate = capacity * options['overload']
+        self.stdout.write(f'capacity ~{capacity:.0f} req/s, offering {rate:.0f} req/s for {options["duration"]}s')
+
+        predict = diet_predictor.predict_result
+        cost = options['cost_ms'] / 1000
+
+        def slow_predict(*args, **kwargs):
+            time.sleep(cost)
+            return predict(*args, **kwargs)
+
+        logging.getLogger('django.request').setLevel(logging.ERROR)  # one warning per 503 otherwise
+        unlimited = {'ip': (1e9, 1e9), 'key': (1e9, 1e9)}
+        original = ratelimit.admission
+        server = PooledWSGIServer(('127.0.0.1', 0), options['workers'])
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        diet_predictor.predict_result = slow_predict
+        try:
+            with override_settings(API_RATE_LIMITS=unlimited, API_TRUST_X_REQUEST_START=True):
+                ratelimit.admission = ratelimit.AdmissionController(max_concurrent=10_000, max_queue_wait=3600)
+                self._run('no admission control', server.server_address[1], body, rate, options)
+                ratelimit.admission = original
+                self._run(
+                    f'admission control ({original.max_queue_wait * 1000:.0f} ms queue limit)',
+                    server.server_address[1], body, rate, options,
+                )
+        finally:
+            ratelimit.admission = original
+            diet_predictor.predict_result = predict
+            server.shutdown()
+
+    def _run(self, label, port, body, rate, options):
+        results = []
+        start = time.perf_counter()
+        total = int(rate * options['duration'])
+
+        def send(scheduled):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            conn.request('POST', '/api/calculate/', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            results.append((response.status, time.perf_counter() - scheduled))
+
+        with ThreadPoolExecutor(max_workers=256) as pool:
+            for i in range(total):
+                scheduled = start + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, scheduled)
+
+        ok = sorted(latency for status, latency in results if status == 200)
+        shed = sum(1 for status, _ in results if status == 503)
+        self.stdout.write(
+            f'{label}: ok={len(ok)} shed={shed} '
+            f'p50={_pct(ok, 50):.0f} ms p99={_pct(ok, 99):.0f} ms max={_pct(ok, 100):.0f} ms'
+        )
+
+
+def _pct(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index] * 1000
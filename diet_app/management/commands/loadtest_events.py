@@ -0,0 +1,196 @@
+"""
+Hold thousands of idle /api/events/ streams open and measure fan-out
+
+No server is needed: the project's ASGI application is driven directly
+(scope, receive and send, as uvicorn would), one task per connection on a
+single event loop. Streams are spread over --users logged-in users. The
+command reports memory and threads per idle stream and heartbeat CPU cost,
+publishes events from a worker thread, as a sync view would, and measures
+delivery latency from publish to the stream's send(); finally every client
+hangs up and it reports how many streams noticed. --through-django serves
+the streams with the async view via Django's handler instead of
+diet_project.asgi, for comparison.
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from diet_app import events
+
+
+def _rss_bytes():
+    """Resident set size of this process (Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * 4096
+
+
+class StreamClient:
+    """One SSE connection: the ASGI receive/send callables and what arrived"""
+
+    def __init__(self, run, user_id, cookie):
+        self.run = run
+        self.user_id = user_id
+        self.cookie = cookie
+        self.hangup = asyncio.Event()
+        self._requested = False
+
+    @property
+    def scope(self):
+        return {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/events/', 'raw_path': b'/api/events/',
+            'query_string': b'', 'root_path': '',
+            'headers': [
+                (b'host', b'localhost'), (b'accept', b'text/event-stream'),
+                (b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.cookie}'.encode()),
+            ],
+            'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        }
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.hangup.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.run.statuses[message['status']] += 1
+            return
+        body = message.get('body', b'')
+        if body.startswith(b'id: ') and b'\nevent: ' in body:
+            published_us = int(body[4:body.index(b'\n')])
+            self.run.latencies.append(time.time() - published_us / 1e6)
+        elif body.startswith(b': ping'):
+            self.run.heartbeats += 1
+        elif body.startswith(b'id: '):  # the opening id/retry message
+            self.run.opened += 1
+            if self.run.opened == self.run.connections:
+                self.run.all_open.set()
+
+
+class LoadRun:
+    def __init__(self, connections):
+        self.connections = connections
+        self.statuses = Counter()
+        self.latencies = []
+        self.heartbeats = 0
+        self.opened = 0
+        self.all_open = asyncio.Event()
+
+
+class Command(BaseCommand):
+    help = 'Open thousands of idle live-update streams and measure memory, heartbeat cost and fan-out latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=100, help='Distinct logged-in users the streams belong to')
+        parser.add_argument('--events', type=int, default=200, help='Events to publish once every stream is open')
+        parser.add_argument('--rate', type=float, default=100.0, help='Events published per second')
+        parser.add_argument('--idle', type=float, default=10.0, help='Seconds to sit idle measuring heartbeats')
+        parser.add_argument('--heartbeat', type=float, default=5.0, help='Heartbeat interval during the run')
+        parser.add_argument('--through-django', action='store_true',
+                            help="Serve streams with the view through Django's ASGI handler")
+
+    def handle(self, *args, **options):
+        if events.hub is None:
+            raise CommandError("LIVE_UPDATES['enabled'] is off")
+        users = list(User.objects.filter(is_active=True).order_by('id')[:options['users']])
+        if not users:
+            raise CommandError('No users; run seed_data first')
+        cookies = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            cookies.append((user.pk, client.cookies[settings.SESSION_COOKIE_NAME].value))
+
+        live_updates = dict(
+            settings.LIVE_UPDATES, heartbeat_seconds=options['heartbeat'], max_seconds=24 * 3600,
+            queue_size=max(settings.LIVE_UPDATES['queue_size'], options['events']),
+        )
+        try:
+            with override_settings(LIVE_UPDATES=live_updates):
+                asyncio.run(self._run(cookies, options))
+        finally:
+            for _, session_key in cookies:
+                SessionStore(session_key).delete()
+
+    async def _run(self, cookies, options):
+        if options['through_django']:
+            application = get_asgi_application()
+        else:
+            from diet_project.asgi import application
+        count = options['connections']
+        run = LoadRun(count)
+        rss_before = _rss_bytes()
+
+        start = time.perf_counter()
+        clients = [StreamClient(run, *cookies[index % len(cookies)]) for index in range(count)]
+        tasks = [asyncio.create_task(application(client.scope, client.receive, client.send)) for client in clients]
+        try:
+            await asyncio.wait_for(run.all_open.wait(), timeout=max(60, count / 50))
+        except asyncio.TimeoutError:
+            raise CommandError(f'Only {run.opened}/{count} streams opened (statuses {dict(run.statuses)})')
+        elapsed = time.perf_counter() - start
+        rss = _rss_bytes() - rss_before
+        self.stdout.write(f'{count} streams open in {elapsed:.1f}s ({count / elapsed:.0f}/s), statuses {dict(run.statuses)}')
+        self.stdout.write(
+            f'memory: +{rss / 2**20:.1f} MiB RSS, ~{rss / count / 1024:.1f} KiB per idle stream; '
+            f'{threading.active_count()} threads'
+        )
+
+        cpu = time.process_time()
+        await asyncio.sleep(options['idle'])
+        cpu = time.process_time() - cpu
+        self.stdout.write(
+            f'idle {options["idle"]:.0f}s: {run.heartbeats} heartbeats, '
+            f'{cpu * 1000:.0f} ms CPU ({cpu / options["idle"]:.1%} of a core)'
+        )
+
+        streams_per_user = Counter(client.user_id for client in clients)
+        targets = [cookies[index % len(cookies)][0] for index in range(options['events'])]
+        expected = sum(streams_per_user[user_id] for user_id in targets)
+        publisher = threading.Thread(target=self._publish, args=(targets, options['rate']))
+        publisher.start()
+        deadline = time.monotonic() + len(targets) / options['rate'] + 10
+        while len(run.latencies) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        publisher.join()
+
+        latencies = sorted(run.latencies)
+        self.stdout.write(f'fan-out: {len(targets)} events -> {len(latencies)}/{expected} deliveries')
+        if latencies:
+            self.stdout.write(
+                f'latency ms: p50 {statistics.median(latencies) * 1000:.2f}  '
+                f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}  max {latencies[-1] * 1000:.2f}'
+            )
+
+        for client in clients:
+            client.hangup.set()
+        await asyncio.sleep(1)
+        self.stdout.write(f'1s after every client hung up: {events.hub.snapshot()["streams"]} streams still subscribed')
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _publish(targets, rate):
+        """Publish from a plain thread, as a sync view committing a write would"""
+        interval = 1 / rate
+        next_at = time.perf_counter()
+        for sequence, user_id in enumerate(targets):
+            events.publish(user_id, 'weight_log', {'rows': [], 'count': sequence})
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
@@ -0,0 +1,26 @@
+"""
+Recreate and refill the full-text search index tables and triggers
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from diet_app import search
+
+
+class Command(BaseCommand):
+    help = 'Drop and rebuild the full-text search indexes (SQLite FTS5 / PostgreSQL tsvector)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        start = time.perf_counter()
+        with transaction.atomic(using=connection.alias):
+            search.uninstall(connection)
+            if not search.install(connection):
+                raise CommandError(f'No full-text search support on {connection.vendor}; admin search uses LIKE')
+        self.stdout.write(f'rebuilt {", ".join(search.INDEXES)} search indexes in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,33 @@
+"""
+Catch the reporting rollups up with rows added since the last watermark
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from diet_app import rollups
+from diet_app.models import ActiveLoggerRollup, RecommendationRollup, RollupWatermark
+
+
+class Command(BaseCommand):
+    help = 'Fold new recommendations and weight logs into the rollup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50_000, help='Source row ids per transaction')
+        parser.add_argument('--rebuild', action='store_true', help='Drop all rollups and recount from scratch')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                RecommendationRollup.objects.all().delete()
+                ActiveLoggerRollup.objects.all().delete()
+                RollupWatermark.objects.all().delete()
+
+        start = time.perf_counter()
+        recommendations, weight_logs = rollups.refresh(options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'folded {recommendations} recommendations and {weight_logs} weight logs in {elapsed:.2f}s'
+        )
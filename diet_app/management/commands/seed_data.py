@@ -0,0 +1,109 @@
+"""
+Seed synthetic users, profiles, recommendations and weight logs for load testing
+"""
+
+import json
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from diet_app.ml_utils import diet_predictor
+from diet_app.models import DietRecommendation, UserProfile, WeightLog
+
+GENDERS = ['male', 'female']
+ACTIVITY_LEVELS = ['sedentary', 'light', 'moderate', 'veryActive']
+GOALS = ['lose', 'maintain', 'gain']
+DIET_TYPES = ['veg', 'nonveg', 'vegan']
+
+
+class Command(BaseCommand):
+    help = 'Insert synthetic rows (spread over --days of history) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recommendations', type=int, default=10_000)
+        parser.add_argument('--weight-logs', type=int, default=10_000)
+        parser.add_argument('--days', type=int, default=3 * 365, help='History span for timestamps')
+        parser.add_argument('--batch', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        batch = options['batch']
+
+        user_ids = self._seed_users(rng, options['users'], batch)
+        self._insert(
+            DietRecommendation, options['recommendations'], batch,
+            ['user_id', 'bmi', 'bmi_category', 'tdee', 'recommended_calories', 'diet_type',
+             'diet_plan_title', 'meals', 'tips', 'created_at'],
+            lambda: self._recommendation_row(rng, user_ids),
+        )
+        self._insert(
+            WeightLog, options['weight_logs'], batch,
+            ['user_id', 'weight', 'date', 'notes', 'updated_at'],
+            lambda: (rng.choice(user_ids), round(rng.uniform(45, 120), 1),
+                     connection.ops.adapt_datefield_value(self._timestamp(rng).date()),
+                     rng.choice([None, '', 'after workout', 'morning weigh-in']),
+                     connection.ops.adapt_datetimefield_value(self.now)),
+            ignore_conflicts=True,  # one log per user per day; repeated days are skipped
+        )
+
+    def _timestamp(self, rng):
+        return self.now - timedelta(seconds=rng.randrange(self.days * 86400))
+
+    def _seed_users(self, rng, count, batch):
+        start = User.objects.count()
+        users = [User(username=f'seed{start + i}', email=f'seed{start + i}@example.com', password='!')
+                 for i in range(count)]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch)
+        created = list(User.objects.filter(username__startswith='seed').order_by('id').values_list('id', flat=True))
+
+        profiles = []
+        for user_id in created[-count:] if count else []:
+            profile = UserProfile(
+                user_id=user_id, age=rng.randint(18, 80), gender=rng.choice(GENDERS),
+                height=round(rng.uniform(150, 200), 1), weight=round(rng.uniform(45, 120), 1),
+                activity_level=rng.choice(ACTIVITY_LEVELS), goal=rng.choice(GOALS), diet_type=rng.choice(DIET_TYPES),
+            )
+            profile.bmi = round(profile.weight / (profile.height / 100) ** 2, 1)
+            profiles.append(profile)
+        with transaction.atomic():
+            UserProfile.objects.bulk_create(profiles, batch_size=batch)
+        self.stdout.write(f'users/profiles: {count}')
+        return created
+
+    def _recommendation_row(self, rng, user_ids):
+        result = diet_predictor.predict(
+            rng.randint(18, 80), rng.choice(GENDERS), rng.uniform(150, 200), rng.uniform(45, 120),
+            rng.choice(ACTIVITY_LEVELS), rng.choice(GOALS), rng.choice(DIET_TYPES),
+        )
+        plan = result['diet_plan']
+        return (
+            rng.choice(user_ids), result['bmi'], result['category'], result['tdee'],
+            result['recommended_calories'], result['diet_type'], plan['title'],
+            json.dumps(plan['meals']), json.dumps(plan['tips']),
+            connection.ops.adapt_datetimefield_value(self._timestamp(rng)),
+        )
+
+    def _insert(self, model, count, batch, columns, make_row, ignore_conflicts=False):
+        """Raw executemany inserts, so timestamps are not overridden by auto_now_add"""
+        table = connection.ops.quote_name(model._meta.db_table)
+        on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+        sql = (f'{connection.ops.insert_statement(on_conflict=on_conflict)} {table} ({", ".join(columns)}) '
+               f'VALUES ({", ".join(["%s"] * len(columns))}) '
+               f'{connection.ops.on_conflict_suffix_sql(model._meta.fields, on_conflict, None, None)}')
+        done = 0
+        while done < count:
+            rows = [make_row() for _ in range(min(batch, count - done))]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            done += len(rows)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {count}')
@@ -0,0 +1,71 @@
+"""
+Email weekly progress digests to active users
+"""
+
+import datetime
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from diet_app.digest import CHUNK_SIZE, last_week, send_digests
+
+
+def _run_shard(week_start, shard, shards, options):
+    """Entry point of a forked worker: send one shard on its own DB connection"""
+    connections.close_all()
+    return send_digests(
+        week_start, shard, shards, chunk_size=options['chunk_size'],
+        dry_run=options['dry_run'], restart=options['restart'],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Send the weekly digest for one week; resumable, and shardable across processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--week', default=None, help='Any date in the week (default: last completed week)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Users per query batch / connection')
+        parser.add_argument('--shard', type=int, default=0, help='Shard to send when running shards separately')
+        parser.add_argument('--shards', type=int, default=1, help='Split users into this many shards (id modulo)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Fork one process per shard and send all of them (implies --shards WORKERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Render without sending or checkpointing')
+        parser.add_argument('--restart', action='store_true', help='Ignore checkpoints and start over')
+
+    def handle(self, *args, **options):
+        if options['week']:
+            try:
+                day = datetime.date.fromisoformat(options['week'])
+            except ValueError:
+                raise CommandError('--week must be YYYY-MM-DD')
+            week_start = day - datetime.timedelta(days=day.weekday())
+        else:
+            week_start = last_week()
+        start = time.perf_counter()
+
+        if options['workers'] > 1:
+            shards = options['workers']
+            connections.close_all()  # forked children must not share the parent's connection
+            with multiprocessing.get_context('fork').Pool(shards) as pool:
+                results = pool.starmap(_run_shard, [(week_start, shard, shards, options) for shard in range(shards)])
+            handled = sum(results)
+            for shard, count in enumerate(results):
+                self.stdout.write(f'  shard {shard + 1}/{shards}: {count}')
+        else:
+            shard, shards = options['shard'], options['shards']
+            if not 0 <= shard < shards:
+                raise CommandError('--shard must be between 0 and --shards - 1')
+            handled = send_digests(
+                week_start, shard, shards, chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'], restart=options['restart'],
+                progress=(lambda sent: self.stdout.write(f'  {sent} sent')) if options['verbosity'] > 1 else None,
+            )
+
+        elapsed = time.perf_counter() - start
+        verb = 'rendered' if options['dry_run'] else 'sent'
+        self.stdout.write(
+            f'Week of {week_start}: {handled} digests {verb} in {elapsed:.1f}s'
+            f'{f" ({handled / elapsed:.0f}/s)" if handled and elapsed else ""}'
+        )
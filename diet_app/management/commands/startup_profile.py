@@ -0,0 +1,75 @@
+"""
+Report where process startup time goes, from python -X importtime
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a WSGI worker imports before it can serve its first request: the
+# application (django.setup(): settings, apps, models, admin) and the URLconf
+# (views and everything they import).
+DEFAULT_MODULES = ['diet_project.wsgi', 'diet_project.urls']
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into (module, self_us, cumulative_us, depth) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2  # two spaces per nesting level
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile module import time at startup (python -X importtime) and optionally enforce a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='Modules to import')
+        parser.add_argument('--top', type=int, default=15, help='Number of modules to list')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs; the median total is reported')
+        parser.add_argument('--budget', type=float, help='Fail if the median total exceeds this many ms')
+
+    def handle(self, *args, **options):
+        runs = [self._profile(options['modules']) for _ in range(max(1, options['repeat']))]
+        totals = [sum(cumulative for _, _, cumulative, depth in rows if depth == 0) for rows in runs]
+        median = statistics.median(totals)
+        rows = runs[totals.index(min(totals, key=lambda total: abs(total - median)))]
+
+        self.stdout.write(f'import {", ".join(options["modules"])}: {median / 1000:.1f} ms '
+                          f'(median of {len(runs)}, {len(rows)} modules)\n')
+
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in rows:
+            by_package[name.split('.')[0]] += self_us
+        self.stdout.write('By top-level package (self time):')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {100 * self_us / median:5.1f}%  {package}')
+
+        self.stdout.write('\nSlowest imports (cumulative):')
+        for name, self_us, cumulative, depth in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  self {self_us / 1000:6.1f} ms  {"  " * depth}{name}')
+
+        budget = options['budget']
+        if budget is not None:
+            if median / 1000 > budget:
+                raise CommandError(f'Startup imports took {median / 1000:.1f} ms, over the {budget:.0f} ms budget')
+            self.stdout.write(self.style.SUCCESS(f'\nWithin the {budget:.0f} ms budget'))
+
+    def _profile(self, modules):
+        code = 'import django; django.setup(); ' + '; '.join(f'import {module}' for module in modules)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return parse_importtime(result.stderr)
@@ -0,0 +1,51 @@
+"""
+Refresh file-copy SQLite replicas of the primary database for local testing
+"""
+
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary over every SQLite alias in DATABASE_REPLICAS, once or every --interval seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help='Keep refreshing this often')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The primary database is not SQLite')
+        replicas = [
+            settings.DATABASES[alias]['NAME'] for alias in settings.DATABASE_REPLICAS
+            if settings.DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3'
+        ]
+        if not replicas:
+            raise CommandError('No SQLite aliases in DATABASE_REPLICAS')
+        while True:
+            start = time.perf_counter()
+            for name in replicas:
+                copy_database(primary['NAME'], name)
+            self.stdout.write(f'{len(replicas)} replicas refreshed in {time.perf_counter() - start:.1f}s')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+
+def copy_database(source, destination):
+    """Consistent online copy (SQLite backup API), swapped into place atomically.
+
+    Connections already open keep reading the old copy; new ones see the new.
+    """
+    temporary = f'{destination}.tmp'
+    src, dst = sqlite3.connect(source), sqlite3.connect(temporary)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    os.replace(temporary, destination)
@@ -0,0 +1,52 @@
+"""
+Check that restriction-filtered diet plans contain nothing the restrictions exclude
+"""
+
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from diet_app.meals import RESTRICTION_INGREDIENTS
+from diet_app.ml_utils import DIET_PLANS, DietPredictor, MEAL_INDEX
+
+# Words that must never appear in a plan filtered for the restriction,
+# independent of INGREDIENT_PATTERNS (so a pattern that misses one is caught)
+FORBIDDEN_WORDS = {
+    'peanuts': ('peanut',),
+    'tree_nuts': ('almond', 'cashew', 'walnut'),
+    'fish': ('fish',),
+    'eggs': ('egg', 'omelette'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Verify every plan filtered for allergies/restrictions avoids the excluded ingredients'
+
+    def handle(self, *args, **options):
+        codes = list(RESTRICTION_INGREDIENTS)
+        restriction_sets = [(code,) for code in codes] + list(combinations(codes, 2))
+        checked = failures = 0
+        for category, by_diet_type in DIET_PLANS.items():
+            for diet_type in by_diet_type:
+                for restrictions in restriction_sets:
+                    plan = DietPredictor.get_diet_plan(category, None, diet_type, restrictions)
+                    checked += 1
+                    for meal in plan['meals']:
+                        problem = self._problem(meal.lower(), restrictions)
+                        if problem:
+                            failures += 1
+                            self.stderr.write(f'{category}/{diet_type} {"+".join(restrictions)}: {problem} in {meal!r}')
+        self.stdout.write(f'plans checked: {checked}, meals with an excluded ingredient: {failures}')
+        if failures:
+            raise CommandError('Filtered plans contain excluded ingredients; fix INGREDIENT_PATTERNS')
+
+    @staticmethod
+    def _problem(text, restrictions):
+        for code in restrictions:
+            for name in RESTRICTION_INGREDIENTS[code]:
+                if MEAL_INDEX.patterns[name].search(text):
+                    return name
+            for word in FORBIDDEN_WORDS.get(code, ()):
+                if word in text:
+                    return word
+        return None
@@ -0,0 +1,96 @@
+"""
+Check the precomputed BMI grid against the scalar formulas and time both
+"""
+
+import random
+import timeit
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from diet_app import grid as grid_module
+from diet_app.grid import GRID_SHAPE, PredictorGrid, grid_height, grid_weight
+from diet_app.ml_utils import DietPredictor, diet_predictor
+from diet_app.validation import FIELD_SPECS
+
+CHOICES = {name: choices for name, _, _, _, choices in FIELD_SPECS if choices}
+
+
+@contextmanager
+def grid_enabled(grid):
+    """Serve predictions from grid, whatever PREDICTOR_GRID says"""
+    saved = grid_module._grid, grid_module._grid_loaded
+    grid_module._grid, grid_module._grid_loaded = grid, True
+    try:
+        yield
+    finally:
+        grid_module._grid, grid_module._grid_loaded = saved
+
+
+class Command(BaseCommand):
+    help = 'Verify every grid cell matches the formulas and report memory/latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=20_000, help='Random full predictions to compare')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        path = settings.PREDICTOR_GRID_PATH
+        try:
+            grid = PredictorGrid(np.load(path, mmap_mode='r'))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'{e} (run build_predictor_grid first)')
+        rng = random.Random(options['seed'])
+
+        mismatches = 0
+        for row in range(GRID_SHAPE[0]):
+            height = grid_height(row)
+            for column in range(GRID_SHAPE[1]):
+                weight = grid_weight(column)
+                bmi = DietPredictor.calculate_bmi(weight, height)
+                if grid.lookup(height, weight) != (round(bmi, 1), DietPredictor.get_bmi_category(bmi)):
+                    mismatches += 1
+        cells = GRID_SHAPE[0] * GRID_SHAPE[1]
+        self.stdout.write(f'cells checked: {cells}, mismatches: {mismatches}')
+
+        off_grid = sum(grid.lookup(rng.uniform(100, 250), rng.uniform(30, 200)) is not None for _ in range(10_000))
+        self.stdout.write(f'off-grid inputs answered from the grid: {off_grid} (expected ~0, they use the formulas)')
+
+        inputs = [self._random_input(rng) for _ in range(options['samples'])]
+        formula_results = [diet_predictor.predict(*args) for args in inputs]
+        with grid_enabled(grid):
+            grid_results = [diet_predictor.predict(*args) for args in inputs]
+        differing = sum(a != b for a, b in zip(formula_results, grid_results))
+        self.stdout.write(f'full predictions compared: {len(inputs)}, differing: {differing}')
+
+        self.stdout.write(
+            f'\ngrid file: {path.stat().st_size / 1024 / 1024:.2f} MB ({grid.array.dtype}, {GRID_SHAPE}), '
+            'memory-mapped read-only and shared by all workers through the page cache'
+        )
+        height, weight = 175.5, 72.3
+        timings = [
+            ('BMI + category, formulas', lambda: DietPredictor.get_bmi_category(DietPredictor.calculate_bmi(weight, height))),
+            ('BMI + category, grid lookup', lambda: grid.lookup(height, weight)),
+            ('predict(), formulas', lambda: diet_predictor.predict(30, 'male', height, weight, 'moderate', 'lose', 'veg')),
+        ]
+        for label, func in timings:
+            self._time(label, func)
+        with grid_enabled(grid):
+            self._time('predict(), grid', lambda: diet_predictor.predict(30, 'male', height, weight, 'moderate', 'lose', 'veg'))
+
+        if mismatches or differing:
+            raise CommandError('Grid does not match the formulas; rebuild it')
+
+    def _time(self, label, func, number=200_000):
+        per_call = min(timeit.repeat(func, number=number, repeat=3)) / number
+        self.stdout.write(f'  {label:<30} {per_call * 1e9:7.0f} ns')
+
+    def _random_input(self, rng):
+        return (
+            rng.randint(10, 100), rng.choice(CHOICES['gender']),
+            grid_height(rng.randrange(GRID_SHAPE[0])), grid_weight(rng.randrange(GRID_SHAPE[1])),
+            rng.choice(CHOICES['activity_level']), rng.choice(CHOICES['goal']), rng.choice(CHOICES['diet_type']),
+        )
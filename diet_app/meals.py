@@ -0,0 +1,177 @@
+"""
+Meal catalog index for allergen- and restriction-aware diet plans
+
+Every meal of the plan catalog (DIET_PLANS) is tagged once, when the index
+is built, with the ingredients its text mentions. The index keeps one bitset
+(a Python int, bit i = meal i) per ingredient, per restriction (the OR of
+its ingredients), per meal slot (breakfast, mid-morning, ...), per BMI
+category and per diet type (meals without the ingredients that diet type
+excludes). Filtering a plan for any combination of restrictions is then an
+OR of the restriction bitsets and, per unsafe meal, an AND with the slot,
+diet type and category bitsets to find a substitute; finished plans are
+cached per (plan, restrictions).
+"""
+
+import re
+
+# Ingredient tag: pattern over the lowercased meal text
+INGREDIENT_PATTERNS = {
+    'peanut': r'peanut',
+    'almond': r'almond',
+    'cashew': r'cashew',
+    'walnut': r'walnut',
+    'mixed_nuts': r'\bnuts\b|dry fruits',
+    'milk': r'(?<!almond )(?<!coconut )\bmilk\b|dairy',
+    'paneer': r'paneer',
+    'curd': r'\bcurd\b',
+    'yogurt': r'(?<!vegan )yogurt',
+    'cheese': r'cheese',
+    'ghee': r'\bghee\b',
+    'butter': r'(?<!peanut )\bbutter\b',
+    'cream': r'makhani|raita|kheer',
+    'whey': r'(?<!vegan )protein shake',
+    'wheat': r'roti|chapati|paratha|bread|toast|sandwich',
+    'oats': r'\boats\b|oatmeal',
+    'egg': r'\beggs?\b|omelette|bhurji',
+    'chicken': r'chicken',
+    'fish': r'\bfish\b',
+    'tofu': r'tofu',
+    'tempeh': r'tempeh',
+    'sesame': r'tahini|hummus',
+    'salty': r'soup|broth|\bchat\b|roasted chana|\bfry\b|cheese',
+    'sugary': r'kheer|juice|smoothie|\bdates\b|mango',
+}
+
+# Restriction code (UserProfile.allergies / dietary_restrictions): ingredients it excludes
+RESTRICTION_INGREDIENTS = {
+    'peanuts': {'peanut'},
+    'tree_nuts': {'almond', 'cashew', 'walnut', 'mixed_nuts'},
+    'dairy': {'milk', 'paneer', 'curd', 'yogurt', 'cheese', 'ghee', 'butter', 'cream', 'whey'},
+    'gluten': {'wheat', 'oats'},
+    'eggs': {'egg'},
+    'fish': {'fish'},
+    'soy': {'tofu', 'tempeh'},
+    'sesame': {'sesame'},
+    'low_sodium': {'salty'},
+    'low_sugar': {'sugary'},
+}
+
+RESTRICTION_LABELS = {
+    'peanuts': 'peanuts', 'tree_nuts': 'tree nuts', 'dairy': 'dairy', 'gluten': 'gluten', 'eggs': 'eggs',
+    'fish': 'fish', 'soy': 'soy', 'sesame': 'sesame', 'low_sodium': 'high-sodium foods',
+    'low_sugar': 'high-sugar foods',
+}
+
+# Ingredients a substitute may not contain, by the plan's diet type
+DIET_EXCLUDES = {
+    'nonveg': set(),
+    'veg': {'egg', 'chicken', 'fish'},
+    'vegan': {'egg', 'chicken', 'fish'} | RESTRICTION_INGREDIENTS['dairy'],
+}
+
+# Substitutes come from the plan's own BMI category first, then the nearest ones
+CATEGORY_ORDER = ('Underweight', 'Healthy', 'Overweight', 'Obese')
+
+SLOT_NAME_RE = re.compile(r'(\w[\w-]*):')
+
+
+def _lowest(bits):
+    """Index of the lowest set bit"""
+    return (bits & -bits).bit_length() - 1
+
+
+class MealIndex:
+    """Bitset inverted index over the meals of a plan catalog"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.meals = []  # meal id -> text
+        self.plan_meals = {}  # (category, diet type) -> meal ids in slot order
+        self.slot_names = []
+        self.ingredients = dict.fromkeys(INGREDIENT_PATTERNS, 0)
+        self.slots = []
+        self.categories = {}
+        self.patterns = {name: re.compile(pattern) for name, pattern in INGREDIENT_PATTERNS.items()}
+
+        for category, by_diet_type in plans.items():
+            for diet_type, plan in by_diet_type.items():
+                ids = []
+                for slot, text in enumerate(plan['meals']):
+                    meal = len(self.meals)
+                    self.meals.append(text)
+                    ids.append(meal)
+                    while len(self.slots) <= slot:
+                        self.slots.append(0)
+                        match = SLOT_NAME_RE.search(text)
+                        self.slot_names.append(match.group(1).lower() if match else f'meal {slot + 1}')
+                    self.slots[slot] |= 1 << meal
+                    self.categories[category] = self.categories.get(category, 0) | 1 << meal
+                    lowered = text.lower()
+                    for name, pattern in self.patterns.items():
+                        if pattern.search(lowered):
+                            self.ingredients[name] |= 1 << meal
+                self.plan_meals[category, diet_type] = tuple(ids)
+
+        everything = (1 << len(self.meals)) - 1
+        self.restrictions = {code: self._union(names) for code, names in RESTRICTION_INGREDIENTS.items()}
+        self.diet_types = {diet_type: everything & ~self._union(names) for diet_type, names in DIET_EXCLUDES.items()}
+        self._filtered = {}
+
+    def _union(self, ingredient_names):
+        bits = 0
+        for name in ingredient_names:
+            bits |= self.ingredients[name]
+        return bits
+
+    def avoided(self, restrictions):
+        """Bitset of meals containing anything the restrictions exclude (unknown codes are ignored)"""
+        bits = 0
+        for code in restrictions:
+            bits |= self.restrictions.get(code, 0)
+        return bits
+
+    def filter_plan(self, category, diet_type, restrictions):
+        """The catalog plan with every meal the restrictions exclude substituted.
+
+        A substitute is a meal for the same slot that is safe and fits the
+        diet type, from the nearest BMI category. A slot with no safe meal is
+        dropped, and so are tips recommending an excluded ingredient. Unknown codes are ignored. Returns the catalog plan itself
+        when nothing changes; like catalog plans, the result is shared and
+        read-only.
+        """
+        key = (category, diet_type, frozenset(code for code in restrictions if code in self.restrictions))
+        plan = self._filtered.get(key)
+        if plan is None:
+            plan = self._filtered[key] = self._filter(category, diet_type, key[2])
+        return plan
+
+    def _filter(self, category, diet_type, restrictions):
+        plan = self.plans[category][diet_type]
+        avoid = self.avoided(restrictions)
+        ids = self.plan_meals[category, diet_type]
+        if not any(avoid >> meal & 1 for meal in ids):
+            return plan
+
+        allowed = self.diet_types[diet_type] & ~avoid
+        position = CATEGORY_ORDER.index(category) if category in CATEGORY_ORDER else 0
+        nearest = sorted(self.categories, key=lambda other: abs(CATEGORY_ORDER.index(other) - position))
+        meals, missing = [], []
+        for slot, meal in enumerate(ids):
+            if not avoid >> meal & 1:
+                meals.append(self.meals[meal])
+                continue
+            candidates = self.slots[slot] & allowed
+            substitute = next((candidates & self.categories[other] for other in nearest
+                               if candidates & self.categories[other]), 0)
+            if substitute:
+                meals.append(self.meals[_lowest(substitute)])
+            else:
+                missing.append(self.slot_names[slot])
+
+        excluded = [self.patterns[name] for code in restrictions for name in RESTRICTION_INGREDIENTS[code]]
+        tips = [tip for tip in plan['tips'] if not any(pattern.search(tip.lower()) for pattern in excluded)]
+        labels = [RESTRICTION_LABELS[code] for code in sorted(restrictions) if avoid & self.restrictions[code]]
+        tips.append(f"Meals adjusted to avoid {', '.join(labels)}")
+        if missing:
+            tips.append(f"No {' or '.join(missing)} option avoids all your restrictions; plan that meal with a dietitian")
+        return {**plan, 'meals': meals, 'tips': tips}
@@ -0,0 +1,34 @@
+"""
+In-process counters for Diet Recommendation System
+
+Used by API throttling, shadow evaluation and the live update hub, and
+exposed by the staff metrics endpoint. Counts are per process.
+"""
+
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """Thread-safe counters exposed by the API metrics endpoint"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts, in_flight=self.in_flight)
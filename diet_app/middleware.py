@@ -0,0 +1,88 @@
+"""
+Middleware for Diet Recommendation System
+"""
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import routers
+
+try:
+    import brotli
+except ImportError:  # Fall back to gzip only
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress responses above COMPRESSION_MIN_SIZE with brotli or gzip.
+
+    Brotli is limited to COMPRESSION_BROTLI_PATHS (JSON API and history pages,
+    which carry no CSRF token); everything else goes through Django's gzip,
+    which pads output to mitigate BREACH.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response  # compressing per event would buffer or garble the stream
+        if response.streaming or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (brotli is not None
+                and request.path.startswith(tuple(settings.COMPRESSION_BROTLI_PATHS))
+                and re_accepts_brotli.search(accept_encoding)):
+            return self._brotli_response(response)
+        return super().process_response(request, response)
+
+    @staticmethod
+    def _brotli_response(response):
+        """Brotli-encode a non-streaming response in place"""
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # The representation changed, so a strong validator no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Track writes for read-replica routing (see diet_app.routers).
+
+    A request that writes sets a cookie pinning the client to the primary
+    for REPLICA_PIN_SECONDS. Must sit above SessionMiddleware, whose session
+    saves are writes too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if routers.pool is None:
+            return self.get_response(request)
+        state, token = routers.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        if state.wrote:
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DatabaseError):
+            routers.replica_failed()
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:37
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+
+def backfill_bmi(apps, schema_editor):
+    UserProfile = apps.get_model('diet_app', 'UserProfile')
+    UserProfile.objects.update(bmi=Round(F('weight') * 10000 / (F('height') * F('height')), 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='bmi',
+            field=models.FloatField(editable=False, help_text='Stored from height/weight on save', null=True),
+        ),
+        migrations.RunPython(backfill_bmi, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dietrecommendation',
+            index=models.Index(fields=['created_at'], name='diet_app_di_created_753707_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietrecommendation',
+            index=models.Index(fields=['bmi_category', 'created_at'], name='diet_app_di_bmi_cat_518705_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dietrecommendation',
+            index=models.Index(fields=['diet_type', 'created_at'], name='diet_app_di_diet_ty_b91e9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['bmi'], name='diet_app_us_bmi_04325e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['gender'], name='diet_app_us_gender_b1abec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['diet_type'], name='diet_app_us_diet_ty_0cb189_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['goal'], name='diet_app_us_goal_00fb09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['activity_level'], name='diet_app_us_activit_b5c9a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['created_at'], name='diet_app_us_created_9cb308_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weightlog',
+            index=models.Index(fields=['date'], name='diet_app_we_date_85cb04_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet_app', '0002_profile_bmi_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveLoggerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('active_users', models.PositiveIntegerField(default=0)),
+                ('log_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Active Logger Rollup',
+                'verbose_name_plural': 'Active Logger Rollups',
+                'ordering': ['-period_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecommendationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('bmi_category', models.CharField(max_length=20)),
+                ('diet_type', models.CharField(max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('calories_total', models.BigIntegerField(default=0, help_text='Sum of recommended_calories')),
+            ],
+            options={
+                'verbose_name': 'Recommendation Rollup',
+                'verbose_name_plural': 'Recommendation Rollups',
+                'ordering': ['-period_start', 'bmi_category', 'diet_type'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='recommendationrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'period_start', 'bmi_category', 'diet_type'), name='unique_recommendation_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='activeloggerrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'period_start'), name='unique_active_logger_rollup'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('diet_app', '0003_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('weight_log', 'Weight Log'), ('recommendation', 'Diet Recommendation')], max_length=20)),
+                ('month', models.DateField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('value_sum', models.FloatField()),
+                ('value_min', models.FloatField()),
+                ('value_max', models.FloatField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archive Summary',
+                'verbose_name_plural': 'Archive Summaries',
+                'ordering': ['user', 'kind', 'month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('weight_log', 'Weight Log'), ('recommendation', 'Diet Recommendation')], max_length=20)),
+                ('month', models.DateField(help_text='First day of the month the rows belong to')),
+                ('path', models.CharField(help_text='Relative to ARCHIVE_DIR', max_length=255)),
+                ('rows', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archive File',
+                'verbose_name_plural': 'Archive Files',
+                'ordering': ['kind', 'month'],
+                'indexes': [models.Index(fields=['kind', 'month'], name='diet_app_ar_kind_c5ca00_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivesummary',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'month'), name='unique_archive_summary'),
+        ),
+    ]
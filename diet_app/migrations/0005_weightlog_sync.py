@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:34
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.utils.timezone
+
+
+def remove_duplicate_days(apps, schema_editor):
+    """Keep only the latest entry per user and day before the unique constraint"""
+    WeightLog = apps.get_model('diet_app', 'WeightLog')
+    latest = WeightLog.objects.values('user', 'date').annotate(latest=Max('id')).values('latest')
+    WeightLog.objects.exclude(id__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet_app', '0004_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weightlog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='weightlog',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate, help_text='One entry per user per day'),
+        ),
+        migrations.AddIndex(
+            model_name='weightlog',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='diet_app_we_user_id_710ecf_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='weightlog',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_weight_log_per_day'),
+        ),
+    ]
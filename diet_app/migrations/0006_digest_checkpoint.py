@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet_app', '0005_weightlog_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('shards', models.PositiveSmallIntegerField(default=1)),
+                ('last_user_id', models.BigIntegerField(default=0, help_text='Digests are sent to users up to this id')),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Digest Checkpoint',
+                'verbose_name_plural': 'Digest Checkpoints',
+                'ordering': ['-week_start', 'shards', 'shard'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='digestcheckpoint',
+            constraint=models.UniqueConstraint(fields=('week_start', 'shard', 'shards'), name='unique_digest_checkpoint'),
+        ),
+    ]
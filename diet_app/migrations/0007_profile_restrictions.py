@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diet_app', '0006_digest_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='allergies',
+            field=models.JSONField(blank=True, default=list, help_text='Codes from ALLERGY_CHOICES'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='dietary_restrictions',
+            field=models.JSONField(blank=True, default=list, help_text='Codes from DIETARY_RESTRICTION_CHOICES'),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:20
+
+from django.db import migrations
+
+# The DDL below is a frozen copy of diet_app.search as of this migration, so
+# later changes to that module (applied by `manage.py rebuild_search_index`)
+# do not change what this migration creates on a fresh database.
+
+USER_TABLE = 'auth_user'
+
+# index table: (source table, indexed column)
+INDEXES = {
+    'diet_app_recommendation_search': ('diet_app_dietrecommendation', 'diet_plan_title'),
+    'diet_app_weight_log_search': ('diet_app_weightlog', 'notes'),
+}
+
+
+def _sqlite_write(table, column, row, user, where, delete=False):
+    columns = f'rowid, {column}, username, email'
+    values = f'{row}.id, {row}.{column}, {user}.username, {user}.email'
+    if delete:
+        columns, values = f'{table}, {columns}', f"'delete', {values}"
+    return f'INSERT INTO {table}({columns}) SELECT {values} {where}'
+
+
+def sqlite_install(table, source, column):
+    owner = f'FROM {USER_TABLE} u WHERE u.id = {{row}}.user_id'
+    user_rows = f'FROM {source} r WHERE r.user_id = NEW.id'
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({column}, username, email, content='', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER {table}_insert AFTER INSERT ON {source} BEGIN '
+        f'{_sqlite_write(table, column, "NEW", "u", owner.format(row="NEW"))}; END',
+        f'CREATE TRIGGER {table}_update AFTER UPDATE OF {column}, user_id ON {source} BEGIN '
+        f'{_sqlite_write(table, column, "OLD", "u", owner.format(row="OLD"), delete=True)}; '
+        f'{_sqlite_write(table, column, "NEW", "u", owner.format(row="NEW"))}; END',
+        f'CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN '
+        f'{_sqlite_write(table, column, "OLD", "u", owner.format(row="OLD"), delete=True)}; END',
+        f'CREATE TRIGGER {table}_user AFTER UPDATE OF username, email ON {USER_TABLE} '
+        f'WHEN OLD.username IS NOT NEW.username OR OLD.email IS NOT NEW.email BEGIN '
+        f'{_sqlite_write(table, column, "r", "OLD", user_rows, delete=True)}; '
+        f'{_sqlite_write(table, column, "r", "NEW", user_rows)}; END',
+        _sqlite_write(table, column, 'r', 'u', f'FROM {source} r JOIN {USER_TABLE} u ON u.id = r.user_id'),
+        f"INSERT INTO {table}({table}) VALUES ('optimize')",
+    ]
+
+
+def sqlite_uninstall(table, source, column):
+    return [
+        *(f'DROP TRIGGER IF EXISTS {table}_{name}' for name in ('insert', 'update', 'delete', 'user')),
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+def _postgres_document(column, row, user):
+    text = f"coalesce({row}.{column}, '') || ' ' || {user}.username || ' ' || coalesce({user}.email, '')"
+    return f"to_tsvector('simple', regexp_replace(lower({text}), '[^[:alnum:]]+', ' ', 'g'))"
+
+
+def postgres_install(table, source, column):
+    return [
+        f'CREATE TABLE {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {table}_document ON {table} USING gin (document)',
+        f"""CREATE FUNCTION {table}_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM {table} WHERE id = OLD.id;
+        RETURN OLD;
+    END IF;
+    INSERT INTO {table} (id, document)
+    SELECT NEW.id, {_postgres_document(column, 'NEW', 'u')} FROM {USER_TABLE} u WHERE u.id = NEW.user_id
+    ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document;
+    RETURN NEW;
+END $$""",
+        f'CREATE TRIGGER {table}_refresh AFTER INSERT OR DELETE OR UPDATE OF {column}, user_id '
+        f'ON {source} FOR EACH ROW EXECUTE FUNCTION {table}_refresh()',
+        f"""CREATE FUNCTION {table}_user() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE {table} s SET document = {_postgres_document(column, 'r', 'NEW')}
+    FROM {source} r WHERE r.id = s.id AND r.user_id = NEW.id;
+    RETURN NEW;
+END $$""",
+        f'CREATE TRIGGER {table}_user AFTER UPDATE OF username, email ON {USER_TABLE} FOR EACH ROW '
+        f'WHEN (OLD.username IS DISTINCT FROM NEW.username OR OLD.email IS DISTINCT FROM NEW.email) '
+        f'EXECUTE FUNCTION {table}_user()',
+        f'INSERT INTO {table} (id, document) SELECT r.id, {_postgres_document(column, "r", "u")} '
+        f'FROM {source} r JOIN {USER_TABLE} u ON u.id = r.user_id',
+        f'ANALYZE {table}',
+    ]
+
+
+def postgres_uninstall(table, source, column):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_refresh ON {source}',
+        f'DROP TRIGGER IF EXISTS {table}_user ON {USER_TABLE}',
+        f'DROP FUNCTION IF EXISTS {table}_refresh()',
+        f'DROP FUNCTION IF EXISTS {table}_user()',
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def _run(schema_editor, builders):
+    connection = schema_editor.connection
+    build = builders.get(connection.vendor)
+    if build is None or (connection.vendor == 'sqlite' and not _has_fts5(connection)):
+        return  # the admin falls back to its search_fields
+    for table, (source, column) in INDEXES.items():
+        for sql in build(table, source, column):
+            schema_editor.execute(sql, params=None)
+
+
+def install_search_index(apps, schema_editor):
+    """Create and fill the full-text index tables and their triggers"""
+    _run(schema_editor, {'sqlite': sqlite_install, 'postgresql': postgres_install})
+
+
+def uninstall_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': sqlite_uninstall, 'postgresql': postgres_uninstall})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('diet_app', '0007_profile_restrictions'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -1,34 +1,299 @@
 """
 Machine Learning Utilities for Diet Recommendation
+
+Importing this module is cheap: pickle and the model artifacts (and the ML
+stack they pull in) are loaded only by predict_models(), which shadow
+evaluation calls; predict() and predict_result() use the formulas and never
+touch them. When `manage.py compile_models` has written .npz
+files next to the pickles, those are loaded instead and scikit-learn is never
+imported (see compiled_models).
 """
 
-import pickle
-import numpy as np
-from pathlib import Path
+import logging
+import threading
+
 from django.conf import settings
 
+from .grid import get_grid
+from .meals import MealIndex
+from .schemas import PredictionResult
+from .validation import FIELD_SPECS
+
+logger = logging.getLogger(__name__)
+
+# DietPredictor attribute: artifact name in ML_MODELS_DIR (.pkl or compiled .npz)
+MODEL_ARTIFACTS = {
+    'bmi_model': 'bmi_classifier',
+    'tdee_model': 'tdee_regressor',
+    'le_category': 'label_encoder_category',
+    'le_gender': 'label_encoder_gender',
+}
+
+# Activity level features are indexes into this list (see model_features)
+ACTIVITY_LEVELS = next(choices for name, _, _, _, choices in FIELD_SPECS if name == 'activity_level')
+
+
+def model_features(age, gender, height, weight, activity_level):
+    """Feature rows for the BMI classifier and the TDEE regressor, in training order.
+
+    Shared by prediction and model fitting so both use one layout:
+    [gender, height, weight] (the columns of datasets/bmi.csv) and
+    [gender, height, weight, age, activity level index]. Gender is 1 for
+    male and 0 for female, the codes a LabelEncoder gives Female/Male.
+    """
+    male = float(gender.lower() == 'male')
+    return [male, height, weight], [male, height, weight, age, ACTIVITY_LEVELS.index(activity_level)]
+
+# Built once at import; get_diet_plan() returns these shared dicts, so
+# callers must treat plans as read-only.
+DIET_PLANS = {
+    'Underweight': {
+        'veg': {
+            'title': "High-Calorie Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Paneer paratha + milk + almonds + banana",
+                "🍽️ Mid-Morning: Peanut butter sandwich + mango smoothie",
+                "🍛 Lunch: Rice + dal makhani + mixed veg curry + curd + ghee roti",
+                "☕ Evening: Dry fruits (cashews, walnuts) + cheese cubes + fruit juice",
+                "🌙 Dinner: 3 roti + paneer butter masala + raita + kheer"
+            ],
+            'tips': [
+                "Eat every 2-3 hours",
+                "Add ghee/butter to all meals",
+                "Include paneer, tofu in every meal",
+                "Consume nuts and dairy products regularly"
+            ]
+        },
+        'nonveg': {
+            'title': "High-Calorie Non-Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Egg bhurji (3 eggs) + bread + milk + banana",
+                "🍽️ Mid-Morning: Chicken sandwich + protein shake",
+                "🍛 Lunch: Rice + chicken curry + dal + egg + curd + ghee roti",
+                "☕ Evening: Dry fruits + boiled eggs (2) + smoothie",
+                "🌙 Dinner: 3 roti + butter chicken + fish fry + raita"
+            ],
+            'tips': [
+                "Include eggs in breakfast daily",
+                "Eat lean meats (chicken, fish) twice daily",
+                "Add protein supplements if needed",
+                "Consume calorie-dense non-veg items"
+            ]
+        },
+        'vegan': {
+            'title': "High-Calorie Vegan Diet",
+            'meals': [
+                "🌅 Breakfast: Tofu scramble + avocado toast + almond milk + banana",
+                "🍽️ Mid-Morning: Peanut butter + apple + vegan protein shake",
+                "🍛 Lunch: Brown rice + chickpea curry + tofu + mixed dal + tahini",
+                "☕ Evening: Mixed nuts + hummus + dates + coconut milk smoothie",
+                "🌙 Dinner: Quinoa + lentil curry + roasted vegetables + flax seeds"
+            ],
+            'tips': [
+                "Use plant-based protein sources (tofu, tempeh, legumes)",
+                "Add nuts, seeds, and nut butters liberally",
+                "Include avocado and coconut products",
+                "Consider vegan protein supplements"
+            ]
+        }
+    },
+    'Healthy': {
+        'veg': {
+            'title': "Balanced Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Oats/poha + fruits + paneer + green tea",
+                "🍽️ Mid-Morning: Curd + handful of almonds",
+                "🍛 Lunch: 2 roti + dal + mixed veg + salad + curd",
+                "☕ Evening: Sprouts chat + green tea + fruit",
+                "🌙 Dinner: Soup + 2 chapati + paneer curry + cucumber salad"
+            ],
+            'tips': [
+                "Maintain regular meal times",
+                "Include variety of vegetables and pulses",
+                "Stay hydrated (8-10 glasses water)",
+                "Exercise 30 mins daily"
+            ]
+        },
+        'nonveg': {
+            'title': "Balanced Non-Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Boiled eggs (2) + oats + fruits + milk",
+                "🍽️ Mid-Morning: Yogurt + nuts + banana",
+                "🍛 Lunch: 2 roti + chicken/fish curry + dal + salad",
+                "☕ Evening: Boiled egg + fruit + green tea",
+                "🌙 Dinner: Soup + 2 chapati + grilled chicken + vegetables"
+            ],
+            'tips': [
+                "Include lean protein in every meal",
+                "Eat fish 2-3 times per week",
+                "Balance with plenty of vegetables",
+                "Regular exercise essential"
+            ]
+        },
+        'vegan': {
+            'title': "Balanced Vegan Diet",
+            'meals': [
+                "🌅 Breakfast: Oatmeal + berries + chia seeds + almond milk",
+                "🍽️ Mid-Morning: Apple + walnuts + vegan yogurt",
+                "🍛 Lunch: Quinoa + chickpea curry + mixed vegetables + tahini",
+                "☕ Evening: Hummus + carrot sticks + green tea",
+                "🌙 Dinner: Lentil soup + whole grain bread + roasted tofu + salad"
+            ],
+            'tips': [
+                "Ensure B12 supplementation",
+                "Combine legumes with grains for complete protein",
+                "Include variety of plant-based proteins",
+                "Eat rainbow of vegetables daily"
+            ]
+        }
+    },
+    'Overweight': {
+        'veg': {
+            'title': "Calorie-Controlled Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Green tea + moong dal cheela + 1 fruit",
+                "🍽️ Mid-Morning: Apple/orange + 5 almonds",
+                "🍛 Lunch: Brown rice (small) + dal + lots of salad + curd",
+                "☕ Evening: Roasted chana + green tea + cucumber",
+                "🌙 Dinner: Vegetable soup + 1 roti + steamed vegetables"
+            ],
+            'tips': [
+                "Avoid fried foods and sweets",
+                "Cut refined carbs and sugar",
+                "Eat smaller, frequent meals",
+                "Walk 45 mins daily"
+            ]
+        },
+        'nonveg': {
+            'title': "Calorie-Controlled Non-Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Green tea + egg white omelette (3 whites) + 1 toast",
+                "🍽️ Mid-Morning: Apple + handful of nuts",
+                "🍛 Lunch: Brown rice (small) + grilled chicken breast + salad",
+                "☕ Evening: Boiled eggs (whites only) + green tea",
+                "🌙 Dinner: Clear soup + grilled fish + steamed vegetables"
+            ],
+            'tips': [
+                "Choose lean proteins (chicken breast, fish)",
+                "Avoid red meat and fried items",
+                "No sugar, no processed foods",
+                "Cardio exercise 45 mins daily"
+            ]
+        },
+        'vegan': {
+            'title': "Calorie-Controlled Vegan Diet",
+            'meals': [
+                "🌅 Breakfast: Green tea + tofu scramble + spinach + tomato",
+                "🍽️ Mid-Morning: Orange + 8 almonds",
+                "🍛 Lunch: Quinoa (small portion) + lentil curry + large salad",
+                "☕ Evening: Carrot sticks + hummus + green tea",
+                "🌙 Dinner: Vegetable soup + steamed broccoli + baked tofu"
+            ],
+            'tips': [
+                "Focus on low-calorie, high-volume foods",
+                "Avoid vegan junk foods and oils",
+                "Include plenty of leafy greens",
+                "Stay active throughout the day"
+            ]
+        }
+    },
+    'Obese': {
+        'veg': {
+            'title': "Intensive Weight Loss Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: High protein - moong dal sprouts + green tea",
+                "🍽️ Mid-Morning: Cucumber/carrot sticks only",
+                "🍛 Lunch: Large salad bowl + 1 small roti + dal (no rice)",
+                "☕ Evening: Herbal tea + roasted chana (small handful)",
+                "🌙 Dinner: Clear vegetable soup + steamed vegetables"
+            ],
+            'tips': [
+                "Eliminate all sugar, sweets, fried foods",
+                "Consider intermittent fasting (16:8)",
+                "Drink 2 glasses water before meals",
+                "Cardio exercise 60 mins daily",
+                "Consult a nutritionist"
+            ]
+        },
+        'nonveg': {
+            'title': "Intensive Weight Loss Non-Vegetarian Diet",
+            'meals': [
+                "🌅 Breakfast: Egg whites (4-5) + spinach + black coffee",
+                "🍽️ Mid-Morning: Cucumber only",
+                "🍛 Lunch: Large salad + grilled chicken breast (100g) + lemon",
+                "☕ Evening: Green tea + carrot sticks",
+                "🌙 Dinner: Clear soup + grilled fish + steamed broccoli"
+            ],
+            'tips': [
+                "Only lean proteins - chicken breast, fish",
+                "Zero sugar, zero fried foods",
+                "High protein, very low carb approach",
+                "Intensive exercise 60+ mins daily",
+                "Medical supervision recommended"
+            ]
+        },
+        'vegan': {
+            'title': "Intensive Weight Loss Vegan Diet",
+            'meals': [
+                "🌅 Breakfast: Tofu scramble + spinach + black coffee",
+                "🍽️ Mid-Morning: Celery sticks only",
+                "🍛 Lunch: Large raw salad + baked tofu (small) + lemon",
+                "☕ Evening: Herbal tea + cucumber slices",
+                "🌙 Dinner: Vegetable broth + steamed greens + small portion legumes"
+            ],
+            'tips': [
+                "Whole food plant-based approach",
+                "Eliminate all processed vegan foods",
+                "High fiber, low calorie density",
+                "Intensive daily exercise required",
+                "Professional guidance essential"
+            ]
+        }
+    }
+}
+
+# Ingredient/allergen index over every meal above, for restriction filtering
+MEAL_INDEX = MealIndex(DIET_PLANS)
+
+
 class DietPredictor:
     """Handle ML predictions and calculations"""
     
     def __init__(self):
         self.models_loaded = False
+        self.load_attempted = False
         self.bmi_model = None
         self.tdee_model = None
         self.le_category = None
         self.le_gender = None
+        self._load_lock = threading.Lock()
+        
+    def ensure_models(self):
+        """Load the models once per process; later calls return immediately"""
+        if not self.load_attempted:
+            with self._load_lock:
+                if not self.load_attempted:
+                    self.load_models()
+                    self.load_attempted = True
+        return self.models_loaded
         
-    def load_models(self):
-        """Load trained ML models"""
+    def load_models(self, models_dir=None):
+        """Load trained ML models (from ML_MODELS_DIR unless models_dir is given)"""
+        models_dir = settings.ML_MODELS_DIR if models_dir is None else models_dir
         try:
-            models_dir = settings.ML_MODELS_DIR
-            self.bmi_model = pickle.load(open(models_dir / 'bmi_classifier.pkl', 'rb'))
-            self.tdee_model = pickle.load(open(models_dir / 'tdee_regressor.pkl', 'rb'))
-            self.le_category = pickle.load(open(models_dir / 'label_encoder_category.pkl', 'rb'))
-            self.le_gender = pickle.load(open(models_dir / 'label_encoder_gender.pkl', 'rb'))
+            if all((models_dir / f'{name}.npz').exists() for name in MODEL_ARTIFACTS.values()):
+                from .compiled_models import load_compiled
+                for attribute, name in MODEL_ARTIFACTS.items():
+                    setattr(self, attribute, load_compiled(models_dir / f'{name}.npz'))
+            else:
+                import pickle  # deferred with the unpickled model classes (sklearn/numpy)
+                for attribute, name in MODEL_ARTIFACTS.items():
+                    with open(models_dir / f'{name}.pkl', 'rb') as f:
+                        setattr(self, attribute, pickle.load(f))
             self.models_loaded = True
             return True
         except Exception as e:
-            print(f"Error loading models: {e}")
+            logger.warning('Error loading models from %s: %s', models_dir, e)
             return False
     
     @staticmethod
@@ -75,223 +340,26 @@ class DietPredictor:
         return tdee
     
     @staticmethod
-    def get_diet_plan(category, goal, diet_type):
-        """Get diet plan based on category and type"""
-        
-        plans = {
-            'Underweight': {
-                'veg': {
-                    'title': "High-Calorie Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Paneer paratha + milk + almonds + banana",
-                        "🍽️ Mid-Morning: Peanut butter sandwich + mango smoothie",
-                        "🍛 Lunch: Rice + dal makhani + mixed veg curry + curd + ghee roti",
-                        "☕ Evening: Dry fruits (cashews, walnuts) + cheese cubes + fruit juice",
-                        "🌙 Dinner: 3 roti + paneer butter masala + raita + kheer"
-                    ],
-                    'tips': [
-                        "Eat every 2-3 hours",
-                        "Add ghee/butter to all meals",
-                        "Include paneer, tofu in every meal",
-                        "Consume nuts and dairy products regularly"
-                    ]
-                },
-                'nonveg': {
-                    'title': "High-Calorie Non-Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Egg bhurji (3 eggs) + bread + milk + banana",
-                        "🍽️ Mid-Morning: Chicken sandwich + protein shake",
-                        "🍛 Lunch: Rice + chicken curry + dal + egg + curd + ghee roti",
-                        "☕ Evening: Dry fruits + boiled eggs (2) + smoothie",
-                        "🌙 Dinner: 3 roti + butter chicken + fish fry + raita"
-                    ],
-                    'tips': [
-                        "Include eggs in breakfast daily",
-                        "Eat lean meats (chicken, fish) twice daily",
-                        "Add protein supplements if needed",
-                        "Consume calorie-dense non-veg items"
-                    ]
-                },
-                'vegan': {
-                    'title': "High-Calorie Vegan Diet",
-                    'meals': [
-                        "🌅 Breakfast: Tofu scramble + avocado toast + almond milk + banana",
-                        "🍽️ Mid-Morning: Peanut butter + apple + vegan protein shake",
-                        "🍛 Lunch: Brown rice + chickpea curry + tofu + mixed dal + tahini",
-                        "☕ Evening: Mixed nuts + hummus + dates + coconut milk smoothie",
-                        "🌙 Dinner: Quinoa + lentil curry + roasted vegetables + flax seeds"
-                    ],
-                    'tips': [
-                        "Use plant-based protein sources (tofu, tempeh, legumes)",
-                        "Add nuts, seeds, and nut butters liberally",
-                        "Include avocado and coconut products",
-                        "Consider vegan protein supplements"
-                    ]
-                }
-            },
-            'Healthy': {
-                'veg': {
-                    'title': "Balanced Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Oats/poha + fruits + paneer + green tea",
-                        "🍽️ Mid-Morning: Curd + handful of almonds",
-                        "🍛 Lunch: 2 roti + dal + mixed veg + salad + curd",
-                        "☕ Evening: Sprouts chat + green tea + fruit",
-                        "🌙 Dinner: Soup + 2 chapati + paneer curry + cucumber salad"
-                    ],
-                    'tips': [
-                        "Maintain regular meal times",
-                        "Include variety of vegetables and pulses",
-                        "Stay hydrated (8-10 glasses water)",
-                        "Exercise 30 mins daily"
-                    ]
-                },
-                'nonveg': {
-                    'title': "Balanced Non-Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Boiled eggs (2) + oats + fruits + milk",
-                        "🍽️ Mid-Morning: Yogurt + nuts + banana",
-                        "🍛 Lunch: 2 roti + chicken/fish curry + dal + salad",
-                        "☕ Evening: Boiled egg + fruit + green tea",
-                        "🌙 Dinner: Soup + 2 chapati + grilled chicken + vegetables"
-                    ],
-                    'tips': [
-                        "Include lean protein in every meal",
-                        "Eat fish 2-3 times per week",
-                        "Balance with plenty of vegetables",
-                        "Regular exercise essential"
-                    ]
-                },
-                'vegan': {
-                    'title': "Balanced Vegan Diet",
-                    'meals': [
-                        "🌅 Breakfast: Oatmeal + berries + chia seeds + almond milk",
-                        "🍽️ Mid-Morning: Apple + walnuts + vegan yogurt",
-                        "🍛 Lunch: Quinoa + chickpea curry + mixed vegetables + tahini",
-                        "☕ Evening: Hummus + carrot sticks + green tea",
-                        "🌙 Dinner: Lentil soup + whole grain bread + roasted tofu + salad"
-                    ],
-                    'tips': [
-                        "Ensure B12 supplementation",
-                        "Combine legumes with grains for complete protein",
-                        "Include variety of plant-based proteins",
-                        "Eat rainbow of vegetables daily"
-                    ]
-                }
-            },
-            'Overweight': {
-                'veg': {
-                    'title': "Calorie-Controlled Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Green tea + moong dal cheela + 1 fruit",
-                        "🍽️ Mid-Morning: Apple/orange + 5 almonds",
-                        "🍛 Lunch: Brown rice (small) + dal + lots of salad + curd",
-                        "☕ Evening: Roasted chana + green tea + cucumber",
-                        "🌙 Dinner: Vegetable soup + 1 roti + steamed vegetables"
-                    ],
-                    'tips': [
-                        "Avoid fried foods and sweets",
-                        "Cut refined carbs and sugar",
-                        "Eat smaller, frequent meals",
-                        "Walk 45 mins daily"
-                    ]
-                },
-                'nonveg': {
-                    'title': "Calorie-Controlled Non-Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Green tea + egg white omelette (3 whites) + 1 toast",
-                        "🍽️ Mid-Morning: Apple + handful of nuts",
-                        "🍛 Lunch: Brown rice (small) + grilled chicken breast + salad",
-                        "☕ Evening: Boiled eggs (whites only) + green tea",
-                        "🌙 Dinner: Clear soup + grilled fish + steamed vegetables"
-                    ],
-                    'tips': [
-                        "Choose lean proteins (chicken breast, fish)",
-                        "Avoid red meat and fried items",
-                        "No sugar, no processed foods",
-                        "Cardio exercise 45 mins daily"
-                    ]
-                },
-                'vegan': {
-                    'title': "Calorie-Controlled Vegan Diet",
-                    'meals': [
-                        "🌅 Breakfast: Green tea + tofu scramble + spinach + tomato",
-                        "🍽️ Mid-Morning: Orange + 8 almonds",
-                        "🍛 Lunch: Quinoa (small portion) + lentil curry + large salad",
-                        "☕ Evening: Carrot sticks + hummus + green tea",
-                        "🌙 Dinner: Vegetable soup + steamed broccoli + baked tofu"
-                    ],
-                    'tips': [
-                        "Focus on low-calorie, high-volume foods",
-                        "Avoid vegan junk foods and oils",
-                        "Include plenty of leafy greens",
-                        "Stay active throughout the day"
-                    ]
-                }
-            },
-            'Obese': {
-                'veg': {
-                    'title': "Intensive Weight Loss Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: High protein - moong dal sprouts + green tea",
-                        "🍽️ Mid-Morning: Cucumber/carrot sticks only",
-                        "🍛 Lunch: Large salad bowl + 1 small roti + dal (no rice)",
-                        "☕ Evening: Herbal tea + roasted chana (small handful)",
-                        "🌙 Dinner: Clear vegetable soup + steamed vegetables"
-                    ],
-                    'tips': [
-                        "Eliminate all sugar, sweets, fried foods",
-                        "Consider intermittent fasting (16:8)",
-                        "Drink 2 glasses water before meals",
-                        "Cardio exercise 60 mins daily",
-                        "Consult a nutritionist"
-                    ]
-                },
-                'nonveg': {
-                    'title': "Intensive Weight Loss Non-Vegetarian Diet",
-                    'meals': [
-                        "🌅 Breakfast: Egg whites (4-5) + spinach + black coffee",
-                        "🍽️ Mid-Morning: Cucumber only",
-                        "🍛 Lunch: Large salad + grilled chicken breast (100g) + lemon",
-                        "☕ Evening: Green tea + carrot sticks",
-                        "🌙 Dinner: Clear soup + grilled fish + steamed broccoli"
-                    ],
-                    'tips': [
-                        "Only lean proteins - chicken breast, fish",
-                        "Zero sugar, zero fried foods",
-                        "High protein, very low carb approach",
-                        "Intensive exercise 60+ mins daily",
-                        "Medical supervision recommended"
-                    ]
-                },
-                'vegan': {
-                    'title': "Intensive Weight Loss Vegan Diet",
-                    'meals': [
-                        "🌅 Breakfast: Tofu scramble + spinach + black coffee",
-                        "🍽️ Mid-Morning: Celery sticks only",
-                        "🍛 Lunch: Large raw salad + baked tofu (small) + lemon",
-                        "☕ Evening: Herbal tea + cucumber slices",
-                        "🌙 Dinner: Vegetable broth + steamed greens + small portion legumes"
-                    ],
-                    'tips': [
-                        "Whole food plant-based approach",
-                        "Eliminate all processed vegan foods",
-                        "High fiber, low calorie density",
-                        "Intensive daily exercise required",
-                        "Professional guidance essential"
-                    ]
-                }
-            }
-        }
-        
-        return plans.get(category, {}).get(diet_type, plans['Healthy']['veg'])
+    def get_diet_plan(category, goal, diet_type, restrictions=()):
+        """Get diet plan based on category and type, adjusted for allergies/restrictions"""
+        if diet_type not in DIET_PLANS.get(category, {}):
+            category, diet_type = 'Healthy', 'veg'
+        if not restrictions:
+            return DIET_PLANS[category][diet_type]
+        return MEAL_INDEX.filter_plan(category, diet_type, restrictions)
     
-    def predict(self, age, gender, height, weight, activity_level, goal, diet_type):
-        """Make complete prediction"""
+    def _compute(self, age, gender, height, weight, activity_level, goal, diet_type, restrictions=()):
+        """Run the calculation pipeline shared by predict() and predict_result()"""
         
-        # Calculate BMI
-        bmi = self.calculate_bmi(weight, height)
-        category = self.get_bmi_category(bmi)
+        # Calculate BMI (a grid lookup when the precomputed grid is enabled)
+        grid = get_grid()
+        cell = grid.lookup(height, weight) if grid is not None else None
+        if cell is not None:
+            bmi, category = cell
+        else:
+            bmi = self.calculate_bmi(weight, height)
+            category = self.get_bmi_category(bmi)
+            bmi = round(bmi, 1)
         
         # Calculate TDEE
         tdee = self.calculate_tdee(weight, height, age, gender, activity_level)
@@ -300,17 +368,52 @@ class DietPredictor:
         recommended_calories = self.adjust_calories_for_goal(tdee, goal)
         
         # Get diet plan
-        diet_plan = self.get_diet_plan(category, goal, diet_type)
+        diet_plan = self.get_diet_plan(category, goal, diet_type, restrictions)
+        
+        return bmi, category, round(tdee), round(recommended_calories), diet_plan
+    
+    def predict(self, age, gender, height, weight, activity_level, goal, diet_type, restrictions=()):
+        """Make complete prediction"""
+        bmi, category, tdee, recommended_calories, diet_plan = self._compute(
+            age, gender, height, weight, activity_level, goal, diet_type, restrictions
+        )
         
         return {
-            'bmi': round(bmi, 1),
+            'bmi': bmi,
             'category': category,
-            'tdee': round(tdee),
-            'recommended_calories': round(recommended_calories),
+            'tdee': tdee,
+            'recommended_calories': recommended_calories,
             'diet_plan': diet_plan,
             'diet_type': diet_type
         }
+    
+    def predict_models(self, age, gender, height, weight, activity_level):
+        """(category, tdee) from the trained models, or None if they are not loaded (features: model_features)"""
+        if not self.ensure_models():
+            return None
+        bmi_row, tdee_row = model_features(age, gender, height, weight, activity_level)
+        category = self.le_category.inverse_transform([self.bmi_model.predict([bmi_row])[0]])[0]
+        tdee = self.tdee_model.predict([tdee_row])[0]
+        return str(category), float(tdee)
+    
+    def predict_result(self, age, gender, height, weight, activity_level, goal, diet_type, restrictions=()):
+        """Make complete prediction as a PredictionResult (used by the API)"""
+        return PredictionResult(
+            *self._compute(age, gender, height, weight, activity_level, goal, diet_type, restrictions),
+            diet_type=diet_type
+        )
+
+
+# Create global instance (construction only sets attributes; see ensure_models)
+diet_predictor = DietPredictor()
+
 
+def prewarm():
+    """Load what the first request would otherwise load (call from a post-fork hook)
 
-# Create global instance
-diet_predictor = DietPredictor()
\ No newline at end of file
+    That is the predictor grid, plus the trained models only when shadow
+    evaluation, their sole user, is enabled.
+    """
+    get_grid()
+    if settings.SHADOW_MODEL_DIR is not None:
+        diet_predictor.ensure_models()
\ No newline at end of file
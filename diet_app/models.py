@@ -5,6 +5,23 @@ Django Models for Diet Recommendation System
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+# Codes understood by meals.MealIndex (see diet_app.meals.RESTRICTION_INGREDIENTS)
+ALLERGY_CHOICES = [
+    ('peanuts', 'Peanuts'),
+    ('tree_nuts', 'Tree nuts'),
+    ('dairy', 'Dairy / lactose'),
+    ('gluten', 'Gluten'),
+    ('eggs', 'Eggs'),
+    ('fish', 'Fish'),
+    ('soy', 'Soy'),
+    ('sesame', 'Sesame'),
+]
+DIETARY_RESTRICTION_CHOICES = [
+    ('low_sodium', 'Low sodium'),
+    ('low_sugar', 'Low sugar'),
+]
 
 class UserProfile(models.Model):
     """Extended user profile with health information"""
@@ -41,15 +58,40 @@ class UserProfile(models.Model):
         ],
         default='veg'
     )
+    allergies = models.JSONField(default=list, blank=True, help_text='Codes from ALLERGY_CHOICES')
+    dietary_restrictions = models.JSONField(default=list, blank=True, help_text='Codes from DIETARY_RESTRICTION_CHOICES')
+    bmi = models.FloatField(editable=False, null=True, help_text='Stored from height/weight on save')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    @property
+    def restrictions(self):
+        """Allergy and dietary restriction codes, for DietPredictor.predict(restrictions=...)"""
+        return (*self.allergies, *self.dietary_restrictions)
+
+    def save(self, *args, **kwargs):
+        """Keep the stored BMI in sync with height and weight"""
+        self.bmi = round(self.weight / (self.height / 100) ** 2, 1)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'height', 'weight'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'bmi'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+        # One index per admin list_filter / date_hierarchy field
+        indexes = [
+            models.Index(fields=['bmi']),
+            models.Index(fields=['gender']),
+            models.Index(fields=['diet_type']),
+            models.Index(fields=['goal']),
+            models.Index(fields=['activity_level']),
+            models.Index(fields=['created_at']),
+        ]
 
 
 class DietRecommendation(models.Model):
@@ -72,14 +114,21 @@ class DietRecommendation(models.Model):
         verbose_name = 'Diet Recommendation'
         verbose_name_plural = 'Diet Recommendations'
         ordering = ['-created_at']
+        # Filter column first so filtered changelists can also read in created_at order
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['bmi_category', 'created_at']),
+            models.Index(fields=['diet_type', 'created_at']),
+        ]
 
 
 class WeightLog(models.Model):
     """Track user weight over time"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weight_logs')
     weight = models.FloatField(help_text='Weight in kg')
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate, help_text='One entry per user per day')
     notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.weight}kg on {self.date}"
@@ -87,4 +136,144 @@ class WeightLog(models.Model):
     class Meta:
         verbose_name = 'Weight Log'
         verbose_name_plural = 'Weight Logs'
-        ordering = ['-date']
\ No newline at end of file
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['user', 'updated_at', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_weight_log_per_day'),
+        ]
+
+
+class RecommendationRollup(models.Model):
+    """Recommendation counts per day/week, BMI category and diet type"""
+    PERIOD_CHOICES = [('day', 'Day'), ('week', 'Week')]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    bmi_category = models.CharField(max_length=20)
+    diet_type = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+    calories_total = models.BigIntegerField(default=0, help_text='Sum of recommended_calories')
+
+    def __str__(self):
+        return f"{self.period} {self.period_start} - {self.bmi_category}/{self.diet_type}: {self.count}"
+
+    @property
+    def average_calories(self):
+        return round(self.calories_total / self.count) if self.count else None
+
+    class Meta:
+        verbose_name = 'Recommendation Rollup'
+        verbose_name_plural = 'Recommendation Rollups'
+        ordering = ['-period_start', 'bmi_category', 'diet_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'bmi_category', 'diet_type'], name='unique_recommendation_rollup'
+            ),
+        ]
+
+
+class ActiveLoggerRollup(models.Model):
+    """Distinct users logging weight per day/week"""
+    period = models.CharField(max_length=4, choices=RecommendationRollup.PERIOD_CHOICES)
+    period_start = models.DateField()
+    active_users = models.PositiveIntegerField(default=0)
+    log_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.period} {self.period_start}: {self.active_users} active loggers"
+
+    class Meta:
+        verbose_name = 'Active Logger Rollup'
+        verbose_name_plural = 'Active Logger Rollups'
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'period_start'], name='unique_active_logger_rollup'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """Highest source row id already folded into the rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+ARCHIVE_KIND_CHOICES = [('weight_log', 'Weight Log'), ('recommendation', 'Diet Recommendation')]
+
+
+class ArchiveFile(models.Model):
+    """Compressed NDJSON file holding rows moved out of a hot table (see diet_app.archive)"""
+    kind = models.CharField(max_length=20, choices=ARCHIVE_KIND_CHOICES)
+    month = models.DateField(help_text='First day of the month the rows belong to')
+    path = models.CharField(max_length=255, help_text='Relative to ARCHIVE_DIR')
+    rows = models.PositiveIntegerField()
+    size_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.month:%Y-%m}: {self.rows} rows"
+
+    class Meta:
+        verbose_name = 'Archive File'
+        verbose_name_plural = 'Archive Files'
+        ordering = ['kind', 'month']
+        indexes = [
+            models.Index(fields=['kind', 'month']),
+        ]
+
+
+class ArchiveSummary(models.Model):
+    """Per-user monthly aggregates of archived rows, so trends survive archival.
+
+    value is weight (kg) for weight logs and BMI for recommendations.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archive_summaries')
+    kind = models.CharField(max_length=20, choices=ARCHIVE_KIND_CHOICES)
+    month = models.DateField()
+    row_count = models.PositiveIntegerField()
+    value_sum = models.FloatField()
+    value_min = models.FloatField()
+    value_max = models.FloatField()
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} {self.month:%Y-%m}: {self.row_count}"
+
+    @property
+    def value_avg(self):
+        return round(self.value_sum / self.row_count, 1) if self.row_count else None
+
+    class Meta:
+        verbose_name = 'Archive Summary'
+        verbose_name_plural = 'Archive Summaries'
+        ordering = ['user', 'kind', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'month'], name='unique_archive_summary'),
+        ]
+
+
+class DigestCheckpoint(models.Model):
+    """Progress of one shard of a weekly digest run (see diet_app.digest)"""
+    week_start = models.DateField()
+    shard = models.PositiveSmallIntegerField(default=0)
+    shards = models.PositiveSmallIntegerField(default=1)
+    last_user_id = models.BigIntegerField(default=0, help_text='Digests are sent to users up to this id')
+    sent = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Digest {self.week_start} shard {self.shard + 1}/{self.shards}: {self.sent} sent"
+
+    class Meta:
+        verbose_name = 'Digest Checkpoint'
+        verbose_name_plural = 'Digest Checkpoints'
+        ordering = ['-week_start', 'shards', 'shard']
+        constraints = [
+            models.UniqueConstraint(fields=['week_start', 'shard', 'shards'], name='unique_digest_checkpoint'),
+        ]
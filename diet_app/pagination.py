@@ -0,0 +1,52 @@
+"""
+Paginators for large tables
+"""
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using='default'):
+    """Cheap row-count estimate from database statistics, or None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+            [table],
+        ),
+        # Rowids are assigned sequentially, so MAX(rowid) is an O(log n) upper bound
+        'sqlite': (f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}', []),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Use a statistics-based estimate instead of COUNT(*) for unfiltered large tables.
+
+    Filtered querysets, and tables below ADMIN_ESTIMATED_COUNT_THRESHOLD rows,
+    still get an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is not None and not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,171 @@
+"""
+Per-client rate limiting and admission control for the public API
+
+Token buckets are kept per client IP and, when an X-API-Key header is sent,
+per API key. Buckets live in process memory by default; set
+API_RATE_LIMIT_STORE = 'cache' to share them across workers through the
+Django cache. The admission controller caps concurrent requests and sheds
+any request that would wait in the queue longer than max_queue_wait.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import Metrics
+from .serialization import api_response
+
+
+class InMemoryBucketStore:
+    """Token buckets in a bounded LRU dict, private to this process"""
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        """Take a token from every (key, rate, burst) bucket, or from none; return their waits"""
+        with self._lock:
+            states = [self._buckets.pop(key, (burst, now)) for key, _, burst in buckets]
+            waits, states = _take_tokens(states, buckets, now)
+            for (key, _, _), state in zip(buckets, states):
+                self._buckets[key] = state
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return waits
+
+
+class CacheBucketStore:
+    """Token buckets in the Django cache, shared by every worker.
+
+    Updates are read-modify-write without a lock, so concurrent requests from
+    one client on different workers may occasionally both get a token. Stamps
+    are wall-clock time, which unlike time.monotonic() is comparable across
+    processes and hosts.
+    """
+    prefix = 'ratelimit:'
+
+    def take(self, buckets, now):
+        keys = [self.prefix + key for key, _, _ in buckets]
+        found = cache.get_many(keys)
+        states = [found.get(cache_key, (burst, now)) for cache_key, (_, _, burst) in zip(keys, buckets)]
+        waits, states = _take_tokens(states, buckets, now)
+        timeout = max(math.ceil(burst / rate) + 1 for _, rate, burst in buckets)
+        cache.set_many(dict(zip(keys, states)), timeout=timeout)
+        return waits
+
+
+def _take_tokens(states, buckets, now):
+    """Refill buckets to now and take a token from each only if all have one; return (waits, new_states)
+
+    A client limited by one bucket is not charged in the others.
+    """
+    tokens = [
+        min(burst, stored + max(0.0, now - stamp) * rate)
+        for (stored, stamp), (_, rate, burst) in zip(states, buckets)
+    ]
+    waits = [max(0.0, (1 - available) / rate) for available, (_, rate, _) in zip(tokens, buckets)]
+    if not any(waits):
+        tokens = [available - 1 for available in tokens]
+    return waits, [(available, now) for available in tokens]
+
+
+class AdmissionController:
+    """Bound concurrency; shed requests whose queue wait would exceed a limit.
+
+    Queue wait counts time already spent upstream (X-Request-Start from the
+    proxy, when trusted) plus time spent waiting for a concurrency slot.
+    """
+
+    def __init__(self, max_concurrent, max_queue_wait):
+        self.max_queue_wait = max_queue_wait
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def acquire(self, queued=0.0):
+        budget = self.max_queue_wait - queued
+        return budget > 0 and self._slots.acquire(timeout=budget)
+
+    def release(self):
+        self._slots.release()
+
+
+def _build_store():
+    if getattr(settings, 'API_RATE_LIMIT_STORE', 'memory') == 'cache':
+        return CacheBucketStore()
+    return InMemoryBucketStore()
+
+
+store = _build_store()
+metrics = Metrics()
+admission = AdmissionController(**settings.API_ADMISSION)
+
+
+def client_ip(request):
+    """Client address; X-Forwarded-For is trusted only behind a known proxy"""
+    if getattr(settings, 'API_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def upstream_queue_time(request):
+    """Seconds since the proxy received the request (X-Request-Start: t=<epoch>)"""
+    if not getattr(settings, 'API_TRUST_X_REQUEST_START', False):
+        return 0.0
+    header = request.META.get('HTTP_X_REQUEST_START', '')
+    try:
+        start = float(header.removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if start > 1e12:  # microseconds (Apache/Heroku style)
+        start /= 1e6
+    return max(0.0, time.time() - start)
+
+
+def _rejected(request, status, retry_after, message):
+    response = api_response(request, {'status': 'error', 'message': message}, status=status)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def throttle(view):
+    """Apply per-IP/per-key token buckets and admission control to an API view"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        start = time.monotonic()  # queue wait; bucket stamps use time.time() (see CacheBucketStore)
+        limits = settings.API_RATE_LIMITS
+        keys = [('ip', client_ip(request))]
+        api_key = request.headers.get('X-API-Key')
+        if api_key:
+            keys.append(('key', api_key))
+
+        waits = store.take([(f'{scope}:{ident}', *limits[scope]) for scope, ident in keys], time.time())
+        if any(waits):
+            for (scope, _), wait in zip(keys, waits):
+                if wait:
+                    metrics.incr(f'rate_limited_{scope}')
+            return _rejected(request, 429, max(waits), 'Rate limit exceeded')
+
+        upstream = upstream_queue_time(request)
+        if not admission.acquire(upstream):
+            metrics.incr('shed')
+            return _rejected(request, 503, admission.max_queue_wait, 'Server busy, retry later')
+        metrics.enter()
+        try:
+            queued = upstream + time.monotonic() - start
+            metrics.incr('queue_wait_ms_total', round(queued * 1000))
+            metrics.incr('admitted')
+            return view(request, *args, **kwargs)
+        finally:
+            metrics.leave()
+            admission.release()
+
+    return wrapper
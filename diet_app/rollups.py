@@ -0,0 +1,247 @@
+"""
+Pre-aggregated population reporting for Diet Recommendation System
+
+Recommendation rollups hold, per day and per week, the number of
+recommendations and the sum of recommended_calories for each
+(bmi_category, diet_type) pair. Rows are folded in by id: a watermark
+records the highest id already counted, so each refresh only reads the new
+id range through the primary key and adds its grouped totals.
+
+Active-logger rollups hold distinct users per day and week, folded in by
+the same kind of watermark. There is one weight log per user per day, so
+each new row adds one active user to its day; it adds one to its week unless
+the user already has a counted log that week, checked per row through the
+(user, date) index. A write therefore costs the same however large the
+week is.
+
+A write refreshes only the rollup of the model it touched. Two refreshes
+racing for the same id range cannot both claim it: the loser raises
+WatermarkConflict and retries on the next range instead of stopping as if
+it were up to date.
+
+Rollups count inserted rows. Edits and deletes of source rows are not
+tracked; run `manage.py refresh_rollups --rebuild` after bulk corrections.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Exists, Max, OuterRef, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+
+from .models import ActiveLoggerRollup, DietRecommendation, RecommendationRollup, RollupWatermark, WeightLog
+from .schemas import ActiveLoggerEntry, RecommendationRollupEntry
+
+PERIODS = {
+    'day': TruncDate,
+    'week': lambda field: TruncWeek(field, output_field=DateField()),
+}
+
+
+class WatermarkConflict(Exception):
+    """Another refresh advanced the watermark first; retry in a new transaction"""
+
+
+def _advance_watermark(name, batch_size):
+    """Claim the next id range (low, high] for name, or None if up to date.
+
+    The watermark moves with a compare-and-swap inside the caller's
+    transaction, so two concurrent refreshes can never fold the same rows;
+    the one that loses raises WatermarkConflict.
+
+    Limit: ids are assigned at insert but become visible at commit, so a row
+    whose transaction commits after a later id has been claimed (concurrent
+    writers on PostgreSQL; SQLite serializes writes) lies below the
+    watermark and is never folded. Such rows are rare and counted again by
+    `refresh_rollups --rebuild`.
+    """
+    watermark, _ = RollupWatermark.objects.get_or_create(name=name)
+    model = {'recommendations': DietRecommendation, 'weight_logs': WeightLog}[name]
+    latest = model.objects.aggregate(latest=Max('id'))['latest'] or 0
+    low = watermark.last_id
+    high = latest if batch_size is None else min(latest, low + batch_size)
+    if high <= low:
+        return None
+    if not RollupWatermark.objects.filter(name=name, last_id=low).update(last_id=high):
+        raise WatermarkConflict(name)
+    return low, high
+
+
+def refresh_recommendations(batch_size=None):
+    """Fold one batch of new recommendations into the rollups.
+
+    Returns the number of rows folded, or None when already up to date.
+    Raises WatermarkConflict when a concurrent refresh claimed the batch.
+    """
+    with transaction.atomic():
+        claimed = _advance_watermark('recommendations', batch_size)
+        if claimed is None:
+            return None
+        low, high = claimed
+        new_rows = DietRecommendation.objects.filter(id__gt=low, id__lte=high)
+
+        totals = {}
+        for period, trunc in PERIODS.items():
+            grouped = (
+                new_rows.annotate(period_start=trunc('created_at'))
+                .values('period_start', 'bmi_category', 'diet_type')
+                .annotate(count=Count('id'), calories=Sum('recommended_calories'))
+                .order_by()
+            )
+            for row in grouped:
+                key = (period, row['period_start'], row['bmi_category'], row['diet_type'])
+                totals[key] = (row['count'], row['calories'] or 0)
+        if not totals:
+            return 0
+
+        folded = sum(count for (period, *_), (count, _) in totals.items() if period == 'day')
+
+        existing = RecommendationRollup.objects.filter(
+            period_start__gte=min(key[1] for key in totals),
+            period_start__lte=max(key[1] for key in totals),
+        )
+        for rollup in existing:
+            key = (rollup.period, rollup.period_start, rollup.bmi_category, rollup.diet_type)
+            if key in totals:
+                count, calories = totals[key]
+                totals[key] = (count + rollup.count, calories + rollup.calories_total)
+        # Merged totals are written with one upsert; bulk_update's CASE
+        # expressions cost seconds per thousand rows.
+        RecommendationRollup.objects.bulk_create(
+            [
+                RecommendationRollup(
+                    period=period, period_start=start, bmi_category=category, diet_type=diet_type,
+                    count=count, calories_total=calories,
+                )
+                for (period, start, category, diet_type), (count, calories) in totals.items()
+            ],
+            batch_size=500, update_conflicts=True,
+            unique_fields=['period', 'period_start', 'bmi_category', 'diet_type'],
+            update_fields=['count', 'calories_total'],
+        )
+        return folded
+
+
+def refresh_active_loggers(batch_size=None):
+    """Fold one batch of new weight logs into the active-logger rollups.
+
+    Returns the number of rows folded, or None when already up to date.
+    Raises WatermarkConflict when a concurrent refresh claimed the batch.
+    """
+    with transaction.atomic():
+        claimed = _advance_watermark('weight_logs', batch_size)
+        if claimed is None:
+            return None
+        low, high = claimed
+        new_rows = WeightLog.objects.filter(id__gt=low, id__lte=high)
+
+        # One log per user per day: every new row is a new active user of its day
+        days = dict(new_rows.values('date').annotate(logs=Count('id')).order_by().values_list('date', 'logs'))
+        if not days:
+            return 0
+        totals = {('day', day): (logs, logs) for day, logs in days.items()}
+        week_logs = {}
+        for day, logs in days.items():
+            week = day - datetime.timedelta(days=day.weekday())
+            week_logs[week] = week_logs.get(week, 0) + logs
+        for week, logs in week_logs.items():
+            end = week + datetime.timedelta(days=7)
+            counted = WeightLog.objects.filter(user=OuterRef('user'), date__gte=week, date__lt=end, id__lte=low)
+            users = (
+                new_rows.filter(date__gte=week, date__lt=end).exclude(Exists(counted))
+                .aggregate(users=Count('user', distinct=True))['users']
+            )
+            totals['week', week] = (users, logs)
+
+        existing = ActiveLoggerRollup.objects.filter(
+            period_start__gte=min(start for _, start in totals), period_start__lte=max(start for _, start in totals),
+        )
+        for rollup in existing:
+            key = (rollup.period, rollup.period_start)
+            if key in totals:
+                users, logs = totals[key]
+                totals[key] = (users + rollup.active_users, logs + rollup.log_count)
+        ActiveLoggerRollup.objects.bulk_create(
+            [
+                ActiveLoggerRollup(period=period, period_start=start, active_users=users, log_count=logs)
+                for (period, start), (users, logs) in totals.items()
+            ],
+            batch_size=500, update_conflicts=True,
+            unique_fields=['period', 'period_start'], update_fields=['active_users', 'log_count'],
+        )
+        return sum(days.values())
+
+
+def default_range(period, today):
+    """Report window ending today: 30 days or 12 weeks"""
+    if period == 'week':
+        end = today - datetime.timedelta(days=today.weekday())
+        return end - datetime.timedelta(weeks=11), end
+    return today - datetime.timedelta(days=29), today
+
+
+def population_report(period, start, end):
+    """Read a report for period buckets starting in [start, end] from the rollups only"""
+    recommendations = (
+        RecommendationRollup.objects.filter(period=period, period_start__gte=start, period_start__lte=end)
+        .order_by('period_start', 'bmi_category', 'diet_type')
+        .values_list('period_start', 'bmi_category', 'diet_type', 'count', 'calories_total')
+    )
+    loggers = (
+        ActiveLoggerRollup.objects.filter(period=period, period_start__gte=start, period_start__lte=end)
+        .order_by('period_start')
+        .values_list('period_start', 'active_users', 'log_count')
+    )
+    return {
+        'period': period,
+        'start': start,
+        'end': end,
+        'recommendations': [
+            RecommendationRollupEntry(day, category, diet_type, count, round(calories / count) if count else 0)
+            for day, category, diet_type, count, calories in recommendations
+        ],
+        'active_loggers': [ActiveLoggerEntry(*row) for row in loggers],
+    }
+
+
+def _catch_up(refresh_batch, batch_size):
+    folded = 0
+    while True:
+        try:
+            batch = refresh_batch(batch_size)
+        except WatermarkConflict:
+            continue  # the other refresh folds its range; claim the next one
+        if batch is None:
+            return folded
+        folded += batch
+
+
+def refresh(batch_size=None):
+    """Catch both rollups up to the newest rows.
+
+    batch_size bounds each transaction. Returns the number of
+    recommendations and weight logs folded.
+    """
+    return _catch_up(refresh_recommendations, batch_size), _catch_up(refresh_active_loggers, batch_size)
+
+
+WRITE_ATTEMPTS = 3
+
+
+def _refresh_after_write(refresh_batch):
+    """Fold one bounded batch, retrying a lost watermark race a few times"""
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            return refresh_batch(settings.ROLLUPS_WRITE_BATCH)
+        except WatermarkConflict:
+            if attempt == WRITE_ATTEMPTS:
+                raise
+
+
+def refresh_on_commit(model):
+    """Schedule a small refresh of model's rollup after the current transaction commits (write path)"""
+    if settings.ROLLUPS_UPDATE_ON_WRITE:
+        refresh_batch = {DietRecommendation: refresh_recommendations, WeightLog: refresh_active_loggers}[model]
+        # robust: a failed refresh is logged and left for the catch-up command
+        transaction.on_commit(lambda: _refresh_after_write(refresh_batch), robust=True)
@@ -0,0 +1,172 @@
+"""
+Rotating multi-week meal plans for Diet Recommendation System
+
+A recommendation's plan repeats the same five meals every day. RotatingPlan
+draws each day's meals instead from every catalog meal that fits the diet
+type and the user's restrictions (see meals.MealIndex), per slot:
+
+- no dinner repeats within any dinner_window_days days (shortened when the
+  diet has fewer dinners than that), so dinner is picked first;
+- the other slots' candidates are the choices_per_slot meals whose estimated
+  calories are closest to the slot's share of the calories still missing
+  that day, and one is picked at random;
+- portions are scaled so the day meets the calorie target from predict(),
+  within PORTION_RANGE; a day that would need more (or less) is refilled
+  with the nearest meals only.
+
+Catalog meals carry no calorie counts, so a meal's estimate is its plan's
+typical daily total (PLAN_CALORIES) times its slot's share (SLOT_SHARES).
+
+Weeks are generated lazily, one at a time, by a day generator, and each
+week is cached (Django cache) per plan version (catalog and generator
+settings), user seed, diet type, calorie target and restrictions, together
+with the dinners it ends on, which is all the next week needs. Every week
+has its own RNG seed, so a revisit is a cache hit and a cache miss
+regenerates the same week.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .meals import RESTRICTION_INGREDIENTS
+from .ml_utils import DIET_PLANS, MEAL_INDEX
+
+# Share of the daily calories per meal slot (breakfast, mid-morning, lunch, evening, dinner)
+SLOT_SHARES = (0.25, 0.10, 0.30, 0.10, 0.25)
+# Typical daily calories of each BMI category's catalog plans
+PLAN_CALORIES = {'Underweight': 2800, 'Healthy': 2200, 'Overweight': 1700, 'Obese': 1300}
+# Portion multipliers a day may use to meet its calorie target
+PORTION_RANGE = (0.75, 1.5)
+CALORIE_TOLERANCE = 0.05
+
+DINNER_SLOT = MEAL_INDEX.slot_names.index('dinner')
+
+
+def _plan_version():
+    """Hash of everything that shapes generated plans; cached weeks are keyed on it"""
+    source = json.dumps(
+        [DIET_PLANS, SLOT_SHARES, PLAN_CALORIES, PORTION_RANGE, settings.MEAL_PLANS], sort_keys=True, default=str
+    )
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+PLAN_VERSION = _plan_version()
+
+
+def _estimates():
+    """Estimated calories of every catalog meal, by meal id"""
+    estimates = [0] * len(MEAL_INDEX.meals)
+    for (category, _), ids in MEAL_INDEX.plan_meals.items():
+        for slot, meal in enumerate(ids):
+            estimates[meal] = PLAN_CALORIES[category] * SLOT_SHARES[slot]
+    return estimates
+
+
+MEAL_CALORIES = _estimates()
+
+
+@lru_cache(maxsize=256)
+def _pool(diet_type, restrictions):
+    """Meal ids usable per slot for a diet type and (frozen) restrictions"""
+    allowed = MEAL_INDEX.diet_types[diet_type] & ~MEAL_INDEX.avoided(restrictions)
+    return tuple(
+        tuple(meal for meal in range(len(MEAL_INDEX.meals)) if (slot_bits & allowed) >> meal & 1)
+        for slot_bits in MEAL_INDEX.slots
+    )
+
+
+def _fill(day, pool, slots, calories, rng, choices):
+    """Pick meals for `slots` of day, each near its share of the calories still missing"""
+    remaining = calories - sum(MEAL_CALORIES[meal] for slot, meal in enumerate(day) if meal is not None and slot not in slots)
+    shares = sum(SLOT_SHARES[slot] for slot in slots)
+    for slot in slots:
+        goal = remaining * SLOT_SHARES[slot] / shares
+        nearest = sorted(pool[slot], key=lambda meal: abs(MEAL_CALORIES[meal] - goal))
+        meal = day[slot] = rng.choice(nearest[:choices])
+        remaining -= MEAL_CALORIES[meal]
+        shares -= SLOT_SHARES[slot]
+
+
+def _days(pool, calories, rng, recent_dinners):
+    """Yield days forever: (meal ids, portion multiplier); updates recent_dinners"""
+    choices = settings.MEAL_PLANS['choices_per_slot']
+    low, high = PORTION_RANGE
+    others = [slot for slot in range(len(pool)) if slot != DINNER_SLOT and pool[slot]]
+    while True:
+        day = [None] * len(pool)
+        # Dinner, the most constrained slot, is picked first
+        dinners = [meal for meal in pool[DINNER_SLOT] if meal not in recent_dinners]
+        if dinners:
+            goal = calories * SLOT_SHARES[DINNER_SLOT]
+            dinners.sort(key=lambda meal: abs(MEAL_CALORIES[meal] - goal))
+            day[DINNER_SLOT] = rng.choice(dinners[:choices])
+            recent_dinners.append(day[DINNER_SLOT])
+        _fill(day, pool, others, calories, rng, choices)
+        estimate = sum(MEAL_CALORIES[meal] for meal in day if meal is not None)
+        if estimate and not low <= calories / estimate <= high:
+            _fill(day, pool, others, calories, rng, 1)  # out of portion range: nearest meals only
+            estimate = sum(MEAL_CALORIES[meal] for meal in day if meal is not None)
+        portion = min(high, max(low, calories / estimate)) if estimate else 1.0
+        yield tuple(meal for meal in day if meal is not None), portion
+
+
+class RotatingPlan:
+    """A weeks-long plan for one user, generated and cached a week at a time"""
+
+    def __init__(self, seed, diet_type, calories, restrictions=()):
+        self.seed = seed
+        self.diet_type = diet_type if diet_type in MEAL_INDEX.diet_types else 'veg'
+        self.calories = int(calories)
+        self.restrictions = frozenset(code for code in restrictions if code in RESTRICTION_INGREDIENTS)
+        self.weeks = settings.MEAL_PLANS['weeks']
+        self.pool = _pool(self.diet_type, self.restrictions)
+        # The window shrinks to the number of dinners available
+        dinners = len(self.pool[DINNER_SLOT])
+        self.dinner_memory = max(0, min(settings.MEAL_PLANS['dinner_window_days'], dinners) - 1)
+        restrictions_key = ','.join(sorted(self.restrictions)) or '-'
+        self.key_prefix = f'mealplan:{PLAN_VERSION}:{seed}:{self.diet_type}:{self.calories}:{restrictions_key}'
+
+    def _generate(self, number, recent_dinners):
+        """Days of week `number` (0-based) following recent_dinners, and the dinners it ends on"""
+        rng = random.Random(f'{self.key_prefix}:{number}')
+        recent = deque(recent_dinners, maxlen=self.dinner_memory)
+        days = list(itertools.islice(_days(self.pool, self.calories, rng, recent), 7))
+        return days, tuple(recent)
+
+    def iter_weeks(self):
+        """Yield each week's days (meal ids, portion), generating only weeks not cached"""
+        keys = [f'{self.key_prefix}:{number}' for number in range(self.weeks)]
+        cached = cache.get_many(keys)  # one round trip
+        recent_dinners = ()
+        for number, key in enumerate(keys):
+            week = cached.get(key)
+            if week is None:
+                week = self._generate(number, recent_dinners)
+                cache.set(key, week, settings.MEAL_PLANS['cache_seconds'])
+            days, recent_dinners = week
+            yield days
+
+    def week(self, number):
+        """Rendered days of week `number` (1-based)"""
+        days = next(itertools.islice(self.iter_weeks(), number - 1, None))
+        return [self.render(day, (number - 1) * 7 + index + 1) for index, day in enumerate(days)]
+
+    def render(self, day, day_number):
+        meals, portion = day
+        calories = round(sum(MEAL_CALORIES[meal] for meal in meals) * portion)
+        return {
+            'day': day_number,
+            'meals': [
+                {'text': MEAL_INDEX.meals[meal], 'calories': round(MEAL_CALORIES[meal] * portion)} for meal in meals
+            ],
+            'portion': round(portion, 2),
+            'calories': calories,
+            'on_target': abs(calories - self.calories) <= self.calories * CALORIE_TOLERANCE,
+        }
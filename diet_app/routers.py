@@ -0,0 +1,183 @@
+"""
+Read-replica database routing for Diet Recommendation System
+
+Views wrapped in @replica_reads (the dashboard, history and weight log
+reads) send their queries to the aliases in DATABASE_REPLICAS, round-robin,
+one replica per request. Everything else, including sessions and
+authentication, reads from the primary.
+
+Read-your-writes: any write during a request makes ReplicaPinMiddleware set
+a short-lived cookie, and a client holding it reads from the primary until
+it expires (REPLICA_PIN_SECONDS), so the page after a POST shows the change
+even if the replicas have not caught up.
+
+Health checks run inline, at most every check_seconds per replica per
+process: a replica is skipped while it cannot be queried or lags by more
+than max_lag_seconds (PostgreSQL: replay lag; SQLite copies made by
+`manage.py sync_sqlite_replicas`: age of the copy). A query failing on a
+replica marks it down until its next check. With every replica down, reads
+go to the primary.
+"""
+
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PIN_COOKIE = 'replica_pin'
+# Apps whose reads always go to the primary (a session read from a lagging
+# replica could log the user out)
+PRIMARY_APPS = {'sessions'}
+
+LAG_QUERIES = {
+    'postgresql': 'SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())',
+}
+
+
+class RequestState:
+    """Routing state of the current request"""
+    __slots__ = ('pinned', 'replica_reads', 'wrote', 'replica')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+        self.replica = None
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind, None if unknown; raises if it cannot be queried"""
+    connection = connections[alias]
+    lag = None
+    if connection.vendor == 'sqlite':
+        # A file copy is as old as the file; checked before connecting,
+        # which would create a missing file
+        lag = time.time() - os.path.getmtime(connection.settings_dict['NAME'])
+    with connection.cursor() as cursor:
+        if connection.vendor in LAG_QUERIES:
+            cursor.execute(LAG_QUERIES[connection.vendor])
+            lag = cursor.fetchone()[0]
+            lag = float(lag) if lag is not None else None
+        else:
+            cursor.execute('SELECT 1')
+    return lag
+
+
+class ReplicaPool:
+    """Round-robin over healthy replica aliases"""
+
+    def __init__(self, aliases, check_seconds=5, max_lag_seconds=30):
+        self.aliases = list(aliases)
+        self.check_seconds = check_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._next = itertools.cycle(self.aliases)
+        self._healthy = dict.fromkeys(self.aliases, True)
+        self._check_at = dict.fromkeys(self.aliases, 0.0)
+        self._lock = threading.Lock()
+
+    def pick(self):
+        """The next healthy replica, or None when all are down"""
+        for _ in self.aliases:
+            with self._lock:
+                alias = next(self._next)
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if now >= self._check_at[alias]:
+            self._check_at[alias] = now + self.check_seconds  # one checker per interval
+            self._healthy[alias] = self._check(alias)
+        return self._healthy[alias]
+
+    def _check(self, alias):
+        try:
+            lag = replica_lag(alias)
+        except (DatabaseError, OSError):
+            return False
+        return lag is None or lag <= self.max_lag_seconds
+
+    def mark_down(self, alias):
+        self._healthy[alias] = False
+        self._check_at[alias] = time.monotonic() + self.check_seconds
+
+    def snapshot(self):
+        return dict(self._healthy)
+
+
+def _build_pool():
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return ReplicaPool(settings.DATABASE_REPLICAS, **settings.REPLICA_HEALTH)
+
+
+pool = _build_pool()
+
+
+class ReplicaRouter:
+    """Route @replica_reads views' reads to a replica; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if pool is None or state is None or not state.replica_reads or state.pinned or state.wrote:
+            return None
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        if state.replica is None:
+            state.replica = pool.pick()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False  # replicas get their schema from the primary
+        return None
+
+
+def replica_reads(view):
+    """Let the view's queries go to a replica (unless the client is pinned to the primary)"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = False
+    return wrapper
+
+
+def begin_request(request):
+    """Start tracking a request; return (state, token for end_request)"""
+    state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def replica_failed():
+    """Mark the current request's replica down after a database error"""
+    state = _state.get()
+    if pool is not None and state is not None and state.replica is not None:
+        pool.mark_down(state.replica)
@@ -0,0 +1,72 @@
+"""
+Typed API payload structures for Diet Recommendation System
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class DietInput:
+    """Validated calculator input (see validation.py)"""
+    age: int
+    gender: str
+    height: float
+    weight: float
+    activity_level: str
+    goal: str
+    diet_type: str
+
+
+@dataclass(slots=True)
+class PredictionResult:
+    """Result of DietPredictor.predict_result, encoded directly by the API"""
+    bmi: float
+    category: str
+    tdee: int
+    recommended_calories: int
+    diet_plan: dict
+    diet_type: str
+
+
+@dataclass(slots=True)
+class WeightLogEntry:
+    """One row of the weight log API"""
+    weight: float
+    date: object  # datetime.date
+
+
+@dataclass(slots=True)
+class WeightSyncEntry:
+    """One changed row of the weight log sync API"""
+    date: object  # datetime.date
+    weight: float
+    notes: str
+    updated_at: object  # datetime.datetime
+
+
+@dataclass(slots=True)
+class RecommendationRollupEntry:
+    """One (period, bmi_category, diet_type) bucket of the population report"""
+    period_start: object  # datetime.date
+    bmi_category: str
+    diet_type: str
+    count: int
+    average_calories: int
+
+
+@dataclass(slots=True)
+class ActiveLoggerEntry:
+    """Distinct weight loggers in one period of the population report"""
+    period_start: object  # datetime.date
+    active_users: int
+    log_count: int
+
+
+@dataclass(slots=True)
+class WeightTrendEntry:
+    """One month of the weight trend API (archived months come from summaries)"""
+    month: object  # datetime.date
+    entries: int
+    average: float
+    min: float
+    max: float
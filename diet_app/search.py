@@ -0,0 +1,245 @@
+"""
+Full-text search for Diet Recommendation System
+
+Admin changelist searches over recommendations (username, email, plan
+title) and weight logs (username, email, notes) read from an inverted index
+instead of LIKE '%...%' scans joined to auth_user:
+
+- SQLite: one contentless FTS5 table per index (rowid = source row id);
+- PostgreSQL: one side table per index, (id, tsvector) under a GIN index.
+
+The index tables are created and filled by migration 0008 and kept in sync
+by database triggers on the source table and on auth_user, so bulk writes
+(sync upserts, archiving deletes, raw SQL) are covered too. On other
+databases, or SQLite builds without FTS5, the admin falls back to its
+search_fields. `manage.py rebuild_search_index` recreates and refills the
+tables.
+
+Every search term must match. A term's words must appear adjacent and in
+order; the last word may be a prefix, the others must be whole words
+("w1 w2"* on FTS5, w1 <-> w2:* in a tsquery). So "john@exam" finds
+john@example.com and "high-cal" finds "High-Calorie", while "jo@exam" and
+"hi-cal" find nothing.
+
+A user's search of their own history (search_own) does not use the index:
+their rows are few and found through the user_id index, while a prefix
+match in the full-text index reads the word's postings for every user.
+"""
+
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+USER_TABLE = 'auth_user'
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+class SearchIndex:
+    """A source table's text column, indexed with its owner's username and email"""
+
+    def __init__(self, name, source, column, own_fields):
+        self.name = name
+        self.source = source
+        self.column = column
+        self.own_fields = own_fields  # model fields search_own looks in
+        self.table = f'diet_app_{name}_search'
+
+
+INDEXES = {
+    'recommendation': SearchIndex(
+        'recommendation', 'diet_app_dietrecommendation', 'diet_plan_title', ('diet_plan_title', 'meals')
+    ),
+    'weight_log': SearchIndex('weight_log', 'diet_app_weightlog', 'notes', ('notes',)),
+}
+
+
+def terms(query):
+    """Search terms as lists of lowercase words; terms without words are dropped"""
+    return [words for words in (WORD_RE.findall(term.lower()) for term in query.split()) if words]
+
+
+class SQLiteBackend:
+    """Contentless FTS5 tables: (text, username, email)"""
+
+    @staticmethod
+    def available(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            return bool(cursor.fetchone()[0])
+
+    @staticmethod
+    def _write(index, row, user, where, delete=False):
+        """INSERT adding (or, with delete, removing) the index entries of the source rows `row` selected by where"""
+        columns = f'rowid, {index.column}, username, email'
+        values = f'{row}.id, {row}.{index.column}, {user}.username, {user}.email'
+        if delete:  # a contentless table needs the indexed values to delete a row
+            columns, values = f'{index.table}, {columns}', f"'delete', {values}"
+        return f'INSERT INTO {index.table}({columns}) SELECT {values} {where}'
+
+    def install_sql(self, index):
+        table, source, column = index.table, index.source, index.column
+        owner = f'FROM {USER_TABLE} u WHERE u.id = {{row}}.user_id'
+        user_rows = f'FROM {source} r WHERE r.user_id = NEW.id'
+        return [
+            # Contentless: the index keeps no copy of the text, only rowids are read back
+            f"CREATE VIRTUAL TABLE {table} USING fts5({column}, username, email, content='', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f'CREATE TRIGGER {table}_insert AFTER INSERT ON {source} BEGIN '
+            f'{self._write(index, "NEW", "u", owner.format(row="NEW"))}; END',
+            f'CREATE TRIGGER {table}_update AFTER UPDATE OF {column}, user_id ON {source} BEGIN '
+            f'{self._write(index, "OLD", "u", owner.format(row="OLD"), delete=True)}; '
+            f'{self._write(index, "NEW", "u", owner.format(row="NEW"))}; END',
+            f'CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN '
+            f'{self._write(index, "OLD", "u", owner.format(row="OLD"), delete=True)}; END',
+            f'CREATE TRIGGER {table}_user AFTER UPDATE OF username, email ON {USER_TABLE} '
+            f'WHEN OLD.username IS NOT NEW.username OR OLD.email IS NOT NEW.email BEGIN '
+            f'{self._write(index, "r", "OLD", user_rows, delete=True)}; {self._write(index, "r", "NEW", user_rows)}; END',
+            self._write(index, 'r', 'u', f'FROM {source} r JOIN {USER_TABLE} u ON u.id = r.user_id'),
+            f"INSERT INTO {table}({table}) VALUES ('optimize')",
+        ]
+
+    @staticmethod
+    def uninstall_sql(index):
+        table = index.table
+        return [
+            *(f'DROP TRIGGER IF EXISTS {table}_{name}' for name in ('insert', 'update', 'delete', 'user')),
+            f'DROP TABLE IF EXISTS {table}',
+        ]
+
+    @staticmethod
+    def match(index, query_terms):
+        expression = ' AND '.join('"' + ' '.join(words) + '"*' for words in query_terms)
+        return f'SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s', [expression]
+
+
+class PostgresBackend:
+    """Side tables (id, tsvector) under GIN indexes"""
+
+    @staticmethod
+    def available(connection):
+        return True
+
+    @staticmethod
+    def _document(index, row, user):
+        # Split on the same characters as terms() does, so an email becomes words
+        text = f"coalesce({row}.{index.column}, '') || ' ' || {user}.username || ' ' || coalesce({user}.email, '')"
+        return f"to_tsvector('simple', regexp_replace(lower({text}), '[^[:alnum:]]+', ' ', 'g'))"
+
+    def install_sql(self, index):
+        table, source = index.table, index.source
+        return [
+            f'CREATE TABLE {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)',
+            f'CREATE INDEX {table}_document ON {table} USING gin (document)',
+            f"""CREATE FUNCTION {table}_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM {table} WHERE id = OLD.id;
+        RETURN OLD;
+    END IF;
+    INSERT INTO {table} (id, document)
+    SELECT NEW.id, {self._document(index, 'NEW', 'u')} FROM {USER_TABLE} u WHERE u.id = NEW.user_id
+    ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document;
+    RETURN NEW;
+END $$""",
+            f'CREATE TRIGGER {table}_refresh AFTER INSERT OR DELETE OR UPDATE OF {index.column}, user_id '
+            f'ON {source} FOR EACH ROW EXECUTE FUNCTION {table}_refresh()',
+            f"""CREATE FUNCTION {table}_user() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE {table} s SET document = {self._document(index, 'r', 'NEW')}
+    FROM {source} r WHERE r.id = s.id AND r.user_id = NEW.id;
+    RETURN NEW;
+END $$""",
+            f'CREATE TRIGGER {table}_user AFTER UPDATE OF username, email ON {USER_TABLE} FOR EACH ROW '
+            f'WHEN (OLD.username IS DISTINCT FROM NEW.username OR OLD.email IS DISTINCT FROM NEW.email) '
+            f'EXECUTE FUNCTION {table}_user()',
+            f'INSERT INTO {table} (id, document) SELECT r.id, {self._document(index, "r", "u")} '
+            f'FROM {source} r JOIN {USER_TABLE} u ON u.id = r.user_id',
+            f'ANALYZE {table}',
+        ]
+
+    @staticmethod
+    def uninstall_sql(index):
+        table = index.table
+        return [
+            f'DROP TRIGGER IF EXISTS {table}_refresh ON {index.source}',
+            f'DROP TRIGGER IF EXISTS {table}_user ON {USER_TABLE}',
+            f'DROP FUNCTION IF EXISTS {table}_refresh()',
+            f'DROP FUNCTION IF EXISTS {table}_user()',
+            f'DROP TABLE IF EXISTS {table}',
+        ]
+
+    @staticmethod
+    def match(index, query_terms):
+        # Words are [^\W_]+, so they need no quoting inside a tsquery
+        tsquery = ' & '.join('(' + ' <-> '.join(words) + ':*)' for words in query_terms)
+        return f"SELECT id FROM {index.table} WHERE document @@ to_tsquery('simple', %s)", [tsquery]
+
+
+BACKENDS = {'sqlite': SQLiteBackend(), 'postgresql': PostgresBackend()}
+
+_ready = {}  # database alias: whether the index tables are there
+
+
+def backend_for(using):
+    """The search backend for a database alias, or None when its index tables are missing"""
+    connection = connections[using]
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return None
+    if using not in _ready:
+        try:
+            tables = set(connection.introspection.table_names())
+        except DatabaseError:
+            return None
+        _ready[using] = all(index.table in tables for index in INDEXES.values())
+    return backend if _ready[using] else None
+
+
+def install(connection):
+    """Create and fill the index tables and their triggers; False where unsupported"""
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None or not backend.available(connection):
+        return False
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for sql in backend.install_sql(index):
+                cursor.execute(sql)
+    _ready.pop(connection.alias, None)
+    return True
+
+
+def uninstall(connection):
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for sql in backend.uninstall_sql(index):
+                cursor.execute(sql)
+    _ready.pop(connection.alias, None)
+
+
+def search(queryset, index_name, query):
+    """Filter queryset to rows matching query, or None if there is no index to search.
+
+    A query without any words leaves the queryset unfiltered.
+    """
+    backend = backend_for(queryset.db)
+    if backend is None:
+        return None
+    query_terms = terms(query)
+    if not query_terms:
+        return queryset
+    sql, params = backend.match(INDEXES[index_name], query_terms)
+    return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+def search_own(queryset, index_name, query):
+    """Filter one user's rows to those containing every search term in one of the index's own_fields"""
+    fields = INDEXES[index_name].own_fields
+    conditions = [reduce(or_, (Q(**{f'{field}__icontains': term}) for field in fields)) for term in query.split()]
+    return queryset.filter(reduce(and_, conditions)) if conditions else queryset
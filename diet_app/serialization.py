@@ -0,0 +1,134 @@
+"""
+Pluggable response serializers for the JSON API
+
+msgspec or orjson are used when installed, falling back to the stdlib json
+module. MessagePack is returned when the client asks for it and msgspec is
+available.
+
+Every JSON serializer produces what msgspec does: compact UTF-8 and
+datetimes in RFC 3339 with all microsecond digits and "Z" for UTC, so
+responses do not change with the libraries installed.
+"""
+
+import abc
+import dataclasses
+import datetime
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class StdlibJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that also understands the dataclasses in schemas.py"""
+
+    def default(self, o):
+        if dataclasses.is_dataclass(o):
+            return {field.name: getattr(o, field.name) for field in dataclasses.fields(o)}
+        # DjangoJSONEncoder truncates to milliseconds; keep every digit like msgspec
+        if isinstance(o, datetime.datetime):
+            text = o.isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        if isinstance(o, datetime.time):
+            return o.isoformat()
+        return super().default(o)
+
+
+class Serializer(abc.ABC):
+    """Encode a payload to bytes for a given content type"""
+    name = None
+    content_type = 'application/json'
+
+    @abc.abstractmethod
+    def dumps(self, payload):
+        """Encoded payload (bytes)"""
+
+
+class StdlibSerializer(Serializer):
+    name = 'stdlib'
+
+    def dumps(self, payload):
+        return json.dumps(payload, cls=StdlibJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonSerializer(Serializer):
+    name = 'orjson'
+
+    def dumps(self, payload):
+        return orjson.dumps(payload, option=orjson.OPT_UTC_Z)
+
+
+class MsgspecJSONSerializer(Serializer):
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+
+    def dumps(self, payload):
+        return self._encoder.encode(payload)
+
+
+class MsgpackSerializer(Serializer):
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+
+    def __init__(self):
+        self._encoder = msgspec.msgpack.Encoder()
+
+    def dumps(self, payload):
+        return self._encoder.encode(payload)
+
+
+def available_json_serializers():
+    """All JSON serializers usable in this environment, fastest first"""
+    serializers = []
+    if msgspec is not None:
+        serializers.append(MsgspecJSONSerializer())
+    if orjson is not None:
+        serializers.append(OrjsonSerializer())
+    serializers.append(StdlibSerializer())
+    return serializers
+
+
+def _select_json_serializer():
+    """Honour settings.API_JSON_SERIALIZER, or pick the fastest available"""
+    preferred = getattr(settings, 'API_JSON_SERIALIZER', 'auto')
+    serializers = available_json_serializers()
+    for serializer in serializers:
+        if serializer.name == preferred:
+            return serializer
+    return serializers[0]
+
+
+json_serializer = _select_json_serializer()
+msgpack_serializer = MsgpackSerializer() if msgspec is not None else None
+
+
+def get_serializer(request):
+    """Negotiate the response serializer from the Accept header"""
+    accept = request.headers.get('Accept', '')
+    if msgpack_serializer is not None and any(t in accept for t in MSGPACK_TYPES):
+        return msgpack_serializer
+    return json_serializer
+
+
+def api_response(request, payload, status=200):
+    """Serialize payload with the negotiated serializer"""
+    serializer = get_serializer(request)
+    response = HttpResponse(serializer.dumps(payload), content_type=serializer.content_type, status=status)
+    patch_vary_headers(response, ('Accept',))
+    return response
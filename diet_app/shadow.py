@@ -0,0 +1,146 @@
+"""
+Shadow evaluation of a candidate model for Diet Recommendation System
+
+Live requests are answered by the current predictor as usual; submit() then
+hands a copy of the inputs to a small pool of daemon threads, which score
+them with both the current trained models (ML_MODELS_DIR) and the candidate
+models in SHADOW_MODEL_DIR, through DietPredictor.predict_models, and count
+category disagreements, the TDEE difference and candidate latency. The
+served category and TDEE come from the formulas, not the models, so they
+are not the baseline. submit() never blocks: it takes a
+sampling decision and a put_nowait() on a bounded queue, and inputs that do
+not fit are dropped (and counted). Candidate artifacts are loaded by the
+first worker thread, never by a request.
+
+Counters are per process, like the API throttling metrics, and are exposed
+under "shadow" by the staff metrics endpoint. Background scoring shares the
+GIL with request threads, so keep SHADOW_EVALUATION['workers'] small and
+lower sample_rate on busy deployments.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .metrics import Metrics
+
+# Candidate latency histogram upper bounds, microseconds
+LATENCY_BUCKETS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10_000)
+
+
+class ShadowEvaluator:
+    """Bounded background scoring of live inputs with a candidate predictor"""
+
+    def __init__(self, models_dir, workers=1, queue_size=1000, sample_rate=1.0):
+        self.models_dir = Path(models_dir)
+        self.workers = workers
+        self.sample_rate = sample_rate
+        self.metrics = Metrics()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._candidate = None
+        self._load_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None  # threads do not survive fork; restart them in each worker
+
+    def submit(self, args):
+        """Queue predict() arguments for shadow scoring"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            self.metrics.incr('dropped')
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            for index in range(self.workers):
+                threading.Thread(target=self._run, name=f'shadow-{index}', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        candidate = self._load_candidate()
+        while True:
+            args = self._queue.get()
+            if candidate is None:
+                self.metrics.incr('unavailable')
+                continue
+            try:
+                self._score(candidate, args)
+            except Exception:
+                self.metrics.incr('errors')
+
+    def _load_candidate(self):
+        from .ml_utils import DietPredictor
+
+        with self._load_lock:
+            if self._candidate is None:
+                candidate = DietPredictor()
+                candidate.load_attempted = True  # never fall back to ML_MODELS_DIR
+                if candidate.load_models(self.models_dir):
+                    self._candidate = candidate
+            return self._candidate
+
+    def _score(self, candidate, args):
+        from .ml_utils import diet_predictor
+
+        current = diet_predictor.predict_models(*args[:5])
+        if current is None:
+            self.metrics.incr('current_unavailable')
+            return
+        category, tdee = current
+        start = time.perf_counter()
+        candidate_category, candidate_tdee = candidate.predict_models(*args[:5])
+        elapsed_us = (time.perf_counter() - start) * 1e6
+
+        self.metrics.incr('scored')
+        if candidate_category != category:
+            self.metrics.incr('category_disagreements')
+            self.metrics.incr(f'category:{category}->{candidate_category}')
+        self.metrics.incr('tdee_abs_error_total', abs(candidate_tdee - tdee))
+        self.metrics.incr('latency_us_total', elapsed_us)
+        bucket = next((bound for bound in LATENCY_BUCKETS_US if elapsed_us <= bound), None)
+        self.metrics.incr(f'latency_us_le_{bucket}' if bucket else 'latency_us_gt_10000')
+
+    def snapshot(self):
+        """Counters plus derived rates"""
+        counts = self.metrics.snapshot()
+        counts.pop('in_flight')
+        scored = counts.get('scored', 0)
+        counts['queued'] = self._queue.qsize()
+        if scored:
+            counts['category_disagreement_rate'] = round(counts.get('category_disagreements', 0) / scored, 4)
+            counts['tdee_mean_abs_error'] = round(counts['tdee_abs_error_total'] / scored, 1)
+            counts['latency_us_mean'] = round(counts['latency_us_total'] / scored, 1)
+            counts['tdee_abs_error_total'] = round(counts['tdee_abs_error_total'])
+            counts['latency_us_total'] = round(counts['latency_us_total'])
+        return counts
+
+
+def _build_evaluator():
+    if settings.SHADOW_MODEL_DIR is None:
+        return None
+    return ShadowEvaluator(settings.SHADOW_MODEL_DIR, **settings.SHADOW_EVALUATION)
+
+
+evaluator = _build_evaluator()
+
+
+def submit(args):
+    """Shadow-score one live prediction's inputs (no-op unless SHADOW_MODEL_DIR is set)"""
+    if evaluator is not None:
+        evaluator.submit(args)
+
+
+def snapshot():
+    """Shadow counters for the metrics endpoint, or None when disabled"""
+    return evaluator.snapshot() if evaluator is not None else None
@@ -0,0 +1,32 @@
+"""
+Signal receivers for Diet Recommendation System
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import events
+from .models import DietRecommendation, WeightLog
+from .rollups import refresh_on_commit
+
+
+@receiver(post_save, sender=DietRecommendation)
+@receiver(post_save, sender=WeightLog)
+def update_rollups(sender, instance, created, raw=False, **kwargs):
+    """Fold newly created rows into the sender's reporting rollup"""
+    if created and not raw:
+        refresh_on_commit(sender)
+
+
+@receiver(post_save, sender=WeightLog)
+def publish_weight_log(sender, instance, raw=False, **kwargs):
+    """Push new and edited weight logs to the user's open dashboards"""
+    if not raw:
+        events.weight_logs_changed(instance.user_id, [instance])
+
+
+@receiver(post_save, sender=DietRecommendation)
+def publish_recommendation(sender, instance, created, raw=False, **kwargs):
+    """Push new recommendations to the user's open dashboards"""
+    if created and not raw:
+        events.recommendation_created(instance)
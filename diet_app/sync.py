@@ -0,0 +1,171 @@
+"""
+Offline sync of weight logs for Diet Recommendation System
+
+Clients push batches of dated entries, which are upserted in one
+transaction: there is one WeightLog per user per day (a unique constraint),
+so replaying a batch is harmless and the last upload for a day wins.
+
+Clients pull changes with a sync token, an opaque cursor over
+(updated_at, id). Every upsert bumps updated_at, so a pull returns each
+entry created or changed since the token, oldest change first, a page at a
+time. Deleted entries are not reported, and concurrent writers can slip
+past a token (see changes_since).
+
+Native clients, which have no CSRF cookie, authenticate with an access
+token (`Authorization: Bearer <token>`) obtained from their credentials. It
+is a signed (user id, session auth hash) pair, so it needs no table, expires
+after WEIGHT_SYNC_ACCESS_TOKEN_SECONDS and stops working when the password
+changes. Browser callers use their session, and CSRF applies.
+
+Entries for months already moved to cold storage (see diet_app.archive) are
+rejected: the archived day would otherwise exist twice.
+"""
+
+import datetime
+import json
+import math
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from . import events
+from .archive import archived_months
+from .models import WeightLog
+from .rollups import refresh_on_commit
+from .schemas import WeightSyncEntry
+from .validation import FIELD_SPECS, InputValidationError
+
+ACCESS_TOKEN_SALT = 'diet_app.sync.access'
+WEIGHT_MIN, WEIGHT_MAX = next((low, high) for name, _, low, high, _ in FIELD_SPECS if name == 'weight')
+EARLIEST_DATE = datetime.date(1900, 1, 1)
+
+
+def parse_entries(body):
+    """Validate a push body ({"entries": [{"date", "weight", "notes"?}, ...]}) into {date: (weight, notes)}"""
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InputValidationError(f'Malformed JSON: {e}')
+    entries = payload.get('entries') if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        raise InputValidationError('expected an object with an "entries" list')
+    if len(entries) > settings.WEIGHT_SYNC_MAX_ENTRIES:
+        raise InputValidationError(f'at most {settings.WEIGHT_SYNC_MAX_ENTRIES} entries per request')
+
+    # Clients may be a day ahead of the server's time zone
+    latest = timezone.localdate() + datetime.timedelta(days=1)
+    parsed = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise InputValidationError(f'entries[{position}]: expected an object')
+        date = _parse_date(entry.get('date'), position)
+        if not EARLIEST_DATE <= date <= latest:
+            raise InputValidationError(f'entries[{position}].date: {date} is out of range')
+        weight = entry.get('weight')
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight):
+            raise InputValidationError(f'entries[{position}].weight: expected a number')
+        if not WEIGHT_MIN <= weight <= WEIGHT_MAX:
+            raise InputValidationError(f'entries[{position}].weight: must be between {WEIGHT_MIN} and {WEIGHT_MAX}')
+        notes = entry.get('notes')
+        if notes is not None and not isinstance(notes, str):
+            raise InputValidationError(f'entries[{position}].notes: expected a string')
+        parsed[date] = (float(weight), notes)  # a later entry for the same day wins
+    return parsed
+
+
+def _parse_date(value, position):
+    """A YYYY-MM-DD date, or the local date of an ISO timestamp"""
+    if not isinstance(value, str):
+        raise InputValidationError(f'entries[{position}].date: expected YYYY-MM-DD or an ISO timestamp')
+    try:
+        if len(value) == 10:
+            return datetime.date.fromisoformat(value)
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise InputValidationError(f'entries[{position}].date: expected YYYY-MM-DD or an ISO timestamp')
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def upsert_entries(user, entries):
+    """Insert or update one WeightLog per day in a single transaction; return the number written"""
+    archived = archived_months('weight_log', user, entries)
+    if archived:
+        months = ', '.join(f'{month:%Y-%m}' for month in sorted(archived))
+        raise InputValidationError(f'entries for archived months are read-only: {months}')
+    logs = [WeightLog(user=user, date=date, weight=weight, notes=notes) for date, (weight, notes) in entries.items()]
+    with transaction.atomic():
+        WeightLog.objects.bulk_create(
+            logs, batch_size=500, update_conflicts=True,
+            unique_fields=['user', 'date'], update_fields=['weight', 'notes', 'updated_at'],
+        )
+        # bulk_create sends no post_save, so schedule the rollup refresh and
+        # the dashboard event here
+        refresh_on_commit(WeightLog)
+        events.weight_logs_changed(user.pk, logs)
+    return len(logs)
+
+
+def make_token(updated_at, pk):
+    return f'{round(updated_at.timestamp() * 1_000_000)}-{pk}'
+
+
+def parse_token(token):
+    """(updated_at, id) from a sync token; raise InputValidationError if malformed"""
+    try:
+        micros, pk = (int(part) for part in token.split('-'))
+        return datetime.datetime.fromtimestamp(micros / 1_000_000, tz=datetime.timezone.utc), pk
+    except (ValueError, OverflowError, OSError):
+        raise InputValidationError('invalid sync token')
+
+
+def changes_since(user, token=None):
+    """(entries, next token, has_more) for changes after token (everything when None)
+
+    Limit: updated_at is stamped when a row is written, not when its
+    transaction commits. On PostgreSQL, where one user's writes can run
+    concurrently (two devices syncing at once), a pull between the two
+    commits can return the later-stamped row first and move its token past
+    the other, which it then never returns. SQLite serializes writes, so
+    the gap cannot occur there. Closing it would need a commit-ordered
+    sequence such as a per-user counter bumped under a row lock. Until then,
+    clients that may have raced a sibling device can pull again from an
+    older token, since entries are idempotent per day.
+    """
+    logs = WeightLog.objects.filter(user=user)
+    if token:
+        updated_at, pk = parse_token(token)
+        logs = logs.filter(updated_at__gte=updated_at).exclude(updated_at=updated_at, id__lte=pk)
+    page_size = settings.WEIGHT_SYNC_PAGE_SIZE
+    rows = list(
+        logs.order_by('updated_at', 'id')
+        .values_list('id', 'date', 'weight', 'notes', 'updated_at')[:page_size + 1]
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    entries = [WeightSyncEntry(date, weight, notes, updated_at) for _, date, weight, notes, updated_at in rows]
+    next_token = make_token(rows[-1][4], rows[-1][0]) if rows else token
+    return entries, next_token, has_more
+
+
+def issue_access_token(user):
+    """Bearer token authenticating user on the sync endpoint"""
+    return signing.dumps({'user': user.pk, 'auth': user.get_session_auth_hash()}, salt=ACCESS_TOKEN_SALT)
+
+
+def access_token_user(request):
+    """Active user of a valid `Authorization: Bearer` access token, or None"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=ACCESS_TOKEN_SALT, max_age=settings.WEIGHT_SYNC_ACCESS_TOKEN_SECONDS)
+    except signing.BadSignature:  # also raised for expired tokens
+        return None
+    user = User.objects.filter(pk=payload.get('user'), is_active=True).first()
+    if user is None or not constant_time_compare(user.get_session_auth_hash(), payload.get('auth', '')):
+        return None
+    return user
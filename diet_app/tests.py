@@ -0,0 +1,214 @@
+"""
+Tests for Diet Recommendation System
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .ml_utils import ACTIVITY_LEVELS, DietPredictor, model_features
+from .models import WeightLog
+from .sync import issue_access_token
+
+try:
+    import numpy as np
+    import sklearn
+except ImportError:
+    np = sklearn = None
+
+
+class WeightLogSyncTests(TestCase):
+    """Offline weight log sync with a bearer access token"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('sync', password='secret-pass-1')
+        self.url = reverse('api_sync_weight_logs')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_access_token(self.user)}'}
+
+    def push(self, entries, **extra):
+        body = json.dumps({'entries': entries})
+        return self.client.post(self.url, body, content_type='application/json', **{**self.auth, **extra})
+
+    def pull(self, since=None):
+        response = self.client.get(self.url, {'since': since} if since else {}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_push_creates_one_log_per_day(self):
+        response = self.push([
+            {'date': '2026-10-01', 'weight': 80.5, 'notes': 'start'},
+            {'date': '2026-10-02', 'weight': 80.1},
+            {'date': '2026-10-02', 'weight': 79.9},  # a later entry for the same day wins
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], {'received': 2})
+        weights = dict(WeightLog.objects.filter(user=self.user).values_list('date__day', 'weight'))
+        self.assertEqual(weights, {1: 80.5, 2: 79.9})
+
+    def test_replayed_push_updates_in_place(self):
+        entries = [{'date': '2026-10-01', 'weight': 80.5}, {'date': '2026-10-02', 'weight': 80.1}]
+        self.push(entries)
+        self.push(entries)
+        self.push([{'date': '2026-10-02', 'weight': 79.0, 'notes': 'edited offline'}])
+        logs = WeightLog.objects.filter(user=self.user).order_by('date')
+        self.assertEqual([(log.weight, log.notes) for log in logs], [(80.5, None), (79.0, 'edited offline')])
+
+    def test_invalid_push_writes_nothing(self):
+        response = self.push([{'date': '2026-10-01', 'weight': 80.5}, {'date': '2026-10-02', 'weight': '80'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WeightLog.objects.filter(user=self.user).exists())
+
+    def test_delta_pull_returns_only_changes_since_token(self):
+        self.push([{'date': '2026-10-01', 'weight': 80.5}, {'date': '2026-10-02', 'weight': 80.1}])
+        first = self.pull()
+        self.assertEqual([entry['date'] for entry in first['entries']], ['2026-10-01', '2026-10-02'])
+        self.assertFalse(first['has_more'])
+
+        unchanged = self.pull(first['sync_token'])
+        self.assertEqual(unchanged['entries'], [])
+        self.assertEqual(unchanged['sync_token'], first['sync_token'])
+
+        self.push([{'date': '2026-10-01', 'weight': 81.0}, {'date': '2026-10-03', 'weight': 80.0}])
+        delta = self.pull(first['sync_token'])
+        self.assertEqual([(entry['date'], entry['weight']) for entry in delta['entries']],
+                         [('2026-10-01', 81.0), ('2026-10-03', 80.0)])
+
+    @override_settings(WEIGHT_SYNC_PAGE_SIZE=2)
+    def test_pull_pages_through_all_changes(self):
+        self.push([{'date': f'2026-10-{day:02d}', 'weight': 80.0} for day in range(1, 6)])
+        dates, token, has_more = [], None, True
+        while has_more:
+            page = self.pull(token)
+            dates += [entry['date'] for entry in page['entries']]
+            token, has_more = page['sync_token'], page['has_more']
+        self.assertEqual(dates, [f'2026-10-{day:02d}' for day in range(1, 6)])
+
+    def test_pull_only_sees_own_logs(self):
+        other = User.objects.create_user('other')
+        WeightLog.objects.create(user=other, date='2026-10-01', weight=60)
+        self.assertEqual(self.pull()['entries'], [])
+
+    def test_malformed_sync_token(self):
+        response = self.client.get(self.url, {'since': 'not-a-token'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_access_token(self):
+        for header in ('Bearer not-a-token', f'Bearer {issue_access_token(self.user)}x'):
+            response = self.push([{'date': '2026-10-01', 'weight': 80.5}], HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, 401)
+        self.assertFalse(WeightLog.objects.exists())
+
+    def test_access_token_revoked_by_password_change(self):
+        self.user.set_password('secret-pass-2')
+        self.user.save()
+        response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.status_code, 401)
+
+    def test_access_token_endpoint(self):
+        url = reverse('api_sync_access_token')
+        bad = self.client.post(url, {'username': 'sync', 'password': 'wrong'}, content_type='application/json')
+        self.assertEqual(bad.status_code, 401)
+        good = self.client.post(url, {'username': 'sync', 'password': 'secret-pass-1'}, content_type='application/json')
+        self.assertEqual(good.status_code, 200)
+        token = good.json()['data']['access_token']
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_session_push_needs_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        body = json.dumps({'entries': [{'date': '2026-10-01', 'weight': 80.5}]})
+        response = client.post(self.url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(WeightLog.objects.exists())
+
+
+@unittest.skipIf(sklearn is None, 'needs numpy and scikit-learn')
+class CompiledModelParityTests(SimpleTestCase):
+    """Compiled .npz models predict what the scikit-learn estimators predict"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        people = [
+            (age, gender, height, weight, activity_level)
+            for age in (18, 35, 60, 85)
+            for gender in ('male', 'female')
+            for height in range(140, 215, 5)
+            for weight in range(40, 165, 8)
+            for activity_level in ACTIVITY_LEVELS
+        ]
+        cls.X_bmi = np.array([model_features(*person)[0] for person in people], dtype=float)
+        cls.y_bmi = np.array([
+            DietPredictor.get_bmi_category(DietPredictor.calculate_bmi(weight, height))
+            for _, _, height, weight, _ in people
+        ])
+        cls.X_tdee = np.array([model_features(*person)[1] for person in people], dtype=float)
+        cls.y_tdee = np.array([DietPredictor.calculate_tdee(weight, height, age, gender, level)
+                               for age, gender, height, weight, level in people])
+        # Off-grid rows, so thresholds are crossed between training points
+        cls.X_bmi_test = cls.X_bmi[::7] + [0, 2.5, 3.5]
+        cls.X_tdee_test = cls.X_tdee[::7] + [0, 2.5, 3.5, 1, 0]
+
+    def roundtrip(self, compiled):
+        from .compiled_models import load_compiled, save_compiled
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'model.npz'
+            save_compiled(compiled, path)
+            return load_compiled(path)
+
+    def assert_parity(self, estimator, X, exact):
+        from .compiled_models import compile_estimator
+
+        model = self.roundtrip(compile_estimator(estimator))
+        expected = estimator.predict(X)
+        check = np.testing.assert_array_equal if exact else np.testing.assert_allclose
+        check(model.predict(X), expected)  # batch walk
+        check(np.array([model.predict_one(row) for row in X.tolist()]), expected)  # single-row walk
+
+    def test_classifiers(self):
+        from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier
+
+        for estimator in (
+            DecisionTreeClassifier(random_state=0),
+            RandomForestClassifier(n_estimators=20, random_state=0),
+            ExtraTreesClassifier(n_estimators=20, random_state=0),
+            LogisticRegression(max_iter=5000),
+        ):
+            with self.subTest(type(estimator).__name__):
+                self.assert_parity(estimator.fit(self.X_bmi, self.y_bmi), self.X_bmi_test, exact=True)
+
+    def test_regressors(self):
+        from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+        from sklearn.linear_model import LinearRegression, Ridge
+        from sklearn.tree import DecisionTreeRegressor
+
+        for estimator in (
+            DecisionTreeRegressor(random_state=0),
+            RandomForestRegressor(n_estimators=20, random_state=0),
+            ExtraTreesRegressor(n_estimators=20, random_state=0),
+            GradientBoostingRegressor(n_estimators=50, random_state=0),
+            LinearRegression(),
+            Ridge(),
+        ):
+            with self.subTest(type(estimator).__name__):
+                self.assert_parity(estimator.fit(self.X_tdee, self.y_tdee), self.X_tdee_test, exact=False)
+
+    def test_label_encoder(self):
+        from sklearn.preprocessing import LabelEncoder
+
+        from .compiled_models import compile_label_encoder
+
+        encoder = LabelEncoder().fit(self.y_bmi)
+        compiled = self.roundtrip(compile_label_encoder(encoder))
+        codes = encoder.transform(self.y_bmi)
+        np.testing.assert_array_equal(compiled.transform(self.y_bmi), codes)
+        np.testing.assert_array_equal(compiled.inverse_transform(codes), encoder.inverse_transform(codes))
@@ -0,0 +1,167 @@
+"""
+Precompiled input validation shared by the HTML calculator and the JSON API
+
+The schema is derived once, at import, from DietCalculatorForm so ranges and
+choices have a single source of truth. When msgspec is installed the schema is
+compiled into a msgspec Struct and JSON bodies are decoded and validated in a
+single pass; form posts and installs without msgspec use a pure-Python
+validator compiled from the same spec.
+
+Numeric fields of a JSON body must be JSON numbers (integers for int fields)
+on both paths, so a body is accepted or rejected the same way whether or not
+msgspec is installed. Form values are always strings and are converted.
+List bodies hold at most API_MAX_BATCH_SIZE inputs, checked before any item
+is validated.
+"""
+
+import json
+import math
+from typing import Annotated, Literal, Union
+
+from django import forms
+from django.conf import settings
+
+from .forms import DietCalculatorForm
+from .schemas import DietInput
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class InputValidationError(ValueError):
+    """Raised when calculator input is missing, malformed or out of range"""
+
+
+def _field_specs(form_class):
+    """(name, type, min, max, choices) for each field of form_class, in order"""
+    specs = []
+    for name, field in form_class.base_fields.items():
+        if isinstance(field, forms.ChoiceField):
+            specs.append((name, str, None, None, tuple(value for value, _ in field.choices)))
+        elif isinstance(field, forms.FloatField):  # FloatField subclasses IntegerField
+            specs.append((name, float, field.min_value, field.max_value, None))
+        elif isinstance(field, forms.IntegerField):
+            specs.append((name, int, field.min_value, field.max_value, None))
+        else:
+            raise TypeError(f'Unsupported field type for {name}: {type(field).__name__}')
+    return specs
+
+
+FIELD_SPECS = _field_specs(DietCalculatorForm)
+FIELD_NAMES = tuple(spec[0] for spec in FIELD_SPECS)
+
+
+# Pure-Python validator --------------------------------------------------------
+
+def _compile_checker(name, kind, low, high, choices, strict=False):
+    """Build a closure that converts and range/choice-checks one value.
+
+    strict (JSON) checkers take numbers only, with msgspec's rules: no numeric
+    strings, and no floats for int fields.
+    """
+    if choices is not None:
+        allowed = frozenset(choices)
+
+        def check(value):
+            if value not in allowed:
+                raise InputValidationError(f'{name}: expected one of {", ".join(choices)}, got {value!r}')
+            return value
+        return check
+
+    def check(value):
+        if isinstance(value, bool) or value is None or (
+            strict and not isinstance(value, int if kind is int else (int, float))
+        ):
+            raise InputValidationError(f'{name}: expected {kind.__name__}, got {value!r}')
+        try:
+            number = kind(value)
+        except (TypeError, ValueError):
+            raise InputValidationError(f'{name}: expected {kind.__name__}, got {value!r}') from None
+        if kind is int and isinstance(value, float) and value != number:
+            raise InputValidationError(f'{name}: expected int, got {value!r}')
+        if kind is float and not math.isfinite(number):
+            raise InputValidationError(f'{name}: expected a finite number, got {value!r}')
+        if (low is not None and number < low) or (high is not None and number > high):
+            raise InputValidationError(f'{name}: must be between {low} and {high}, got {value!r}')
+        return number
+    return check
+
+
+_CHECKERS = tuple((spec[0], _compile_checker(*spec)) for spec in FIELD_SPECS)
+_JSON_CHECKERS = tuple((spec[0], _compile_checker(*spec, strict=True)) for spec in FIELD_SPECS)
+
+
+def _python_validate(data, index=None, checkers=_CHECKERS):
+    """Validate one mapping with the compiled checkers"""
+    if not hasattr(data, 'get'):
+        raise InputValidationError(f'{_where(index)}expected an object')
+    values = []
+    for name, check in checkers:
+        value = data.get(name)
+        if value is None or value == '':
+            raise InputValidationError(f'{_where(index)}{name}: this field is required')
+        try:
+            values.append(check(value))
+        except InputValidationError as e:
+            raise InputValidationError(f'{_where(index)}{e}') from None
+    return DietInput(*values)
+
+
+def _where(index):
+    return '' if index is None else f'item {index}: '
+
+
+# msgspec validator ------------------------------------------------------------
+
+if msgspec is not None:
+    def _annotation(name, kind, low, high, choices):
+        if choices is not None:
+            return Literal[choices]
+        return Annotated[kind, msgspec.Meta(ge=low, le=high)]
+
+    DietInputStruct = msgspec.defstruct(
+        'DietInputStruct',
+        [(spec[0], _annotation(*spec)) for spec in FIELD_SPECS],
+    )
+    _json_decoder = msgspec.json.Decoder(Union[
+        DietInputStruct,
+        Annotated[list[DietInputStruct], msgspec.Meta(max_length=settings.API_MAX_BATCH_SIZE)],
+    ])
+
+
+# Public API -------------------------------------------------------------------
+
+def validate_diet_input(data):
+    """Validate a mapping of raw values (e.g. request.POST) into a DietInput.
+
+    Form values are strings, so the compiled checkers are used even when
+    msgspec is available (msgspec.convert needs an intermediate dict and
+    measured slower).
+    """
+    return _python_validate(data)
+
+
+def decode_diet_request(body):
+    """Decode and validate a JSON body holding one input object or a list of them"""
+    if msgspec is not None:
+        try:
+            return _json_decoder.decode(body)
+        except (msgspec.ValidationError, msgspec.DecodeError) as e:
+            raise InputValidationError(str(e)) from None
+
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise InputValidationError(f'Invalid JSON: {e}') from None
+    if isinstance(data, list):
+        if len(data) > settings.API_MAX_BATCH_SIZE:
+            raise InputValidationError(f'Expected `array` of length <= {settings.API_MAX_BATCH_SIZE}')
+        return [_python_validate(item, index, _JSON_CHECKERS) for index, item in enumerate(data)]
+    return _python_validate(data, checkers=_JSON_CHECKERS)
+
+
+def input_args(value):
+    """Positional arguments for DietPredictor.predict from a validated input"""
+    return tuple(getattr(value, name) for name in FIELD_NAMES)
@@ -2,18 +2,85 @@
 Views for Diet Recommendation System
 """
 
-from django.shortcuts import render, redirect
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import get_user, login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-import json
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
 
-from .models import UserProfile, DietRecommendation, WeightLog
+from .models import UserProfile, DietRecommendation, WeightLog, ArchiveSummary
+from .archive import read_archived
 from .ml_utils import diet_predictor
 from .forms import UserProfileForm, WeightLogForm
+from .schemas import WeightLogEntry, WeightTrendEntry
+from .sync import access_token_user, changes_since, issue_access_token, parse_entries, upsert_entries
+from .ratelimit import metrics, throttle
+from .rotation import RotatingPlan
+from .routers import replica_reads
+from .rollups import PERIODS, default_range, population_report
+from .search import search_own
+from .serialization import api_response
+from . import drift, events, shadow
+from .validation import InputValidationError, decode_diet_request, input_args, validate_diet_input
+
+SEARCH_RESULTS = 50  # per kind, on the history search page
+
+# Conditional GET helpers: one aggregate query per request, memoized on the
+# request so the ETag and Last-Modified callbacks share it.
+def _recommendation_state(request, pk=None):
+    """Latest created_at and row count of the user's recommendations"""
+    if not hasattr(request, '_recommendation_state'):
+        queryset = DietRecommendation.objects.filter(user=request.user)
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        request._recommendation_state = queryset.aggregate(latest=Max('created_at'), count=Count('id'))
+    return request._recommendation_state
+
+
+def recommendation_etag(request, pk=None):
+    """ETag for history/detail pages (none for a missing detail page, which is a 404)"""
+    state = _recommendation_state(request, pk)
+    if pk is not None and not state['count']:
+        return None
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    archived = _wants_archived(request)
+    return f"rec-{request.user.pk}-{pk or 'all'}-{state['count']}-{latest}-{archived:d}"
+
+
+def recommendation_last_modified(request, pk=None):
+    """Last-Modified for history/detail pages"""
+    return _recommendation_state(request, pk)['latest']
+
+
+def weight_log_etag(request):
+    """ETag for the weight log API.
+
+    Entries are edited in place (one per day), so the latest updated_at is
+    combined with the row count and highest id.
+    """
+    state = WeightLog.objects.filter(user=request.user).aggregate(
+        latest=Max('updated_at'), count=Count('id'), last_id=Max('id')
+    )
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    archived = _wants_archived(request)
+    return f"wl-{request.user.pk}-{state['count']}-{state['last_id'] or 0}-{latest}-{archived:d}"
+
+
+def _wants_archived(request):
+    """Archived rows are only read when asked for with ?archived=1"""
+    return request.GET.get('archived') == '1'
 
 
 def home(request):
@@ -21,24 +88,29 @@ def home(request):
     return render(request, 'diet_app/home.html')
 
 
+def _profile_restrictions(request):
+    """The logged-in user's allergy and dietary restriction codes (none for anonymous users)"""
+    if not request.user.is_authenticated:
+        return ()
+    profile = UserProfile.objects.filter(user=request.user).only('allergies', 'dietary_restrictions').first()
+    return profile.restrictions if profile is not None else ()
+
+
 def calculate_diet(request):
     """Calculate diet recommendation (no login required)"""
     
     if request.method == 'POST':
-        # Get form data
-        age = int(request.POST.get('age'))
-        gender = request.POST.get('gender')
-        height = float(request.POST.get('height'))
-        weight = float(request.POST.get('weight'))
-        activity_level = request.POST.get('activity_level')
-        goal = request.POST.get('goal')
-        diet_type = request.POST.get('diet_type')
+        try:
+            data = validate_diet_input(request.POST)
+        except InputValidationError as e:
+            messages.error(request, f'Invalid input - {e}')
+            return render(request, 'diet_app/calculate.html', status=400)
         
         # Make prediction
-        result = diet_predictor.predict(
-            age, gender, height, weight, 
-            activity_level, goal, diet_type
-        )
+        args = input_args(data)
+        result = diet_predictor.predict(*args, restrictions=_profile_restrictions(request))
+        shadow.submit(args)
+        drift.observe(args)
         
         # Save to session for display
         request.session['last_result'] = result
@@ -51,7 +123,7 @@ def calculate_diet(request):
                 bmi_category=result['category'],
                 tdee=result['tdee'],
                 recommended_calories=result['recommended_calories'],
-                diet_type=diet_type,
+                diet_type=data.diet_type,
                 diet_plan_title=result['diet_plan']['title'],
                 meals=result['diet_plan']['meals'],
                 tips=result['diet_plan']['tips']
@@ -63,6 +135,7 @@ def calculate_diet(request):
 
 
 @login_required
+@replica_reads
 def dashboard(request):
     """User dashboard"""
     try:
@@ -70,13 +143,19 @@ def dashboard(request):
     except UserProfile.DoesNotExist:
         profile = None
     
-    recommendations = DietRecommendation.objects.filter(user=request.user)[:5]
-    weight_logs = WeightLog.objects.filter(user=request.user)[:10]
+    recommendations = DietRecommendation.objects.filter(user=request.user)
+    weight_logs = WeightLog.objects.filter(user=request.user)
     
     context = {
         'profile': profile,
-        'recommendations': recommendations,
-        'weight_logs': weight_logs
+        'recommendations': recommendations[:events.RECENT_RECOMMENDATIONS],
+        'recommendation_count': recommendations.count(),
+        'weight_logs': weight_logs[:events.RECENT_WEIGHT_LOGS],
+        'weight_log_count': weight_logs.count(),
+        # Under WSGI the stream endpoint answers 501, so don't open one
+        'live_updates': events.hub is not None and isinstance(request, ASGIRequest),
+        'recent_recommendations': events.RECENT_RECOMMENDATIONS,
+        'recent_weight_logs': events.RECENT_WEIGHT_LOGS,
     }
     
     return render(request, 'diet_app/dashboard.html', context)
@@ -110,10 +189,11 @@ def add_weight_log(request):
     if request.method == 'POST':
         form = WeightLogForm(request.POST)
         if form.is_valid():
-            weight_log = form.save(commit=False)
-            weight_log.user = request.user
-            weight_log.save()
-            messages.success(request, 'Weight log added successfully!')
+            # One entry per day: logging again today replaces today's entry
+            _, created = WeightLog.objects.update_or_create(
+                user=request.user, date=timezone.localdate(), defaults=form.cleaned_data,
+            )
+            messages.success(request, 'Weight log added successfully!' if created else "Today's weight log updated!")
             return redirect('dashboard')
     else:
         form = WeightLogForm()
@@ -122,19 +202,65 @@ def add_weight_log(request):
 
 
 @login_required
+@replica_reads
+@condition(etag_func=recommendation_etag, last_modified_func=recommendation_last_modified)
 def history(request):
     """View recommendation history"""
     recommendations = DietRecommendation.objects.filter(user=request.user)
-    return render(request, 'diet_app/history.html', {'recommendations': recommendations})
+    context = {'recommendations': recommendations, 'show_archived': _wants_archived(request)}
+    if context['show_archived']:
+        archived = list(read_archived('recommendation', request.user))
+        for row in archived:
+            row['created_at'] = datetime.datetime.fromisoformat(row['created_at'])
+        context['archived_recommendations'] = sorted(archived, key=lambda row: row['created_at'], reverse=True)
+    return render(request, 'diet_app/history.html', context)
 
 
 @login_required
+@replica_reads
+@condition(etag_func=recommendation_etag, last_modified_func=recommendation_last_modified)
 def recommendation_detail(request, pk):
     """View specific recommendation"""
-    recommendation = DietRecommendation.objects.get(pk=pk, user=request.user)
+    recommendation = get_object_or_404(DietRecommendation, pk=pk, user=request.user)
     return render(request, 'diet_app/recommendation_detail.html', {'recommendation': recommendation})
 
 
+@login_required
+@replica_reads
+def search_history(request):
+    """Search the user's own plans (title and meals) and weight log notes"""
+    query = request.GET.get('q', '').strip()
+    context = {'query': query}
+    if query:
+        recommendations = DietRecommendation.objects.filter(user=request.user)
+        weight_logs = WeightLog.objects.filter(user=request.user)
+        context['recommendations'] = search_own(recommendations, 'recommendation', query)[:SEARCH_RESULTS]
+        context['weight_logs'] = search_own(weight_logs, 'weight_log', query)[:SEARCH_RESULTS]
+    return render(request, 'diet_app/search.html', context)
+
+
+@login_required
+@replica_reads
+def meal_plan(request, pk):
+    """Rotating multi-week plan for a recommendation's diet type and calorie target, one week per page"""
+    recommendation = get_object_or_404(DietRecommendation, pk=pk, user=request.user)
+    plan = RotatingPlan(
+        request.user.pk, recommendation.diet_type, recommendation.recommended_calories,
+        _profile_restrictions(request)
+    )
+    try:
+        week = min(max(int(request.GET.get('week', 1)), 1), plan.weeks)
+    except ValueError:
+        week = 1
+    context = {
+        'recommendation': recommendation,
+        'week': week,
+        'weeks': range(1, plan.weeks + 1),
+        'days': plan.week(week),
+    }
+    return render(request, 'diet_app/meal_plan.html', context)
+
+
 def register(request):
     """User registration"""
     if request.method == 'POST':
@@ -174,33 +300,173 @@ def user_logout(request):
 
 
 # API Endpoints for AJAX requests
+def _predict_result(data, restrictions=()):
+    """Predict one validated API input, feeding shadow evaluation and drift monitoring"""
+    args = input_args(data)
+    result = diet_predictor.predict_result(*args, restrictions=restrictions)
+    shadow.submit(args)
+    drift.observe(args)
+    return result
+
+
 @csrf_exempt
+@throttle
 def api_calculate_diet(request):
     """API endpoint for diet calculation"""
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
-            
-            result = diet_predictor.predict(
-                age=data['age'],
-                gender=data['gender'],
-                height=data['height'],
-                weight=data['weight'],
-                activity_level=data['activity_level'],
-                goal=data['goal'],
-                diet_type=data['diet_type']
-            )
-            
-            return JsonResponse({'status': 'success', 'data': result})
+            data = decode_diet_request(request.body)
+        except InputValidationError as e:
+            return api_response(request, {'status': 'error', 'message': str(e)}, status=400)
+        
+        restrictions = _profile_restrictions(request)
+        if isinstance(data, list):
+            result = [_predict_result(item, restrictions) for item in data]
+        else:
+            result = _predict_result(data, restrictions)
         
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        return api_response(request, {'status': 'success', 'data': result})
     
-    return JsonResponse({'status': 'error', 'message': 'Invalid method'}, status=405)
+    return api_response(request, {'status': 'error', 'message': 'Invalid method'}, status=405)
 
 
 @login_required
+@replica_reads
+@condition(etag_func=weight_log_etag)
 def api_get_weight_logs(request):
     """API endpoint to get weight logs"""
-    logs = WeightLog.objects.filter(user=request.user).values('weight', 'date')
-    return JsonResponse({'status': 'success', 'data': list(logs)})
\ No newline at end of file
+    logs = WeightLog.objects.filter(user=request.user).values_list('weight', 'date')
+    data = [WeightLogEntry(weight, date) for weight, date in logs]
+    if _wants_archived(request):
+        archived = [
+            WeightLogEntry(row['weight'], datetime.date.fromisoformat(row['date']))
+            for row in read_archived('weight_log', request.user)
+        ]
+        data += sorted(archived, key=lambda entry: entry.date, reverse=True)
+    return api_response(request, {'status': 'success', 'data': data})
+
+
+@csrf_exempt
+def api_sync_weight_logs(request):
+    """Offline sync: POST a batch of dated entries to upsert, GET changes since ?since=<sync token>.
+
+    Native clients send an access token (see api_sync_access_token); other
+    requests need a session and, for POST, the CSRF token.
+    """
+    user = access_token_user(request)
+    if user is None:
+        if 'Authorization' in request.headers:
+            return api_response(request, {'status': 'error', 'message': 'Invalid or expired access token'}, status=401)
+        return _session_sync_weight_logs(request)
+    request.user = user
+    return _sync_weight_logs(request)
+
+
+@login_required
+@csrf_protect
+def _session_sync_weight_logs(request):
+    return _sync_weight_logs(request)
+
+
+def _sync_weight_logs(request):
+    try:
+        if request.method == 'POST':
+            entries = parse_entries(request.body)
+            written = upsert_entries(request.user, entries)
+            return api_response(request, {'status': 'success', 'data': {'received': written}})
+        entries, token, has_more = changes_since(request.user, request.GET.get('since'))
+    except InputValidationError as e:
+        return api_response(request, {'status': 'error', 'message': str(e)}, status=400)
+    return api_response(request, {
+        'status': 'success', 'data': {'entries': entries, 'sync_token': token, 'has_more': has_more},
+    })
+
+
+@csrf_exempt
+@throttle
+def api_sync_access_token(request):
+    """POST {"username", "password"}: an access token for the sync endpoint"""
+    if request.method != 'POST':
+        return api_response(request, {'status': 'error', 'message': 'Invalid method'}, status=405)
+    try:
+        credentials = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        credentials = None
+    if not isinstance(credentials, dict):
+        return api_response(request, {'status': 'error', 'message': 'expected {"username", "password"}'}, status=400)
+    user = authenticate(request, username=credentials.get('username'), password=credentials.get('password'))
+    if user is None:
+        return api_response(request, {'status': 'error', 'message': 'Invalid credentials'}, status=401)
+    return api_response(request, {'status': 'success', 'data': {'access_token': issue_access_token(user)}})
+
+
+@login_required
+def api_weight_trend(request):
+    """Monthly weight averages, from archive summaries for archived months and live rows otherwise"""
+    months = {}
+    for summary in ArchiveSummary.objects.filter(user=request.user, kind='weight_log'):
+        months[summary.month] = [summary.row_count, summary.value_sum, summary.value_min, summary.value_max]
+    live = (
+        WeightLog.objects.filter(user=request.user)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(count=Count('id'), total=Sum('weight'), low=Min('weight'), high=Max('weight'))
+        .order_by()
+    )
+    for row in live:
+        count, total, low, high = months.get(row['month'], [0, 0.0, row['low'], row['high']])
+        months[row['month']] = [
+            count + row['count'], total + row['total'], min(low, row['low']), max(high, row['high']),
+        ]
+    data = [
+        WeightTrendEntry(month, count, round(total / count, 1), low, high)
+        for month, (count, total, low, high) in sorted(months.items())
+    ]
+    return api_response(request, {'status': 'success', 'data': data})
+
+
+async def api_events(request):
+    """Server-Sent Events stream of changes to the user's dashboard (ASGI only).
+
+    diet_project.asgi serves this path with events.StreamApplication; the
+    view covers Django's own ASGI handler (e.g. when the project is mounted
+    without that wrapper).
+    """
+    if events.hub is None:
+        return api_response(request, {'status': 'error', 'message': 'Live updates are disabled'}, status=404)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for the life of the stream
+        return api_response(request, {'status': 'error', 'message': 'Live updates need an ASGI server'}, status=501)
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return api_response(request, {'status': 'error', 'message': 'Authentication required'}, status=403)
+    reconnected = 'HTTP_LAST_EVENT_ID' in request.META
+    response = StreamingHttpResponse(events.stream(user.pk, reconnected), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx buffering the stream
+    return response
+
+
+@staff_member_required
+def api_metrics(request):
+    """API throttling, shadow evaluation, input drift and live update counters for monitoring"""
+    data = metrics.snapshot()
+    data['shadow'] = shadow.snapshot()
+    data['drift'] = drift.drift_report()
+    data['live_updates'] = events.snapshot()
+    return api_response(request, {'status': 'success', 'data': data})
+
+
+@staff_member_required
+def api_population_report(request):
+    """Population report (recommendation mix, calories, active loggers) from the rollup tables"""
+    period = request.GET.get('period', 'day')
+    if period not in PERIODS:
+        return api_response(request, {'status': 'error', 'message': 'period must be day or week'}, status=400)
+    start, end = default_range(period, timezone.localdate())
+    try:
+        start = datetime.date.fromisoformat(request.GET.get('start') or start.isoformat())
+        end = datetime.date.fromisoformat(request.GET.get('end') or end.isoformat())
+    except ValueError:
+        return api_response(request, {'status': 'error', 'message': 'start/end must be YYYY-MM-DD'}, status=400)
+    return api_response(request, {'status': 'success', 'data': population_report(period, start, end)})
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'diet_project.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Live dashboard updates are streamed outside Django's per-request handler
+from diet_app.events import StreamApplication  # noqa: E402  (needs the app registry)
+
+application = StreamApplication(django_application)
\ No newline at end of file
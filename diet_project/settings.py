@@ -20,12 +20,16 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'whitenoise.runserver_nostatic',  # Serve static files the same way in dev
     'django.contrib.staticfiles',
     'diet_app',  # Our main app
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'diet_app.middleware.CompressionMiddleware',
+    'diet_app.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,6 +66,19 @@ DATABASES = {
     }
 }
 
+# Read replicas (see diet_app.routers): aliases in DATABASES that the
+# read-only pages may read from, e.g. for local testing with SQLite copies
+# refreshed by `manage.py sync_sqlite_replicas`:
+#   DATABASES['replica1'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.replica1.sqlite3'}
+#   DATABASE_REPLICAS = ['replica1']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['diet_app.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5  # a client that wrote reads from the primary this long
+REPLICA_HEALTH = {
+    'check_seconds': 5,
+    'max_lag_seconds': 30,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -81,12 +98,107 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Hashed, pre-compressed (gzip + brotli) static files served by WhiteNoise.
+# Hashed names get a far-future immutable Cache-Control automatically.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+WHITENOISE_MAX_AGE = 0 if DEBUG else 3600  # Unhashed files only
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Response compression (see diet_app.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 512  # bytes
+COMPRESSION_BROTLI_PATHS = ['/api/', '/history/', '/recommendation/']
+COMPRESSION_BROTLI_QUALITY = 5
+
+# API serializer: 'auto' (fastest installed), 'orjson', 'msgspec' or 'stdlib'
+API_JSON_SERIALIZER = 'auto'
+
+# Calculator API (see diet_app.validation)
+API_MAX_BATCH_SIZE = 100  # inputs per list body
+
+# Public API throttling (see diet_app.ratelimit)
+API_RATE_LIMITS = {
+    'ip': (5, 20),     # tokens per second, burst size
+    'key': (20, 60),   # applied in addition when an X-API-Key header is sent
+}
+API_RATE_LIMIT_STORE = 'memory'  # 'cache' shares buckets across workers
+API_TRUST_X_FORWARDED_FOR = False
+API_TRUST_X_REQUEST_START = False  # enable when the proxy stamps X-Request-Start
+API_ADMISSION = {
+    'max_concurrent': 8,
+    'max_queue_wait': 0.05,  # seconds; longer waits are shed with 503
+}
+
+# Admin changelists switch from COUNT(*) to a statistics estimate above this size
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+# Reporting rollups (see diet_app.rollups): fold new rows in after each write,
+# at most ROLLUPS_WRITE_BATCH ids at a time; refresh_rollups catches up the rest
+ROLLUPS_UPDATE_ON_WRITE = True
+ROLLUPS_WRITE_BATCH = 1000
+
+# Cold storage (see diet_app.archive): rows older than the horizon are moved
+# to compressed monthly files by `manage.py archive_old_rows`
+ARCHIVE_DIR = BASE_DIR / 'archive'
+ARCHIVE_HORIZON_DAYS = 730
+
+# Shadow evaluation (see diet_app.shadow): set SHADOW_MODEL_DIR to a directory
+# holding candidate model artifacts (same names as ML_MODELS_DIR) to score a
+# sample of live inputs with it in the background
+SHADOW_MODEL_DIR = None
+SHADOW_EVALUATION = {
+    'workers': 1,
+    'queue_size': 1000,  # inputs beyond this are dropped, never waited for
+    'sample_rate': 1.0,
+}
+
+# Weight log offline sync (see diet_app.sync)
+WEIGHT_SYNC_MAX_ENTRIES = 5000  # per push
+WEIGHT_SYNC_PAGE_SIZE = 1000    # per pull
+WEIGHT_SYNC_ACCESS_TOKEN_SECONDS = 90 * 24 * 3600  # bearer tokens for native clients
+
+# Live dashboard updates (see diet_app.events): Server-Sent Events at
+# /api/events/, which need an ASGI server (diet_project.asgi:application)
+LIVE_UPDATES = {
+    'enabled': True,  # dashboards only open streams when served over ASGI (diet_project.asgi)
+    'broker': 'memory',  # 'socket' fans events out to every worker on this host
+    'socket_dir': BASE_DIR / 'run' / 'events',
+    'queue_size': 100,  # pending events per stream before it is reset
+    'heartbeat_seconds': 15,
+    'max_seconds': 300,  # streams then end and the browser reconnects
+    'retry_ms': 2000,
+}
+
+# Rotating multi-week meal plans (see diet_app.rotation), cached per week
+# in the Django cache
+MEAL_PLANS = {
+    'weeks': 4,
+    'dinner_window_days': 7,  # no dinner repeats within this many days
+    'choices_per_slot': 3,  # meals closest to the slot's calorie share to pick from
+    'cache_seconds': 7 * 24 * 3600,
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ML Models directory
-ML_MODELS_DIR = BASE_DIR / 'ml_models'
\ No newline at end of file
+ML_MODELS_DIR = BASE_DIR / 'ml_models'
+
+# Precomputed BMI grid (see diet_app.grid); build it with `manage.py build_predictor_grid`
+PREDICTOR_GRID = False
+PREDICTOR_GRID_PATH = ML_MODELS_DIR / 'predictor_grid.npy'
+
+# Input drift monitoring (see diet_app.drift): per-worker sketches of calculator
+# inputs, flushed to DRIFT_DIR and compared with the training data sketch
+# built by `manage.py build_drift_reference`
+DRIFT_MONITORING = True
+DRIFT_DIR = BASE_DIR / 'drift'
+DRIFT_FLUSH_SECONDS = 60
+DRIFT_WINDOW_DAYS = 7
+DRIFT_RETENTION_DAYS = 30  # per-day sketch directories kept (at least the window)
+DRIFT_REFERENCE_PATH = ML_MODELS_DIR / 'drift_reference.json'
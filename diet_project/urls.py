@@ -10,7 +10,7 @@ from diet_app import views
 
 # Main URL patterns
 urlpatterns = [
-    path('admin/', admin.site.admin_view),
+    path('admin/', admin.site.urls),
     
     # Public pages
     path('', views.home, name='home'),
@@ -25,7 +25,9 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
     path('history/', views.history, name='history'),
+    path('history/search/', views.search_history, name='search_history'),
     path('recommendation/<int:pk>/', views.recommendation_detail, name='recommendation_detail'),
+    path('recommendation/<int:pk>/meal-plan/', views.meal_plan, name='meal_plan'),
     
     # Weight tracking
     path('add-weight/', views.add_weight_log, name='add_weight'),
@@ -33,6 +35,12 @@ urlpatterns = [
     # API endpoints
     path('api/calculate/', views.api_calculate_diet, name='api_calculate'),
     path('api/weight-logs/', views.api_get_weight_logs, name='api_weight_logs'),
+    path('api/weight-logs/sync/', views.api_sync_weight_logs, name='api_sync_weight_logs'),
+    path('api/weight-logs/sync/token/', views.api_sync_access_token, name='api_sync_access_token'),
+    path('api/events/', views.api_events, name='api_events'),
+    path('api/weight-trend/', views.api_weight_trend, name='api_weight_trend'),
+    path('api/metrics/', views.api_metrics, name='api_metrics'),
+    path('api/reports/population/', views.api_population_report, name='api_population_report'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings for Diet Recommendation System
+
+Usage: gunicorn diet_project.wsgi  (this file is picked up automatically)
+"""
+
+wsgi_app = 'diet_project.wsgi:application'
+
+
+def post_fork(server, worker):
+    """Warm each worker before it accepts requests (see diet_app.ml_utils.prewarm)"""
+    from diet_app.ml_utils import prewarm
+    prewarm()